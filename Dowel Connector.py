@@ -18,6 +18,9 @@ def run(context):
         # This will run the start function in each of your commands as defined in commands/__init__.py
         commands.start()
 
+        # Nothing has called a handler yet, so write the startup messages now
+        futil.flush_log()
+
     except:
         futil.handle_error('run')
 
@@ -30,5 +33,7 @@ def stop(context):
         # This will run the start function in each of your commands as defined in commands/__init__.py
         commands.stop()
 
+        futil.flush_log()
+
     except:
         futil.handle_error('stop')
\ No newline at end of file
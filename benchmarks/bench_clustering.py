@@ -0,0 +1,75 @@
+"""
+Compares the grid-hashed clustering of dowel ends with comparing every pair of ends.
+
+Run from the repository root:
+    python benchmarks/bench_clustering.py
+"""
+import harness
+import jointUtils
+
+REACH = 5.0
+TOLERANCE = 0.05
+
+
+def all_pairs_clusters(centers, normals, reach, tolerance):
+    # Same links and union-find as cluster_dowel_ends, without the grid
+    units = []
+    for dx, dy, dz in normals:
+        length = (dx * dx + dy * dy + dz * dz) ** 0.5
+        units.append((dx / length, dy / length, dz / length))
+    parents = list(range(len(centers)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i in range(len(centers)):
+        for j in range(i + 1, len(centers)):
+            if jointUtils.axes_meet(centers[i], units[i], centers[j], units[j], reach, tolerance):
+                root_i = find(i)
+                root_j = find(j)
+                if root_i != root_j:
+                    parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = {}
+    for i in range(len(centers)):
+        groups.setdefault(find(i), []).append(i)
+    return [group for root, group in sorted(groups.items()) if len(group) > 1]
+
+
+def random_design(rng, joints):
+    # Joints of 2 to 4 dowels on a lattice 20 cm apart, so neighbouring joints share grid cells
+    centers = []
+    normals = []
+    side = max(1, round(joints ** (1 / 3)))
+    for n in range(joints):
+        point = (20.0 * (n % side), 20.0 * (n // side % side), 20.0 * (n // side // side))
+        for _ in range(rng.randint(2, 4)):
+            direction = harness.random_unit(rng)
+            distance = rng.uniform(1.0, REACH * 0.9)
+            centers.append(tuple(point[i] - direction[i] * distance for i in range(3)))
+            normals.append(direction)
+    return centers, normals
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--joints', type=int, nargs='+', default=[50, 200, 800], help='Joints per design.')
+    args = parser.parse_args()
+
+    rng = harness.random_source(args.seed)
+    for joints in args.joints:
+        centers, normals = random_design(rng, joints)
+        grid = jointUtils.cluster_dowel_ends(centers, normals, REACH, TOLERANCE)
+        assert grid == all_pairs_clusters(centers, normals, REACH, TOLERANCE)
+
+        harness.compare(f'{joints} joints, {len(centers)} dowel ends, {len(grid)} found', [
+            ('all pairs', lambda: all_pairs_clusters(centers, normals, REACH, TOLERANCE)),
+            ('grid hash + union-find', lambda: jointUtils.cluster_dowel_ends(centers, normals, REACH, TOLERANCE)),
+        ], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares storing scanned dowel ends in a DowelEndSet with a list of dicts of tuples.
+
+Memory is measured with tracemalloc as the bytes still allocated once
+every end is stored and the values it was read from are dropped, so it
+counts the containers and the float objects they keep.
+
+Run from the repository root:
+    python benchmarks/bench_dowel_ends.py
+"""
+import tracemalloc
+
+import harness
+import jointUtils
+
+REACH = 5.0
+TOLERANCE = 0.05
+
+
+def random_values(rng, count):
+    # The ends spread over a larger volume as their number grows, so clustering compares a similar number of pairs per end
+    spread = 10.0 * count ** (1 / 3)
+    values = []
+    for _ in range(count):
+        center = (rng.uniform(-spread, spread), rng.uniform(-spread, spread), rng.uniform(-spread, spread))
+        values.append((center, harness.random_unit(rng), rng.uniform(0.3, 1.0)))
+    return values
+
+
+def store_dicts(values):
+    # How the ends were kept before DowelEndSet, one dict per end
+    return [{'center': (x, y, z), 'normal': (nx, ny, nz), 'radius': radius}
+            for (x, y, z), (nx, ny, nz), radius in values]
+
+
+def store_set(values):
+    ends = jointUtils.DowelEndSet()
+    for (x, y, z), (nx, ny, nz), radius in values:
+        ends.add((x, y, z), (nx, ny, nz), radius)
+    return ends
+
+
+def allocated(store, count, seed):
+    # The values are read inside the trace and dropped once stored, as a scan drops the API objects it read,
+    # so only what the store keeps alive is counted
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        values = random_values(harness.random_source(seed), count)
+        stored = store(values)
+        del values
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del stored
+    return after - before
+
+
+def cluster_dicts(ends):
+    return jointUtils.cluster_dowel_ends([end['center'] for end in ends], [end['normal'] for end in ends], REACH, TOLERANCE)
+
+
+def cluster_set(ends):
+    # The coordinate arrays are clustered in place
+    return jointUtils.cluster_flat_dowel_ends(ends.flat_centers, ends.flat_normals, REACH, TOLERANCE)
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--ends', type=int, nargs='+', default=[1000, 10000, 100000], help='Dowel ends per design.')
+    args = parser.parse_args()
+
+    rng = harness.random_source(args.seed)
+    for count in args.ends:
+        values = random_values(rng, count)
+        dicts = store_dicts(values)
+        ends = store_set(values)
+        assert [end['center'] for end in dicts] == ends.centers()
+        assert [end['normal'] for end in dicts] == ends.normals()
+        assert cluster_dicts(dicts) == cluster_set(ends)
+
+        dict_bytes = allocated(store_dicts, count, args.seed)
+        set_bytes = allocated(store_set, count, args.seed)
+        print(f'{count} ends: list of dicts {dict_bytes / count:6.1f} B/end, '
+              f'DowelEndSet {set_bytes / count:6.1f} B/end ({dict_bytes / set_bytes:.1f}x less, '
+              f'nbytes {ends.nbytes / count:.0f} B/end)')
+
+        harness.compare(f'{count} ends, storing', [
+            ('list of dicts', lambda: store_dicts(values)),
+            ('DowelEndSet', lambda: store_set(values)),
+        ], args.repeat)
+        harness.compare(f'{count} ends, clustering', [
+            ('list of dicts', lambda: cluster_dicts(dicts)),
+            ('DowelEndSet', lambda: cluster_set(ends)),
+        ], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures what a log call costs when its level is off, when it is buffered, and the eager log it replaced.
+
+A debug call below the log level should cost about as much as checking
+one module attribute, so hot loops can keep their debug lines. The old
+futil.log built an f-string and printed it on every call. Fusion is
+replaced by a stub that drops everything written to it.
+
+Run from the repository root:
+    python benchmarks/bench_logging.py
+"""
+import contextlib
+import os
+import sys
+import types
+
+import harness
+
+# Calls per timed run, so the cost of the timing loop itself is spread out
+CALLS = 1000
+
+
+def stub_adsk():
+    # Just enough of adsk.core for general_utils to import and log
+    adsk = types.ModuleType('adsk')
+    core = types.ModuleType('adsk.core')
+    core.LogLevels = types.SimpleNamespace(InfoLogLevel=0, WarningLogLevel=1, ErrorLogLevel=2)
+    core.LogTypes = types.SimpleNamespace(ConsoleLogType=0, FileLogType=1)
+    application = types.SimpleNamespace(userInterface=types.SimpleNamespace(messageBox=print), log=lambda *args: None)
+    core.Application = types.SimpleNamespace(get=lambda: application)
+    adsk.core = core
+    sys.modules['adsk'] = adsk
+    sys.modules['adsk.core'] = core
+
+
+stub_adsk()
+futil = harness.load_module('lib/fusionAddInUtils/general_utils.py', 'general_utils')
+
+
+def old_log(message, level=0, force_console=False):
+    # futil.log before levels and buffering: print every message, and send it to Fusion in debug mode
+    print(message)
+    if futil.DEBUG or force_console:
+        futil.app.log(message, level, 0)
+
+
+def attribute_check():
+    for i in range(CALLS):
+        if futil.LOG_LEVEL > futil.DEBUG_LEVEL:
+            continue
+
+
+def debug_call():
+    for i in range(CALLS):
+        futil.debug('face %d is a %s', i, 'cylinder')
+
+
+def debug_call_flushed():
+    debug_call()
+    futil.flush_log()
+
+
+def eager_log():
+    for i in range(CALLS):
+        old_log(f'face {i} is a {"cylinder"}')
+
+
+def main():
+    args = harness.argument_parser(__doc__).parse_args()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        futil.LOG_LEVEL = futil.INFO_LEVEL
+        disabled = harness.measure(debug_call, args.repeat)
+        futil.LOG_LEVEL = futil.DEBUG_LEVEL
+        cases = [
+            ('old eager f-string log', eager_log),
+            ('buffered debug, flushed once', debug_call_flushed),
+        ]
+        results = {name: harness.measure(func, args.repeat) for name, func in cases}
+        # Measured without flushing, so only the buffer append is timed
+        buffered = harness.measure(debug_call, args.repeat)
+        futil._buffer.clear()
+        futil.LOG_LEVEL = futil.INFO_LEVEL
+        check = harness.measure(attribute_check, args.repeat)
+
+    print(f'{CALLS} log calls, Fusion stubbed out, stdout to {os.devnull}')
+    baseline = results['old eager f-string log']
+    for name, seconds in [('old eager f-string log', baseline),
+                          ('buffered debug, flushed once', results['buffered debug, flushed once']),
+                          ('buffered debug, not flushed', buffered),
+                          ('debug below the log level', disabled),
+                          ('module attribute check', check)]:
+        print(f'  {name:<36} {harness.format_time(seconds / CALLS)}/call  {baseline / seconds:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares re-solving a changing selection with NormalEquations against summing every line again.
+
+A selection of dowel ends grows and shrinks at random, as when picking and
+unpicking ends in the dialog. After every change both ways solve for the
+joint point and must agree.
+
+Run from the repository root:
+    python benchmarks/bench_normal_equations.py
+"""
+import harness
+import jointUtils
+
+
+def random_changes(rng, pool_size, changes, max_selected):
+    # Lines aimed near one point, and a sequence of picks and unpicks of them
+    target = (1.0, 2.0, 3.0)
+    pool = []
+    for _ in range(pool_size):
+        direction = harness.random_unit(rng)
+        distance = rng.uniform(2.0, 10.0)
+        pool.append((tuple(target[i] - direction[i] * distance + rng.gauss(0, 1e-3) for i in range(3)), direction))
+
+    selected = set()
+    sequence = []
+    for _ in range(changes):
+        # The selection fills to half its largest size first, so large sizes are reached within the run
+        if len(selected) < max(2, max_selected // 2) or (len(selected) < max_selected and rng.random() < 0.5):
+            key = rng.choice([key for key in range(pool_size) if key not in selected])
+            selected.add(key)
+            sequence.append(('add', key))
+        else:
+            key = rng.choice(sorted(selected))
+            selected.remove(key)
+            sequence.append(('remove', key))
+    return pool, sequence
+
+
+def replay_incremental(pool, sequence, check=False):
+    equations = jointUtils.NormalEquations()
+    worst = 0.0
+    for action, key in sequence:
+        if action == 'add':
+            center, normal = pool[key]
+            equations.add(center, normal, key)
+        else:
+            equations.remove(key)
+        point, _ = equations.solve()
+        if check:
+            worst = max(worst, difference(point, full_solve(pool, sorted(equations.lines))))
+    return worst
+
+
+def replay_full(pool, sequence):
+    selected = set()
+    for action, key in sequence:
+        if action == 'add':
+            selected.add(key)
+        else:
+            selected.discard(key)
+        full_solve(pool, selected)
+
+
+def full_solve(pool, keys):
+    centers = [[pool[key][0] for key in keys]]
+    normals = [[pool[key][1] for key in keys]]
+    points, _, _ = jointUtils.compute_best_intersections(centers, normals)
+    return points[0]
+
+
+def difference(a, b):
+    if a is None or b is None:
+        return 0.0 if a is b else float('inf')
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--changes', type=int, default=2000, help='Picks and unpicks per run.')
+    parser.add_argument('--selected', type=int, nargs='+', default=[4, 16, 64, 512],
+                        help='Largest selection sizes to time, including some above RECOMPUTE_INTERVAL.')
+    args = parser.parse_args()
+
+    rng = harness.random_source(args.seed)
+    for max_selected in args.selected:
+        pool, sequence = random_changes(rng, max_selected * 2, args.changes, max_selected)
+
+        # Removals subtract what additions added, so the drift is bounded by the periodic recompute
+        worst = replay_incremental(pool, sequence, check=True)
+        assert worst < 1e-9, worst
+
+        harness.compare(f'{args.changes} changes, up to {max_selected} ends selected, worst difference {worst:.1e} cm', [
+            ('sum every line per change', lambda: replay_full(pool, sequence)),
+            ('NormalEquations update', lambda: replay_incremental(pool, sequence)),
+        ], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Times meshing joints in the process pool with 1, 2, 4 and 8 workers against meshing them in this process.
+
+Run from the repository root:
+    python benchmarks/bench_parallel.py
+"""
+import os
+
+import harness
+from jointUtils.mesh import joint_parts
+from jointUtils.parallel import mesh_joints_parallel
+
+
+def random_jobs(rng, count):
+    # Joints of 3 or 4 dowels of 6 to 12 mm meeting at the origin, in the (index, point, centers, radii) jobs of the CLI
+    jobs = []
+    for index in range(count):
+        centers = []
+        radii = []
+        for _ in range(rng.randint(3, 4)):
+            direction = harness.random_unit(rng)
+            distance = rng.uniform(3.0, 6.0)
+            centers.append(tuple(-component * distance for component in direction))
+            radii.append(rng.uniform(0.3, 0.6))
+        jobs.append((index, (0.0, 0.0, 0.0), centers, radii))
+    return jobs
+
+
+def mesh_serial(jobs, segments, threaded):
+    return {index: joint_parts(point, centers, radii, segments, threaded) for index, point, centers, radii in jobs}
+
+
+def mesh_pool(jobs, workers, segments, threaded):
+    return dict(mesh_joints_parallel(jobs, workers, segments, threaded))
+
+
+def triangle_count(results):
+    return sum(len(part.mesh.triangles) for parts in results.values() for part in parts)
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--joints', type=int, default=64, help='Joints meshed per call.')
+    parser.add_argument('--segments', type=int, default=64, help='Segments around each dowel axis.')
+    parser.add_argument('--threaded', action='store_true', help='Model the threads, which is much more work per joint.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Pool sizes to time.')
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    jobs = random_jobs(harness.random_source(args.seed), args.joints)
+    expected = triangle_count(mesh_serial(jobs, args.segments, args.threaded))
+    for workers in args.workers:
+        assert triangle_count(mesh_pool(jobs, workers, args.segments, args.threaded)) == expected
+
+    cases = [('in process', lambda: mesh_serial(jobs, args.segments, args.threaded))]
+    for workers in args.workers:
+        cases.append((f'{workers} workers', lambda workers=workers: mesh_pool(jobs, workers, args.segments, args.threaded)))
+    harness.compare(f'{args.joints} joints, {expected} triangles, {os.cpu_count()} CPUs', cases, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
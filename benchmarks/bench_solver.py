@@ -0,0 +1,124 @@
+"""
+Compares the closed-form symmetric 3x3 solve with the Cramer's rule path it replaced.
+
+Run from the repository root:
+    python benchmarks/bench_solver.py
+"""
+from copy import deepcopy
+
+import harness
+import jointUtils
+
+
+def cramer_intersection(points, directions):
+    # The solver the command used before solve_symmetric_3x3, kept here as the baseline
+    S = [[0.0] * 3 for _ in range(3)]
+    C = [0.0] * 3
+    for p, d in zip(points, directions):
+        length = (d[0] ** 2 + d[1] ** 2 + d[2] ** 2) ** 0.5
+        d = [value / length for value in d]
+        M = [[0.0] * 3 for _ in range(3)]
+        for j in range(3):
+            for k in range(3):
+                M[j][k] = -d[j] * d[k]
+                if j == k:
+                    M[j][k] += 1.0
+        for j in range(3):
+            for k in range(3):
+                S[j][k] += M[j][k]
+        for j in range(3):
+            C[j] += sum(M[j][k] * p[k] for k in range(3))
+
+    def determinant(matrix):
+        return (matrix[0][0] * (matrix[1][1] * matrix[2][2] - matrix[1][2] * matrix[2][1]) -
+                matrix[0][1] * (matrix[1][0] * matrix[2][2] - matrix[1][2] * matrix[2][0]) +
+                matrix[0][2] * (matrix[1][0] * matrix[2][1] - matrix[1][1] * matrix[2][0]))
+
+    D = determinant(S)
+    if abs(D) < 1e-6:
+        return None
+    x = []
+    for i in range(3):
+        Si = deepcopy(S)
+        for j in range(3):
+            Si[j][i] = C[j]
+        x.append(determinant(Si) / D)
+    return x
+
+
+def random_joints(rng, count, dowels):
+    # Dowels pointing at a random joint point from 2 to 10 cm away, with a little noise
+    centers = []
+    normals = []
+    for _ in range(count):
+        point = [rng.uniform(-50, 50) for _ in range(3)]
+        joint_centers = []
+        joint_normals = []
+        for _ in range(dowels):
+            direction = harness.random_unit(rng)
+            distance = rng.uniform(2, 10)
+            joint_centers.append(tuple(point[i] - direction[i] * distance + rng.gauss(0, 1e-3) for i in range(3)))
+            joint_normals.append(direction)
+        centers.append(joint_centers)
+        normals.append(joint_normals)
+    return centers, normals
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--joints', type=int, default=1000, help='Joints solved per call.')
+    parser.add_argument('--dowels', type=int, default=4, help='Dowels per joint.')
+    args = parser.parse_args()
+
+    centers, normals = random_joints(harness.random_source(args.seed), args.joints, args.dowels)
+
+    # Both paths must agree before their speed means anything
+    points, _, _ = jointUtils.compute_best_intersections(centers, normals)
+    for joint_centers, joint_normals, point in zip(centers, normals, points):
+        expected = cramer_intersection(joint_centers, joint_normals)
+        assert max(abs(a - b) for a, b in zip(point, expected)) < 1e-6, (point, expected)
+
+    def cramer():
+        for joint_centers, joint_normals in zip(centers, normals):
+            cramer_intersection(joint_centers, joint_normals)
+
+    def closed_form():
+        for joint_centers, joint_normals in zip(centers, normals):
+            jointUtils.compute_best_intersections([joint_centers], [joint_normals])
+
+    def batch():
+        jointUtils.compute_best_intersections(centers, normals)
+
+    def accumulator():
+        for joint_centers, joint_normals in zip(centers, normals):
+            equations = jointUtils.NormalEquations()
+            for center, normal in zip(joint_centers, joint_normals):
+                equations.add(center, normal)
+            equations.solve()
+
+    cases = [
+        ('cramer + deepcopy (old)', cramer),
+        ('closed form, one joint per call', closed_form),
+        ('closed form, one batch', batch),
+        ('NormalEquations per joint', accumulator),
+    ]
+
+    # The vectorized path needs NumPy, which is optional
+    if jointUtils.has_numpy():
+        import numpy
+
+        arrays = [numpy.asarray(values) for values in jointUtils.pad_joints(centers, normals)]
+        array_points, _, _ = jointUtils.compute_best_intersections_array(*arrays)
+        assert max(max(abs(a - b) for a, b in zip(p, q)) for p, q in zip(points, array_points)) < 1e-6
+
+        cases.append(('NumPy batch from lists', lambda: jointUtils.compute_best_intersections_array(
+            *jointUtils.pad_joints(centers, normals))))
+        cases.append(('NumPy batch from arrays', lambda: jointUtils.compute_best_intersections_array(*arrays)))
+    else:
+        print('NumPy is not installed, so the vectorized path is skipped')
+
+    harness.compare(f'{args.joints} joints of {args.dowels} dowels', cases, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
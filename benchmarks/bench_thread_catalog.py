@@ -0,0 +1,84 @@
+"""
+Compares looking up thread sizes in the sorted catalog with scanning the thread data every time.
+
+Run from the repository root:
+    python benchmarks/bench_thread_catalog.py
+"""
+import os
+import tempfile
+
+import harness
+import jointUtils
+
+THREAD_TYPE = 'ISO Metric profile'
+
+
+class ThreadDataQuery:
+    """
+    Thread data shaped like Fusion's ISO metric sizes, with one coarse and a few fine designations per size.
+    """
+
+    def __init__(self):
+        whole = [1, 1.2, 1.4, 1.6, 1.8, 2, 2.5, 3, 3.5, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 15, 16, 17, 18, 20, 22, 24,
+                 25, 26, 27, 28, 30, 32, 33, 35, 36, 38, 39, 40, 42, 45, 48, 50, 52, 55, 56, 58, 60, 62, 64, 65, 68]
+        self.sizes = [f'{diameter:g}' for diameter in whole]
+
+    def allSizes(self, thread_type):
+        return list(self.sizes)
+
+    def allDesignations(self, thread_type, size):
+        return [f'M{size}x{pitch}' for pitch in ('1.5', '1.25', '1', '0.75')]
+
+    def allClasses(self, is_internal, thread_type, designation):
+        return ['6H', '5H', '7H'] if is_internal else ['6g', '4g6g', '6e']
+
+
+def scan_query(query, diameter):
+    # The lookup the cap and connector did before the catalog: parse every size until one is close enough
+    for size in query.allSizes(THREAD_TYPE):
+        try:
+            value = float(size.replace('M', '').split('x')[0])
+        except ValueError:
+            continue
+        if abs(value - diameter) < 2.5:
+            designation = query.allDesignations(THREAD_TYPE, size)[0]
+            return designation, query.allClasses(False, THREAD_TYPE, designation)[0]
+    return None
+
+
+def linear_nearest(catalog, diameter):
+    best = min(catalog.entries, key=lambda entry: abs(entry.diameter - diameter))
+    return best if abs(best.diameter - diameter) <= 2.5 else None
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--lookups', type=int, default=1000, help='Diameters looked up per call.')
+    args = parser.parse_args()
+
+    rng = harness.random_source(args.seed)
+    query = ThreadDataQuery()
+    catalog = jointUtils.ThreadCatalog.build(query, THREAD_TYPE)
+    # Cap diameters of 6 to 40 mm dowels
+    diameters = [2 * 10 * jointUtils.cap_outer_radius(rng.uniform(0.3, 2.0)) for _ in range(args.lookups)]
+
+    for diameter in diameters:
+        assert catalog.nearest(diameter) == linear_nearest(catalog, diameter)
+
+    harness.compare(f'{args.lookups} lookups in {len(catalog.entries)} sizes', [
+        ('scan thread data', lambda: [scan_query(query, diameter) for diameter in diameters]),
+        ('linear min over catalog', lambda: [linear_nearest(catalog, diameter) for diameter in diameters]),
+        ('catalog bisection', lambda: [catalog.nearest(diameter) for diameter in diameters]),
+    ], args.repeat)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'thread_catalog.json')
+        catalog.save(path)
+        harness.compare('Catalog per session', [
+            ('build from thread data', lambda: jointUtils.ThreadCatalog.build(query, THREAD_TYPE)),
+            ('load cached JSON', lambda: jointUtils.ThreadCatalog.load(path, THREAD_TYPE)),
+        ], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Times thread meshing, and the periodic ring table against evaluating the ISO profile at every vertex.
+
+Run from the repository root:
+    python benchmarks/bench_thread_mesh.py
+"""
+import math
+
+import harness
+from jointUtils.mesh import cap_mesh, connector_mesh, thread_pitch
+from jointUtils.thread import DEFAULT_SAMPLES_PER_PITCH, thread_depth, thread_rings
+
+
+def profile_radius(phase, pitch, major_radius):
+    # ISO basic profile at a phase in [0, pitch), as iso_profile_table samples it
+    depth = thread_depth(pitch)
+    crest = pitch / 8.0
+    flank = 5.0 * pitch / 16.0
+    root_start = crest + flank
+    if phase <= crest:
+        return major_radius
+    if phase < root_start:
+        return major_radius - depth * (phase - crest) / flank
+    if phase <= root_start + pitch / 4.0:
+        return major_radius - depth
+    return major_radius - depth * (pitch - phase) / flank
+
+
+def direct_rings(major_radius, pitch, start, end, segments, samples_per_pitch=DEFAULT_SAMPLES_PER_PITCH):
+    # Evaluates the profile at the helix phase of every vertex of every ring, without the periodic table
+    step = pitch / samples_per_pitch
+    faded = major_radius - thread_depth(pitch)
+    first = math.floor(start / step + 1e-6) + 1
+    last = math.ceil(end / step - 1e-6) - 1
+    rings = [([faded] * segments, start)]
+    for k in range(first, last + 1):
+        height = k * step
+        radii = []
+        for s in range(segments):
+            phase = (height - pitch * s / segments) % pitch
+            radius = profile_radius(phase, pitch, major_radius)
+            weight = min(1.0, (height - start) / pitch, (end - height) / pitch)
+            radii.append(faded + (radius - faded) * weight if weight < 1.0 else radius)
+        rings.append((radii, height))
+    rings.append(([faded] * segments, end))
+    return rings
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--radius', type=float, default=0.5, help='Dowel radius in cm, 0.5 gives an M18 cap.')
+    parser.add_argument('--segments', type=int, default=64, help='Segments per turn.')
+    args = parser.parse_args()
+
+    radius = args.radius
+    pitch = thread_pitch(radius)
+    major = radius + 0.4
+    segments = args.segments
+
+    table = thread_rings(major, pitch, -1.0, 0.5, segments)
+    direct = direct_rings(major, pitch, -1.0, 0.5, segments)
+    assert len(table) == len(direct)
+    for (table_radii, table_height), (direct_radii, direct_height) in zip(table, direct):
+        assert abs(table_height - direct_height) < 1e-12
+        assert max(abs(a - b) for a, b in zip(table_radii, direct_radii)) < 1e-9
+
+    vertices = len(table) * segments
+    harness.compare(f'Thread rings of a {pitch * 10:g} mm pitch cap, {len(table)} rings, {vertices} vertices', [
+        ('profile at every vertex', lambda: direct_rings(major, pitch, -1.0, 0.5, segments)),
+        ('periodic ring table', lambda: thread_rings(major, pitch, -1.0, 0.5, segments)),
+    ], args.repeat)
+
+    center = (0.0, 0.0, 0.0)
+    direction = (0.0, 0.0, 1.0)
+    threaded_cap = cap_mesh(center, direction, radius, segments, pitch)
+    harness.compare(f'Cap and connector meshes, {len(threaded_cap.triangles)} triangles per threaded cap', [
+        ('plain cap', lambda: cap_mesh(center, direction, radius, segments)),
+        ('threaded cap', lambda: cap_mesh(center, direction, radius, segments, pitch)),
+        ('plain connector', lambda: connector_mesh(center, direction, radius, 4.0, segments)),
+        ('threaded connector', lambda: connector_mesh(center, direction, radius, 4.0, segments, pitch)),
+    ], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
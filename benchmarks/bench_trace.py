@@ -0,0 +1,68 @@
+"""
+Measures what timing spans cost per call, with tracing off and on.
+
+The add-in leaves span and traced in place in production, so the disabled
+path has to cost close to nothing next to a bare call.
+
+Run from the repository root:
+    python benchmarks/bench_trace.py
+"""
+import harness
+
+trace = harness.load_module('lib/fusionAddInUtils/trace_utils.py', 'trace_utils')
+
+# Calls per timed run, so the cost of the timing loop itself is spread out
+CALLS = 1000
+
+
+def work(value):
+    return value + 1
+
+
+traced_work = trace.traced('bench.traced')(work)
+
+
+def bare():
+    for i in range(CALLS):
+        work(i)
+
+
+def with_span():
+    for i in range(CALLS):
+        with trace.span('bench.span'):
+            work(i)
+
+
+def with_annotated_span():
+    for i in range(CALLS):
+        with trace.span('bench.span', dowels=3) as span:
+            work(i)
+            span.annotate(features=12)
+
+
+def with_traced():
+    for i in range(CALLS):
+        traced_work(i)
+
+
+def main():
+    args = harness.argument_parser(__doc__).parse_args()
+
+    cases = [
+        ('bare call', bare),
+        ('span', with_span),
+        ('span with args and annotate', with_annotated_span),
+        ('traced', with_traced),
+    ]
+    for enabled in (False, True):
+        trace.set_tracing(enabled)
+        results = harness.compare(f'{CALLS} calls, tracing {"on" if enabled else "off"}', cases, args.repeat)
+        base = results['bare call']
+        for name, _ in cases[1:]:
+            print(f'  {name:<36} {(results[name] - base) / CALLS * 1e9:8.0f} ns over a bare call')
+        trace.clear_spans()
+    trace.set_tracing(False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Shared helpers for the micro-benchmarks in this folder.
+
+Every benchmark is a script run from the repository root, such as
+python benchmarks/bench_solver.py. Importing this module puts lib on the
+path, so the scripts import jointUtils the same way the add-in does, and
+nothing here needs Fusion.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIB = os.path.join(ROOT, 'lib')
+if LIB not in sys.path:
+    sys.path.insert(0, LIB)
+
+
+def load_module(relative_path, name):
+    """
+    Imports one file of the add-in on its own, outside the add-in package.
+
+    The fusionAddInUtils modules read the add-in config through a relative
+    import, which fails here, so they fall back to their defaults.
+
+    Args:
+        relative_path (str): Path of the file from the repository root.
+        name (str): Name to give the module.
+
+    Returns:
+        module: The imported module.
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def argument_parser(description):
+    """
+    Creates the command line parser every benchmark starts from.
+
+    Args:
+        description (str): What the benchmark measures.
+
+    Returns:
+        argparse.ArgumentParser: Parser with --repeat and --seed.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs per case, the best one is kept.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random inputs.')
+    return parser
+
+
+def random_source(seed):
+    """
+    Args:
+        seed (int): Seed from the command line.
+
+    Returns:
+        random.Random: Generator of the inputs, so every case sees the same data.
+    """
+    return random.Random(seed)
+
+
+def random_unit(rng):
+    """
+    Args:
+        rng (random.Random): Source of the direction.
+
+    Returns:
+        tuple: (x, y, z) uniformly distributed unit vector.
+    """
+    while True:
+        x, y, z = rng.gauss(0, 1), rng.gauss(0, 1), rng.gauss(0, 1)
+        length = (x * x + y * y + z * z) ** 0.5
+        if length > 1e-9:
+            return (x / length, y / length, z / length)
+
+
+def measure(func, repeat=5):
+    """
+    Times a function with as many calls per run as fill about 0.2 seconds.
+
+    Args:
+        func (callable): Function taking no arguments.
+        repeat (int): Timing runs, the fastest one is kept.
+
+    Returns:
+        float: Seconds per call.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def format_time(seconds):
+    """
+    Args:
+        seconds (float): Duration.
+
+    Returns:
+        str: The duration in the largest unit that keeps it above one.
+    """
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:8.2f} {unit}'
+    return f'{seconds / 1e-9:8.2f} ns'
+
+
+def compare(title, cases, repeat=5):
+    """
+    Times several implementations of the same work and prints them against the first.
+
+    Args:
+        title (str): Heading of the table.
+        cases (list of tuple): (name, func) pairs, the first one is the baseline.
+        repeat (int): Timing runs per case.
+
+    Returns:
+        dict: Seconds per call by case name.
+    """
+    print(title)
+    results = {}
+    baseline = None
+    for name, func in cases:
+        seconds = measure(func, repeat)
+        results[name] = seconds
+        if baseline is None:
+            baseline = seconds
+        print(f'  {name:<36} {format_time(seconds)}  {baseline / seconds:6.2f}x')
+    return results
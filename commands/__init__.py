@@ -4,12 +4,18 @@
 # If you want to add an additional command, duplicate one of the existing directories and import it here.
 # You need to use aliases (import "entry" as "my_module") assuming you have the default module named "entry".
 from .commandDialog import entry as commandDialog
+from .materializeThreads import entry as materializeThreads
+from .refreshJoints import entry as refreshJoints
+from .scanDowelEnds import entry as scanDowelEnds
 # from .connector import entry as connector
 
 # TODO add your imported modules to this list.
 # Fusion will automatically call the start() and stop() functions.
 commands = [
     commandDialog,
+    materializeThreads,
+    refreshJoints,
+    scanDowelEnds,
     # connector,
 ]
 
@@ -1,16 +1,16 @@
-import math
+import json
+import threading
+from collections import namedtuple
+import time
 import adsk.core
 import adsk.fusion
-from copy import deepcopy
 import os
 from ...lib import fusionAddInUtils as futil
+from ...lib import jointUtils
+from ...lib.jointUtils.mesh import flatten_meshes, joint_parts
 from ... import config
 app = adsk.core.Application.get()
 ui = app.userInterface
-design = app.activeProduct
-rootComp = design.rootComponent
-newOccu = rootComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
-features = rootComp.features
 
 
 CMD_NAME = os.path.basename(os.path.dirname(__file__))
@@ -33,6 +33,40 @@ ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource
 # Holds references to event handlers
 local_handlers = []
 
+# Thread type used for caps and connectors
+THREAD_TYPE = 'ISO Metric profile'
+
+# Thread catalog, built on first use
+thread_catalog = None
+
+# Bodies of joints built so far, reused for congruent joints
+joint_templates = jointUtils.JointTemplateCache()
+
+# Exported joints shared by every document, so a congruent joint from another design is imported instead of built
+geometry_cache = (jointUtils.GeometryCache(config.geometry_cache_path, config.geometry_cache_max_mb * 1024 * 1024)
+                  if config.geometry_cache_path else None)
+
+# Extension of the cached joint files, which also picks the export format
+GEOMETRY_CACHE_SUFFIX = '.smt'
+
+# Custom event that redraws the preview once the selection has settled
+PREVIEW_EVENT_ID = f'{CMD_ID}_preview'
+
+# Plans batches of joints off the UI thread while the command waits for them
+planner = jointUtils.BackgroundPlanner()
+
+# Preview state of the open command dialog
+preview_event = None
+preview_inputs = None
+preview_timer = None
+preview_group = None
+preview_key = None
+preview_ends = {}  # Dowel end values by edge entity token, kept while the dialog is open
+preview_equations = jointUtils.NormalEquations()  # Lines of the selected ends, keyed by entity token
+
+# Dowel ends found on each body by collect_dowel_ends, reused while the body is unchanged, one cache per document
+scan_caches = jointUtils.DocumentScanCaches(config.scan_cache_documents)
+
 
 # Executed when add-in is run.
 def start():
@@ -95,7 +129,7 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 
     # Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
-    # futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
     futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
 
     button_icons = os.path.join(ICON_FOLDER, 'buttons')
@@ -113,22 +147,539 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     selection_input.addSelectionFilter('CircularEdges')
     selection_input.setSelectionLimits(1)
 
+    # Find every joint in the design instead of using the selection
+    inputs.addBoolValueInput('auto_discover_input', 'Find All Joints', True, '', False)
+
+    # Cosmetic threads keep recomputes fast while designing and are modeled later for export
+    thread_mode_input = inputs.addDropDownCommandInput('thread_mode_input', 'Threads', adsk.core.DropDownStyles.TextListDropDownStyle)
+    thread_mode_input.listItems.add('Cosmetic', config.thread_mode == 'cosmetic')
+    thread_mode_input.listItems.add('Modeled', config.thread_mode == 'modeled')
+
+    # Features keep an editable history, direct bodies skip the sketches and sweeps
+    engine_input = inputs.addDropDownCommandInput('engine_input', 'Build With', adsk.core.DropDownStyles.TextListDropDownStyle)
+    engine_input.listItems.add('Features', config.joint_engine == 'features')
+    engine_input.listItems.add('Direct Bodies', config.joint_engine == 'direct')
+
+    # Combining after the threads exist keeps the body browser and later recomputes small
+    fuse_input = inputs.addDropDownCommandInput('fuse_input', 'Combine', adsk.core.DropDownStyles.TextListDropDownStyle)
+    fuse_input.listItems.add('Separate Bodies', config.fuse_mode == 'none')
+    fuse_input.listItems.add('One Body per Joint', config.fuse_mode == 'joint')
+    fuse_input.listItems.add('One Body per Assembly', config.fuse_mode == 'assembly')
+
+    # Split a selection of many dowel ends into joints instead of treating it as one joint
+    inputs.addBoolValueInput('group_selection_input', 'Group Into Joints', True, '', False)
+
+    # Build every joint in one batch with compute deferred to the end
+    inputs.addBoolValueInput('batch_input', 'Single Edit Session', True, '', config.batch_session)
+
+    # Store each distinct joint once and place congruent joints as occurrences of it
+    inputs.addBoolValueInput('instance_input', 'Instance Repeated Joints', True, '', config.instance_joints)
+
+    # Redraws are requested from a timer thread, which can only reach the UI through a custom event
+    global preview_event, preview_inputs
+    preview_inputs = inputs
+    if config.preview_enabled:
+        preview_event = app.registerCustomEvent(PREVIEW_EVENT_ID)
+        futil.add_handler(preview_event, preview_requested, local_handlers=local_handlers)
+
+
+# This function will be called when the user changes anything in the command dialog.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    changed_input = args.input
+    inputs = args.inputs
+
+    if changed_input.id == 'auto_discover_input':
+        # The selection is not used when joints are discovered automatically
+        selection_input = inputs.itemById('selection_input')
+        selection_input.isVisible = not changed_input.value
+        selection_input.setSelectionLimits(0 if changed_input.value else 1)
+        clear_preview()
+        if preview_event and not changed_input.value:
+            schedule_preview()
+
+    if changed_input.id == 'selection_input' and preview_event:
+        schedule_preview()
+
+
+def schedule_preview():
+    """
+    Requests a preview redraw once the selection has not changed for config.preview_delay seconds.
+    """
+    global preview_timer
+    if preview_timer:
+        preview_timer.cancel()
+    preview_timer = threading.Timer(config.preview_delay, app.fireCustomEvent, (PREVIEW_EVENT_ID,))
+    preview_timer.start()
+
+
+# This function will be called on the main thread when a scheduled preview redraw is due.
+def preview_requested(args: adsk.core.CustomEventArgs):
+    if preview_inputs is None:
+        return
+    auto_discover_input = preview_inputs.itemById('auto_discover_input')
+    if not auto_discover_input.value:
+        draw_preview(preview_inputs.itemById('selection_input'))
+
+
+@futil.traced()
+def draw_preview(selection_input):
+    """
+    Draws low-poly caps and connectors for the selected dowel ends as custom graphics.
+
+    Nothing is added to the design, and the geometry of every picked end is
+    read once and kept for as long as the dialog is open.
+
+    Args:
+        selection_input (adsk.core.SelectionCommandInput): Input holding the circular edges.
+    """
+    global preview_group, preview_key
+
+    tokens = []
+    for i in range(selection_input.selectionCount):
+        edge = adsk.fusion.BRepEdge.cast(selection_input.selection(i).entity)
+        if edge is None:
+            continue
+        token = edge.entityToken
+        if token not in preview_ends:
+            geom = read_dowel_end(edge)
+            preview_ends[token] = dowel_end_values(geom) if geom else None
+        if preview_ends[token]:
+            tokens.append(token)
+
+    key = tuple(tokens)
+    if key == preview_key:
+        return
+    clear_preview()
+    preview_key = key
+
+    # A pick or unpick is a single update of the running equations
+    for token in [token for token in preview_equations.lines if token not in key]:
+        preview_equations.remove(token)
+    for token in tokens:
+        if token not in preview_equations:
+            center, normal, _ = preview_ends[token]
+            preview_equations.add(center, normal, token)
+
+    point, _ = preview_equations.solve()
+    if point is None:
+        return
+
+    centers = [preview_ends[token][0] for token in tokens]
+    radii = [preview_ends[token][2] for token in tokens]
+
+    with futil.span('preview.mesh', dowels=len(tokens)):
+        coordinates, indices = flatten_meshes(part.mesh for part in joint_parts(point, centers, radii, config.preview_segments))
+
+    with futil.span('preview.draw'):
+        preview_group = futil.ExecutionContext().root_component.customGraphicsGroups.add()
+        mesh = preview_group.addMesh(adsk.fusion.CustomGraphicsCoordinates.create(coordinates), indices, [], [])
+        mesh.color = adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(40, 140, 220, 160))
+        app.activeViewport.refresh()
+
+
+def previewed_point(selection_input):
+    """
+    Solves the running equations of the preview, if they hold exactly the selected dowel ends.
+
+    Args:
+        selection_input (adsk.core.SelectionCommandInput): Input holding the circular edges.
+
+    Returns:
+        tuple: (x, y, z) joint point, or None if the preview does not match the selection or has no point.
+    """
+    tokens = set()
+    for i in range(selection_input.selectionCount):
+        edge = adsk.fusion.BRepEdge.cast(selection_input.selection(i).entity)
+        if edge is not None:
+            tokens.add(edge.entityToken)
+    if len(tokens) < 2 or tokens != set(preview_equations.lines):
+        return None
+    return preview_equations.solve().point
+
+
+def clear_preview():
+    """
+    Removes the preview graphics, if any.
+    """
+    global preview_group, preview_key
+    if preview_group and preview_group.isValid:
+        preview_group.deleteMe()
+    preview_group = None
+    preview_key = None
+
+
+def stop_preview():
+    """
+    Stops pending redraws and removes the preview when the dialog closes.
+    """
+    global preview_event, preview_inputs, preview_timer
+    if preview_timer:
+        preview_timer.cancel()
+        preview_timer = None
+    clear_preview()
+    preview_inputs = None
+    preview_ends.clear()
+    preview_equations.clear()
+    if preview_event:
+        app.unregisterCustomEvent(PREVIEW_EVENT_ID)
+        preview_event = None
+
 
 # This function will be called when the user clicks the OK button in the command dialog.
+@futil.traced()
 def command_execute(args: adsk.core.CommandEventArgs):
 
     futil.log(f'{CMD_NAME} Command Execute Event')
     inputs = args.command.commandInputs
 
+    # The preview has already solved a hand-picked joint, so its point is reused before the preview is dropped
+    previewed = previewed_point(inputs.itemById('selection_input'))
+
+    # Only the real features are kept
+    stop_preview()
+
+    # The design and the component for the new bodies are resolved when first needed
+    ctx = futil.ExecutionContext()
+
     # Get the selection input
     selection_input = inputs.itemById('selection_input')
-    # selected_edge = selection_input.selection(0).entity
-    reverseFeat = False
+    auto_discover_input = inputs.itemById('auto_discover_input')
+    thread_mode_input = inputs.itemById('thread_mode_input')
+    is_modeled = thread_mode_input.selectedItem.name == 'Modeled'
+    engine_input = inputs.itemById('engine_input')
+    engine = 'direct' if engine_input.selectedItem.name == 'Direct Bodies' else 'features'
+    fuse_input = inputs.itemById('fuse_input')
+    fuse_mode = {'One Body per Joint': 'joint', 'One Body per Assembly': 'assembly'}.get(fuse_input.selectedItem.name, 'none')
+    group_selection = inputs.itemById('group_selection_input').value
+    batch = inputs.itemById('batch_input').value
+    instance = inputs.itemById('instance_input').value
+
+    if auto_discover_input.value:
+        ends, refs, joints = discover_joints(ctx)
+        if not joints:
+            ui.messageBox('Could not find any joints in the design.')
+            return
+        plan_and_build(ctx, ends, refs, joints, is_modeled, engine, fuse_mode, batch, instance)
+        return
+
+    circle_geometries = read_selection(selection_input)
+    if circle_geometries is None:
+        return
+
+    if group_selection:
+        ends, refs = dowel_end_set(circle_geometries)
+        joints = group_dowel_ends(ends)
+        if not joints:
+            ui.messageBox('The selected dowel ends do not form any joints.')
+            return
+        plan_and_build(ctx, ends, refs, joints, is_modeled, engine, fuse_mode, batch, instance)
+        return
+
+    if config.interference_check and find_interfering_joints(ctx, [circle_geometries]):
+        ui.messageBox('The caps and connectors of this joint would interfere or have no thread size, see the log.')
+        return
+
+    # A single joint is its own assembly
+    intersection_point = build_joint(ctx, circle_geometries, is_modeled, engine, 'none' if fuse_mode == 'none' else 'joint',
+                                     point=previewed)
+    if intersection_point:
+        # Display the point coordinates
+        x = intersection_point.x
+        y = intersection_point.y
+        z = intersection_point.z
+        ui.messageBox(f'Intersection Point:\nX: {x:.4f}\nY: {y:.4f}\nZ: {z:.4f}')
+    else:
+        ui.messageBox('Could not build the joint, see the log.')
+
+
+def plan_and_build(ctx, ends, refs, joints, is_modeled, engine, fuse_mode, batch, instance=False):
+    """
+    Plans joints, on a worker thread when config.background_planning is set, then builds them.
+
+    Only plain values go to the worker. The command waits for the plans
+    behind a cancellable progress dialog, handling UI events meanwhile,
+    closes the dialog and builds the joints itself, so the batch is still
+    built inside this command execution and stays a single undo step.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        ends (jointUtils.DowelEndSet): Geometry of the dowel ends.
+        refs (list of EndRef): Face and edge of every end, by the same index as ends.
+        joints (list of list of int): Indices of the ends in each joint.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+        engine (str): 'features' or 'direct', see build_joint.
+        fuse_mode (str): 'none', 'joint' or 'assembly'.
+        batch (bool): Share one edit session and defer compute for all joints.
+        instance (bool): Place congruent joints as occurrences of one component, see build_instance.
+    """
+    options = {
+        # The catalog needs the API, so it is loaded here and the worker only reads it.
+        # The root component's thread features are used so no generated occurrence is created yet
+        'catalog': get_thread_catalog(ctx.root_component.features.threadFeatures),
+        'interference': config.interference_check,
+        'margin': config.interference_margin,
+    }
+    if not config.background_planning:
+        with futil.span('plan', joints=len(joints)):
+            plans = jointUtils.plan_joints(snapshot_joints(ends, joints), **options)
+        build_joints(ctx, ends, refs, joints, is_modeled, engine, fuse_mode, batch, plans, instance)
+        return
+
+    futil.log(f'Planning {len(joints)} joints in the background')
+    ticket = planner.submit(snapshot_joints(ends, joints), **options)
+    progress = ui.createProgressDialog()
+    progress.isCancelButtonShown = True
+    progress.show('Planning Joints', f'Planning {len(joints)} joints', 0, 1, 1)
+    try:
+        try:
+            with futil.span('plan.wait', joints=len(joints)):
+                plans = planner.wait(ticket, adsk.doEvents, lambda: progress.wasCancelled)
+        finally:
+            # The build shows its own progress, so the planning dialog is closed first
+            progress.hide()
+    except Exception as error:
+        futil.error('Planning %d joints failed: %s', len(joints), error)
+        ui.messageBox(f'Could not plan the joints: {error}')
+        return
+    if plans is None:
+        futil.log('Planning was cancelled, no joints were built')
+        return
+    build_joints(ctx, ends, refs, joints, is_modeled, engine, fuse_mode, batch, plans, instance)
 
-    # Lists to store the lines (points and direction vectors)
-    points = []
-    directions = []
 
+def snapshot_joints(ends, joints):
+    """
+    Copies the geometry of joints into plain values that can leave the UI thread.
+
+    Args:
+        ends (jointUtils.DowelEndSet): Geometry of the dowel ends.
+        joints (list of list of int): Indices of the ends in each joint.
+
+    Returns:
+        list of list of tuple: (center, normal, radius) of every end in each joint.
+    """
+    return [ends.select(indices) for indices in joints]
+
+
+def report_conflicts(plans):
+    """
+    Logs the problems found while planning and picks the joints that must not be built.
+
+    Args:
+        plans (list of jointUtils.JointPlan): Plans from jointUtils.plan_joints.
+
+    Returns:
+        set of int: Indices of the joints with interfering parts or without a thread size.
+    """
+    blocked = set()
+    for index, plan in enumerate(plans):
+        for first, second, clearance in plan.conflicts:
+            # Every conflict between two joints is listed on both, log it once
+            if (first.joint, first.kind, first.dowel) < (second.joint, second.kind, second.dowel):
+                futil.warning('Joint %d %s %d interferes with joint %d %s %d (clearance %.3f cm)', first.joint,
+                              first.kind, first.dowel, second.joint, second.kind, second.dowel, clearance)
+            blocked.add(index)
+        if thread_catalog is not None and plan.point is not None and None in plan.sizes:
+            futil.warning('Joint %d has a dowel without a suitable thread size', index)
+            blocked.add(index)
+    return blocked
+
+
+@futil.traced()
+def build_joints(ctx, ends, refs, joints, is_modeled, engine, fuse_mode, batch, plans, instance=False):
+    """
+    Builds many joints and reports how many were created.
+
+    Everything happens inside one command execution, so the whole batch is
+    a single undo step either way. In batch mode the design is computed
+    once at the end instead of after every joint, and joints built with the
+    direct engine also share one base feature edit. Instanced joints are built into components of their
+    own, so they never share an edit session.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        ends (jointUtils.DowelEndSet): Geometry of the dowel ends.
+        refs (list of EndRef): Face and edge of every end, by the same index as ends.
+        joints (list of list of int): Indices of the ends in each joint.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+        engine (str): 'features' or 'direct', see build_joint.
+        fuse_mode (str): 'none', 'joint' or 'assembly'.
+        batch (bool): Share one edit session and defer compute for all joints.
+        plans (list of jointUtils.JointPlan): Plan of every joint.
+        instance (bool): Place congruent joints as occurrences of one component, see build_instance.
+    """
+    blocked = report_conflicts(plans)
+    unsolved = {index for index, plan in enumerate(plans) if plan.point is None}
+
+    started = time.perf_counter()
+    session = BuildSession(ctx, defer_compute=config.defer_compute, edit=engine == 'direct') if batch and not instance else None
+    if session:
+        session.start()
+
+    # Every occurrence of a joint type shares its bodies, so they can only be combined per joint
+    joint_types = {}
+    if instance and fuse_mode == 'assembly':
+        fuse_mode = 'joint'
+
+    # Failed deferred steps of the sessions opened for single joints
+    incomplete = []
+
+    def build_step(item):
+        indices, plan = item
+        # API objects are only created for the joint being built
+        circle_geometries = [circle_geometry(ends, refs, index) for index in indices]
+        if instance:
+            try:
+                return build_instance(ctx, circle_geometries, is_modeled, engine, fuse_mode, plan.point, joint_types)
+            except:
+                futil.handle_error('build_instance')
+                return None
+        joint_session = session
+        if joint_session is None:
+            joint_session = BuildSession(ctx, edit=engine == 'direct')
+            joint_session.start()
+        marker = timeline_marker(ctx, joint_session)
+        body_start = ctx.component.bRepBodies.count
+        point_start = ctx.root_component.constructionPoints.count
+        try:
+            return build_joint(ctx, circle_geometries, is_modeled, engine, fuse_mode, joint_session, plan.point)
+        except:
+            futil.handle_error('build_joint')
+            # Leave no half-built joint behind, the others are still good
+            discard_joint(ctx, body_start, point_start, marker)
+            return None
+        finally:
+            if joint_session is not session:
+                joint_session.finish()
+                incomplete.append(joint_session.failed_steps)
+
+    # Joints are built one at a time with UI events handled in between, so the dialog stays responsive and can cancel
+    queue = jointUtils.WorkQueue([(indices, plans[index]) for index, indices in enumerate(joints)
+                                  if index not in blocked and index not in unsolved], build_step)
+    progress = ui.createProgressDialog()
+    progress.isCancelButtonShown = True
+    progress.show('Building Joints', f'Building {queue.total} joints', 0, max(queue.total, 1), 1)
+
+    def show_progress(state):
+        progress.progressValue = state.done
+        rate = f'{state.throughput:.1f}' if state.throughput else '...'
+        progress.message = (f'{state.done} of {state.total} joints, {rate} joints/s, '
+                            f'{jointUtils.format_duration(state.eta)} left')
+
+    try:
+        queue.run(lambda: progress.wasCancelled, show_progress, adsk.doEvents)
+    finally:
+        progress.hide()
+        build_time = time.perf_counter() - started
+        # Joints finished before a cancel or an error are kept, so the shared session is always closed
+        if session:
+            session.finish()
+            incomplete.append(session.failed_steps)
+    built = sum(1 for result in queue.results if result)
+    failed = len(queue.results) - built
+
+    if fuse_mode == 'assembly' and built:
+        fuse_assembly(ctx)
+
+    if instance:
+        futil.info('Placed %d joints as occurrences of %d joint types', built, len(joint_types))
+
+    # Compare against a run with Single Edit Session turned off to see what the batch saves
+    futil.info('Built %d joints in %.2f s (%s): %.2f s building, %.2f s closing the edit, %.2f s computing',
+               built, time.perf_counter() - started, 'one edit session' if batch else 'one edit per joint', build_time,
+               session.finish_time if session else 0.0, session.compute_time if session else 0.0)
+
+    message = f'Created {built} of {len(joints)} joints.'
+    if queue.cancelled:
+        message += f'\nCancelled with {queue.total - queue.done} joints not started.'
+    if failed:
+        message += f'\n{failed} joints could not be built and were removed, see the log.'
+    if sum(incomplete):
+        message += f'\n{sum(incomplete)} joints are missing threads, a combine or their record, see the log.'
+    if unsolved:
+        message += f'\n{len(unsolved)} joints were skipped because their dowels are too close to parallel.'
+    if blocked:
+        message += f'\n{len(blocked)} joints were skipped because their parts would interfere or have no thread size, see the log.'
+    ui.messageBox(message)
+
+
+def timeline_marker(ctx, session):
+    """
+    Returns where a joint's timeline objects start, so they can be found again if it fails.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        session (BuildSession): Session the joint is built in, already started.
+
+    Returns:
+        tuple: (marker position, object count) of the timeline, or None in direct designs and while a base
+            feature is edited, where the joint adds no timeline features of its own.
+    """
+    design = ctx.design
+    if design.designType != adsk.fusion.DesignTypes.ParametricDesignType or session.base_feature:
+        return None
+    timeline = design.timeline
+    return timeline.markerPosition, timeline.count
+
+
+def timeline_objects_since(timeline, marker):
+    """
+    Lists the timeline objects added since a marker was taken.
+
+    New objects are inserted at the marker, which is not the end of the
+    timeline when the user rolled it back before running the command, so
+    the objects after them are the user's and are left out.
+
+    Args:
+        timeline (adsk.fusion.Timeline): Timeline of the design.
+        marker (tuple): (marker position, object count) from timeline_marker.
+
+    Returns:
+        list of adsk.fusion.TimelineObject: The new objects, in timeline order.
+    """
+    position, count = marker
+    return [timeline.item(i) for i in range(position, position + timeline.count - count)]
+
+
+def discard_joint(ctx, body_start, point_start, marker=None):
+    """
+    Deletes what a failed joint added to the design.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        body_start (int): Number of generated bodies before the joint was started.
+        point_start (int): Number of root construction points before the joint was started.
+        marker (tuple): Timeline state from timeline_marker, or None to only delete bodies and points.
+    """
+    # Only the joint's own sketches, extrudes, sweeps and threads go, from the last to the first
+    if marker is not None:
+        timeline = ctx.design.timeline
+        for timeline_object in reversed(timeline_objects_since(timeline, marker)):
+            entity = timeline_object.entity
+            if entity is not None and entity.isValid:
+                entity.deleteMe()
+        # The marker goes back to where the joint started, in front of any features the user had after it
+        timeline.markerPosition = marker[0]
+
+    bodies = ctx.component.bRepBodies
+    for i in reversed(range(body_start, bodies.count)):
+        bodies.item(i).deleteMe()
+    points = ctx.root_component.constructionPoints
+    for i in reversed(range(point_start, points.count)):
+        points.item(i).deleteMe()
+
+
+@futil.traced()
+def read_selection(selection_input):
+    """
+    Reads the dowel ends picked in the selection input.
+
+    Args:
+        selection_input (adsk.core.SelectionCommandInput): Input holding the circular edges.
+
+    Returns:
+        list of dict: Circle geometries for the selected ends, or None if a selection is invalid.
+    """
     # Store circle geometries for later use
     circle_geometries = []
 
@@ -139,10 +690,10 @@ def command_execute(args: adsk.core.CommandEventArgs):
         # Check if the selected entity is a BRepEdge
         if isinstance(selected_edge, adsk.fusion.BRepEdge):
             edge_geometry = selected_edge.geometry
-            futil.log(f'Selected edge {i} is valid')
+            futil.debug('Selected edge %d is valid', i)
             # Check if the edge geometry is a Circle3D
             if isinstance(edge_geometry, adsk.core.Circle3D):
-                futil.log(f'Selected edge {i} is a circle')
+                futil.debug('Selected edge %d is a circle', i)
                 # Check all faces associated with the edge
                 edge_faces = selected_edge.faces
 
@@ -150,7 +701,7 @@ def command_execute(args: adsk.core.CommandEventArgs):
                 for j in range(edge_faces.count):
                     edge_face = edge_faces.item(j)
                     face_eval = edge_face.geometry.surfaceType
-                    futil.log(f'Selection {i} face {j} surfaceType: {face_eval}')
+                    futil.debug('Selection %d face %d surfaceType: %s', i, j, face_eval)
                     if (face_eval == 0):
                         circle_face = edge_face
                         break
@@ -159,17 +710,14 @@ def command_execute(args: adsk.core.CommandEventArgs):
                 center_point = edge_geometry.center
                 normal_vector = face_geometries.normal
                 radius = edge_geometry.radius
-                futil.log(f'Center point: {center_point}, normal: {normal_vector}, radius: {radius}')
-                # Store the point and direction
-                points.append(center_point)
-                directions.append(normal_vector)
-
+                futil.debug('Center point: %s, normal: %s, radius: %s', center_point, normal_vector, radius)
                 # Store circle geometry for tube creation
                 circle_geometries.append({
                     'center_point': center_point,
                     'normal_vector': normal_vector,
                     'radius': radius,
-                    'circle_face': circle_face
+                    'circle_face': circle_face,
+                    'edge': selected_edge
                 })
 
 
@@ -180,88 +728,1022 @@ def command_execute(args: adsk.core.CommandEventArgs):
         else:
             ui.messageBox(f'Selected entity {i+1} is not an edge.')
             return
-    
-    # Compute the intersection point
-    ## Create as vertex (need to do)
-    
 
-    intersection_point = compute_best_intersection(points, directions)
+    return circle_geometries
+
+
+@futil.traced()
+def discover_joints(ctx):
+    """
+    Finds every dowel end in the design and groups the ends into joints.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+
+    Returns:
+        tuple: The jointUtils.DowelEndSet and EndRef list from collect_dowel_ends, and the
+            indices of the ends in each joint.
+    """
+    ends, refs = collect_dowel_ends(ctx)
+    return ends, refs, group_dowel_ends(ends)
+
+
+def group_dowel_ends(ends):
+    """
+    Groups dowel ends into joints by where their axes meet.
+
+    Args:
+        ends (jointUtils.DowelEndSet): Geometry of the ends.
+
+    Returns:
+        list of list of int: Indices of the ends in each joint.
+    """
+    with futil.span('discover.cluster', ends=len(ends)):
+        clusters = jointUtils.cluster_flat_dowel_ends(ends.flat_centers, ends.flat_normals, config.joint_search_radius,
+                                                      config.joint_axis_tolerance)
+    futil.log(f'Found {len(ends)} dowel ends in {len(clusters)} joints')
+    return [list(cluster) for cluster in clusters]
+
+
+@futil.traced()
+def collect_dowel_ends(ctx):
+    """
+    Collects the ends of every dowel in the design.
+
+    A dowel end is a planar face bounded by a single circular edge that is
+    shared with a cylindrical face of the same radius. Bodies created by this
+    add-in are skipped.
+
+    Geometry is copied into plain floats as it is read, so a scan of
+    thousands of ends keeps no API point or vector objects alive. When
+    config.scan_cache is set, the ends of a body are kept in scan_cache
+    under its entity token, and bodies whose fingerprint did not change
+    since the last scan are not walked again. Every document has its own
+    cache, see document_scan_cache.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+
+    Returns:
+        tuple: jointUtils.DowelEndSet with an outward normal for every end, and the EndRef of
+            every end by the same index.
+    """
+    root_component = ctx.root_component
+    bodies = list(root_component.bRepBodies)
+    for occurrence in root_component.allOccurrences:
+        if futil.is_generated_component(occurrence.component):
+            continue
+        bodies.extend(occurrence.bRepBodies)
+
+    scan_cache = document_scan_cache(ctx)
+    if not config.scan_cache:
+        scan_cache.clear()
+    scan_cache.begin()
+
+    ends = jointUtils.DowelEndSet()
+    refs = []
+    for body in bodies:
+        # Bodies seen through occurrences are proxies with their own tokens and boxes in root space
+        token = body.entityToken
+        fingerprint = read_body_fingerprint(body)
+        body_ends = scan_cache.get(token, fingerprint)
+        if body_ends is None:
+            body_ends = scan_body(body)
+            if config.scan_cache:
+                scan_cache.put(token, fingerprint, body_ends)
+
+        for face_index, center, normal, radius in body_ends:
+            ends.add(center, normal, radius)
+            refs.append(EndRef(body, face_index))
+
+    scan_cache.prune()
+    stats = scan_cache.stats
+    futil.log(f'Scanned {stats.scanned} of {stats.bodies} bodies, reused {stats.reused}, found {len(ends)} dowel ends')
+    return ends, refs
+
+
+def document_scan_cache(ctx):
+    """
+    Returns the scan cache of the document a command runs in.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+
+    Returns:
+        jointUtils.ScanCache: The cache, holding the stats of the document's last scan.
+    """
+    return scan_caches.get(ctx.design.parentDocument.creationId)
+
+
+def read_body_fingerprint(body):
+    """
+    Reads the values jointUtils.body_fingerprint needs from a body.
+
+    Args:
+        body (adsk.fusion.BRepBody): The body.
+
+    Returns:
+        tuple: The fingerprint.
+    """
+    box = body.boundingBox
+    low = box.minPoint
+    high = box.maxPoint
+    return jointUtils.body_fingerprint(body.faces.count, body.edges.count, body.vertices.count,
+                                       (low.x, low.y, low.z), (high.x, high.y, high.z))
+
+
+def scan_body(body):
+    """
+    Finds the dowel ends of one body, see collect_dowel_ends.
+
+    Args:
+        body (adsk.fusion.BRepBody): The body.
+
+    Returns:
+        list of tuple: (face index, center, normal, radius) of every end.
+    """
+    body_ends = []
+    for face_index, face in enumerate(body.faces):
+        if face.geometry.surfaceType != adsk.core.SurfaceTypes.PlaneSurfaceType:
+            continue
+        if face.loops.count != 1 or face.edges.count != 1:
+            continue
+
+        edge = face.edges.item(0)
+        circle = edge.geometry
+        if not isinstance(circle, adsk.core.Circle3D):
+            continue
+
+        is_dowel = False
+        for side_face in edge.faces:
+            side_geometry = side_face.geometry
+            if isinstance(side_geometry, adsk.core.Cylinder) and abs(side_geometry.radius - circle.radius) < 0.001:
+                is_dowel = True
+        if not is_dowel:
+            continue
+
+        # The face evaluator normal points out of the body
+        center = circle.center
+        _, normal_vector = face.evaluator.getNormalAtPoint(center)
+        body_ends.append((face_index, (center.x, center.y, center.z),
+                          (normal_vector.x, normal_vector.y, normal_vector.z), circle.radius))
+    return body_ends
+
+
+class EndRef:
+    """
+    Face and circular edge of a dowel end, looked up from the body only when first used.
+
+    Ends taken from the scan cache only know the index of their face, and
+    most of them are never built, so nothing is read until a joint needs it.
+    """
+
+    __slots__ = ('body', 'face_index', '_face', '_edge')
+
+    def __init__(self, body, face_index, face=None, edge=None):
+        """
+        Args:
+            body (adsk.fusion.BRepBody): Body holding the end, or None when face is given.
+            face_index (int): Index of the end face in body.faces, or None when face is given.
+            face (adsk.fusion.BRepFace): The end face, when already known.
+            edge (adsk.fusion.BRepEdge): The circular edge around it, when already known.
+        """
+        self.body = body
+        self.face_index = face_index
+        self._face = face
+        self._edge = edge
+
+    @property
+    def face(self):
+        """The planar end face."""
+        if self._face is None:
+            self._face = self.body.faces.item(self.face_index)
+        return self._face
+
+    @property
+    def edge(self):
+        """The circular edge around the end face."""
+        if self._edge is None:
+            self._edge = self.face.edges.item(0)
+        return self._edge
+
+
+def dowel_end_set(circle_geometries):
+    """
+    Copies circle geometries into the form collect_dowel_ends returns.
+
+    Args:
+        circle_geometries (list of dict): Circle geometries of the ends.
+
+    Returns:
+        tuple: jointUtils.DowelEndSet and the EndRef of every end by the same index.
+    """
+    ends = jointUtils.DowelEndSet()
+    refs = []
+    for geom in circle_geometries:
+        ends.add(*dowel_end_values(geom))
+        refs.append(EndRef(None, None, geom['circle_face'], geom.get('edge')))
+    return ends, refs
+
+
+def circle_geometry(ends, refs, index):
+    """
+    Creates the circle geometry build_joint takes for one end of a DowelEndSet.
+
+    Args:
+        ends (jointUtils.DowelEndSet): Geometry of the ends.
+        refs (list of EndRef): Face and edge of every end, by the same index as ends.
+        index (int): Index of the end.
+
+    Returns:
+        dict: Circle geometry with an outward normal.
+    """
+    center, normal, radius = ends.values(index)
+    ref = refs[index]
+    return {
+        'center_point': adsk.core.Point3D.create(*center),
+        'normal_vector': adsk.core.Vector3D.create(*normal),
+        'radius': radius,
+        'circle_face': ref.face,
+        'edge': ref.edge
+    }
+
+
+def read_dowel_end(edge):
+    """
+    Reads the current geometry of a dowel end from its circular edge.
+
+    Args:
+        edge (adsk.fusion.BRepEdge): Circular edge around the end face.
+
+    Returns:
+        dict: Circle geometry with an outward normal, or None if the edge no longer bounds a planar end.
+    """
+    circle = edge.geometry
+    if not isinstance(circle, adsk.core.Circle3D):
+        return None
+    for face in edge.faces:
+        if face.geometry.surfaceType == adsk.core.SurfaceTypes.PlaneSurfaceType:
+            _, normal_vector = face.evaluator.getNormalAtPoint(circle.center)
+            return {
+                'center_point': circle.center,
+                'normal_vector': normal_vector,
+                'radius': circle.radius,
+                'circle_face': face,
+                'edge': edge
+            }
+    return None
+
+
+def dowel_end_values(geom):
+    """
+    Converts the geometry of a dowel end into plain values for jointUtils.
+
+    Args:
+        geom (dict): Circle geometry of the end.
+
+    Returns:
+        tuple: ((x, y, z) center, (x, y, z) normal, radius).
+    """
+    center = geom['center_point']
+    normal = geom['normal_vector']
+    return (center.x, center.y, center.z), (normal.x, normal.y, normal.z), geom['radius']
+
+
+def record_joint(circle_geometries, outputs, is_modeled, engine, fuse=False, instance=False):
+    """
+    Tags the bodies and point of a joint with the dowel ends and options it was built from.
+
+    The refresh command reads the tags back to rebuild only joints whose ends changed.
+
+    Args:
+        circle_geometries (list of dict): Circle geometries of the dowel ends in the joint.
+        outputs (list): Bodies, construction point, sketches and features created for the joint.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+        engine (str): Engine the joint was built with.
+        fuse (bool): Whether the joint's bodies were combined into one.
+        instance (bool): Whether the joint was placed as an occurrence of its joint type.
+    """
+    edges = [geom.get('edge') for geom in circle_geometries]
+    if None in edges:
+        return
+    # Geometry is read again with read_dowel_end so it matches what a refresh reads, whatever produced the selection
+    ends = [read_dowel_end(edge) for edge in edges]
+    if None in ends:
+        return
+    tokens = [edge.entityToken for edge in edges]
+    record = jointUtils.make_joint_record(tokens, [dowel_end_values(geom) for geom in ends], {'modeled': is_modeled, 'engine': engine, 'fuse': fuse, 'instance': instance})
+    value = jointUtils.encode_joint_record(record)
+    for entity in outputs:
+        entity.attributes.add(config.attribute_group, config.joint_attribute, value)
+
+
+@futil.traced()
+def find_interfering_joints(ctx, joints):
+    """
+    Plans the caps and connectors of joints as capsules and finds the joints that must not be built.
+
+    Nothing is built, so conflicts are found before any feature exists.
+    Every conflict is logged with its clearance.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        joints (list of list of dict): Circle geometries of the ends in each joint.
+
+    Returns:
+        set of int: Indices of the joints with interfering parts or without a thread size, see report_conflicts.
+    """
+    values = [[dowel_end_values(geom) for geom in circle_geometries] for circle_geometries in joints]
+    catalog = get_thread_catalog(ctx.root_component.features.threadFeatures)
+    plans = jointUtils.plan_joints(values, catalog=catalog, margin=config.interference_margin)
+    return report_conflicts(plans)
+
+
+class BuildSession:
+    """
+    The edit state shared by the joints built together, and the steps that must wait until it is closed.
+
+    The direct engine adds its bodies inside one base feature edit. Threads
+    and combines are timeline features, so they cannot be added while the
+    base feature is being edited. Each joint defers them with defer, and
+    finish runs them after the edit is closed. The steps run from the last
+    joint to the first, so combining one joint's bodies never shifts the
+    body indices of a joint that is still waiting.
+
+    The features engine builds timeline features, which cannot go into a
+    base feature, so its sessions open no edit. Its threads are added as
+    each joint is built, and only the combine and the record are deferred.
+    """
+
+    def __init__(self, ctx, defer_compute=False, edit=True):
+        """
+        Args:
+            ctx (futil.ExecutionContext): Context of the running command.
+            defer_compute (bool): Defer the design compute until finish.
+            edit (bool): Open a base feature edit, for joints built with the direct engine.
+        """
+        self.ctx = ctx
+        self.defer_compute = defer_compute
+        self.edit = edit
+        self.compute_deferred = False
+        self.base_feature = None
+        self.deferred = []
+        self.failed_steps = 0
+        self.finish_time = 0.0
+        self.compute_time = 0.0
+
+    def start(self):
+        """
+        Defers compute and opens the base feature edit if asked to, in parametric designs only.
+        """
+        design = self.ctx.design
+        if design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+            return
+        if self.defer_compute:
+            design.isComputeDeferred = True
+            self.compute_deferred = True
+        if self.edit:
+            self.base_feature = self.ctx.component.features.baseFeatures.add()
+            self.base_feature.startEdit()
+
+    def defer(self, step):
+        """
+        Queues a step to run once the edit is closed.
+
+        Args:
+            step (callable): Function taking no arguments.
+        """
+        self.deferred.append(step)
+
+    def finish(self):
+        """
+        Closes the edit, runs the deferred steps and computes the design once.
+
+        A step that raises is logged and counted in failed_steps, and the
+        remaining steps still run. Compute is turned back on even if closing
+        the edit fails.
+        """
+        started = time.perf_counter()
+        steps, self.deferred = self.deferred, []
+        try:
+            with futil.span('session.finish', steps=len(steps)):
+                if self.base_feature:
+                    self.base_feature.finishEdit()
+                for step in reversed(steps):
+                    try:
+                        step()
+                    except:
+                        # Only this joint misses its threads, combine or record
+                        futil.handle_error('session.finish')
+                        self.failed_steps += 1
+        finally:
+            self.finish_time = time.perf_counter() - started
+            if self.compute_deferred:
+                self.compute_deferred = False
+                started = time.perf_counter()
+                with futil.span('session.compute'):
+                    self.ctx.design.isComputeDeferred = False
+                self.compute_time = time.perf_counter() - started
+
+
+@futil.traced()
+def build_joint(ctx, circle_geometries, is_modeled, engine, fuse='none', session=None, point=None, record_on=None):
+    """
+    Creates the caps and connector tubes for one joint.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        circle_geometries (list of dict): Circle geometries of the dowel ends in the joint.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+        engine (str): 'features' to build with sketches, extrudes and sweeps or 'direct' for transient bodies.
+        fuse (str): 'joint' to combine the joint's caps and connectors into a single body, 'assembly' when
+            fuse_assembly will combine every joint afterwards, or 'none'.
+        session (BuildSession): Edit session shared with other joints, or None to open and close one for this joint.
+            It must have been created with edit=True for the direct engine.
+        point (tuple): (x, y, z) joint point from a plan, or None to solve for it here.
+        record_on (list): Occurrence of an instanced joint to tag with the joint record instead of the bodies,
+            or None.
+
+    Returns:
+        adsk.core.Point3D: The joint point, or None if the joint could not be built.
+    """
+    if point is not None:
+        intersection_point = adsk.core.Point3D.create(point[0], point[1], point[2])
+    else:
+        points = [geom['center_point'] for geom in circle_geometries]
+        directions = [geom['normal_vector'] for geom in circle_geometries]
+
+        # Compute the intersection point
+        intersection_point = compute_best_intersection(points, directions)
 
 
     if intersection_point:
         cap_collection = adsk.core.ObjectCollection.create()
         connector_collection = adsk.core.ObjectCollection.create()
-        newComp = newOccu.component
-        baseFeat = None
-        if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
-            baseFeat = newComp.features.baseFeatures.add()
-            baseFeat.startEdit()
-
-        # Create a construction point at the intersection
-        points_collection = rootComp.constructionPoints
-        # brepBodyDef = adsk.fusion.BRepBodyDefinition.create()
-        # intersection_point = brepBodyDef.createVertexDefinition(intersection_point)
-        # pointInput = rootComp.constructionPoints.createInput()
-        # construct_point = pointInput.setByPoint(intersection_point)
-        # rootComp.constructionPoints.add(pointInput)
-        pointInput = points_collection.createInput()
-        pointInput.setByPoint(intersection_point)
-        points_collection.add(pointInput)
-        for geom in circle_geometries:
-            size = create_cap(geom, newComp, cap_collection)
-            create_tube(geom, intersection_point, newComp, size, connector_collection)
+        newComp = ctx.component
+        timeline = ctx.design.timeline if ctx.design.designType == adsk.fusion.DesignTypes.ParametricDesignType else None
+        timeline_count = timeline.count if timeline else 0
+        timeline_start = (timeline.markerPosition, timeline_count) if timeline else None
+        own_session = session is None
+        with futil.span('joint.build', engine=engine, dowels=len(circle_geometries)) as joint_span:
+            if own_session:
+                session = BuildSession(ctx, edit=engine == 'direct')
+                session.start()
+            baseFeat = session.base_feature
+            marker = timeline_marker(ctx, session)
+            body_start = newComp.bRepBodies.count
+            sketch_start = newComp.sketches.count
+
+            # Create a construction point at the intersection
+            points_collection = ctx.root_component.constructionPoints
+            point_start = points_collection.count
+            # brepBodyDef = adsk.fusion.BRepBodyDefinition.create()
+            # intersection_point = brepBodyDef.createVertexDefinition(intersection_point)
+            # pointInput = rootComp.constructionPoints.createInput()
+            # construct_point = pointInput.setByPoint(intersection_point)
+            # rootComp.constructionPoints.add(pointInput)
+            pointInput = points_collection.createInput()
+            pointInput.setByPoint(intersection_point)
+            with futil.span('joint.point'):
+                construction_point = points_collection.add(pointInput)
+
+            # Copies of transient bodies cannot carry cosmetic threads, so only modeled joints are cached
+            template = None
+            thread_specs = None
+            if is_modeled and engine == 'features':
+                point = (intersection_point.x, intersection_point.y, intersection_point.z)
+                centers = [(geom['center_point'].x, geom['center_point'].y, geom['center_point'].z) for geom in circle_geometries]
+                radii = [geom['radius'] for geom in circle_geometries]
+                signature, order = jointUtils.joint_signature(point, centers, radii)
+                frame = jointUtils.joint_frame(point, centers, order)
+                template = joint_templates.get(signature)
+                futil.debug('Joint template hit rate: %.2f', joint_templates.hit_rate)
+                if geometry_cache is not None:
+                    cache_key = geometry_cache_key(newComp, signature, order, radii)
+                    if template is None:
+                        template = load_cached_joint(cache_key)
+                        if template:
+                            joint_templates.put(signature, template)
+
+            built = True
+            if template:
+                place_joint_template(template, frame, newComp, baseFeat)
+            elif engine == 'direct':
+                thread_specs = create_joint_direct(circle_geometries, intersection_point, newComp, baseFeat)
+                built = thread_specs is not None
+            else:
+                for geom in circle_geometries:
+                    size = create_cap(geom, newComp, cap_collection, is_modeled)
+                    if size is None or create_tube(geom, intersection_point, newComp, size, connector_collection,
+                                                   is_modeled) is None:
+                        built = False
+                        break
 
-        if baseFeat:
-            baseFeat.finishEdit()
+                if is_modeled and built:
+                    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+                    bodies = [temp_brep.copy(body) for body in list(cap_collection) + list(connector_collection)]
+                    joint_templates.put(signature, {'bodies': bodies, 'frame': frame})
+                    if geometry_cache is not None:
+                        store_cached_joint(cache_key, bodies, frame)
+
+            # A joint that could not be built is removed and never recorded, so it is not mistaken for a good one
+            if not built:
+                discard_joint(ctx, body_start, point_start, marker)
+                if own_session:
+                    session.finish()
+                return None
+
+            # Bodies are only ever added to the generated component, so the joint's are the last ones
+            body_end = newComp.bRepBodies.count
+            features = added_features(ctx, newComp, timeline_start, sketch_start)
+
+            def finish_joint():
+                finish_start = (timeline.markerPosition, timeline.count) if timeline else None
+                outputs = [newComp.bRepBodies.item(i) for i in range(body_start, body_end)]
+
+                # Threads are features, so they go on the direct bodies once the base feature is closed.
+                # Only this joint's bodies are searched, since a shared edit holds the bodies of the whole batch.
+                if thread_specs:
+                    thread_direct_joint(newComp, outputs, thread_specs, is_modeled)
+
+                # Every thread exists by now, so one combine can take all of the joint's bodies
+                if fuse == 'joint' and len(outputs) > 1:
+                    outputs = [fuse_bodies(newComp, outputs)]
+
+                # Combining the assembly would keep the record of only one joint, so none are kept
+                if fuse != 'assembly':
+                    # The features of an instanced joint belong to its joint type, which other joints still use
+                    if record_on is not None:
+                        tagged = record_on
+                    else:
+                        tagged = outputs + features + added_features(ctx, newComp, finish_start, newComp.sketches.count)
+                    record_joint(circle_geometries, tagged + [construction_point], is_modeled, engine, fuse == 'joint',
+                                 record_on is not None)
+
+            session.defer(finish_joint)
+            if own_session:
+                session.finish()
+
+        feature_count = (timeline.count if timeline else 0) - timeline_count
+        joint_span.annotate(features=feature_count)
+        futil.debug('Joint built with the %s engine using %d timeline features', engine, feature_count)
+
+    return intersection_point
+
+
+def added_features(ctx, newComp, timeline_start, sketch_start):
+    """
+    Collects the sketches and features a joint added, so a refresh can delete them with its bodies.
 
-        # Display the point coordinates
-        x = intersection_point.x
-        y = intersection_point.y
-        z = intersection_point.z
-        ui.messageBox(f'Intersection Point:\nX: {x:.4f}\nY: {y:.4f}\nZ: {z:.4f}')
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        newComp (adsk.fusion.Component): Component receiving the joint.
+        timeline_start (tuple): (marker position, object count) of the timeline before the joint was started,
+            or None in direct designs.
+        sketch_start (int): Number of sketches in the component before the joint was started.
+
+    Returns:
+        list: Entities of the new timeline objects in parametric designs, or the new sketches in direct
+            designs, which keep no features.
+    """
+    if timeline_start is not None:
+        entities = [timeline_object.entity for timeline_object in timeline_objects_since(ctx.design.timeline, timeline_start)]
+        return [entity for entity in entities if entity is not None]
+    sketches = newComp.sketches
+    return [sketches.item(i) for i in range(sketch_start, sketches.count)]
+
+
+# A component holding one built joint, with the frame it was built in and its dowel directions in that frame
+JointType = namedtuple('JointType', ['component', 'frame', 'reference'])
+
+
+@futil.traced()
+def build_instance(ctx, circle_geometries, is_modeled, engine, fuse, point, joint_types):
+    """
+    Places a joint as an occurrence of the component of its joint type, building the type on first use.
+
+    The first joint of a type is built into a new component whose occurrence
+    has no transform, so its bodies sit where that joint is. Every other
+    joint of the type is a new occurrence of the same component, moved by
+    the transform that fits the type's dowel directions onto its own, so the
+    bodies and threads are stored and computed once however often they are
+    used. Later joints only get an occurrence, without a construction point.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        circle_geometries (list of dict): Circle geometries of the dowel ends in the joint.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+        engine (str): 'features' or 'direct', see build_joint.
+        fuse (str): 'joint' to combine the bodies of the type, or 'none'.
+        point (tuple): (x, y, z) joint point from a plan.
+        joint_types (dict): JointType by key, shared by the joints built in one command.
+
+    Returns:
+        adsk.core.Point3D: The joint point, or None if the joint could not be built.
+    """
+    centers = [(geom['center_point'].x, geom['center_point'].y, geom['center_point'].z) for geom in circle_geometries]
+    radii = [geom['radius'] for geom in circle_geometries]
+    signature, order = jointUtils.joint_signature(point, centers, radii)
+    key = jointUtils.joint_cache_key(signature, [], modeled=is_modeled, engine=engine, fuse=fuse)
+
+    joint_type = joint_types.get(key) or find_joint_type(ctx, key)
+    if joint_type is None:
+        occurrence = ctx.component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+        component = occurrence.component
+        component.name = f'Joint Type {len(joint_types) + 1}'
+        # Scans skip generated components, so the caps of a type are never mistaken for dowels
+        futil.mark_generated_component(component)
+        try:
+            built = build_joint(futil.ExecutionContext(occurrence), circle_geometries, is_modeled, engine, fuse,
+                                point=point, record_on=[occurrence])
+        except:
+            occurrence.deleteMe()
+            raise
+        if not built:
+            occurrence.deleteMe()
+            return None
+
+        frame = jointUtils.joint_frame(point, centers, order)
+        joint_type = JointType(component, frame, jointUtils.frame_directions(point, centers, order, frame))
+        component.attributes.add(config.attribute_group, config.joint_type_attribute,
+                                 json.dumps({'key': key, 'frame': frame, 'reference': joint_type.reference}))
     else:
-        ui.messageBox('Could not find an intersection point.')
+        frame = jointUtils.fit_joint_frame(point, centers, order, joint_type.reference)
+        matrix = adsk.core.Matrix3D.create()
+        matrix.setWithArray(jointUtils.frame_to_frame_matrix(joint_type.frame, frame))
+        occurrence = ctx.component.occurrences.addExistingComponent(joint_type.component, matrix)
+        record_joint(circle_geometries, [occurrence], is_modeled, engine, fuse == 'joint', True)
+
+    joint_types[key] = joint_type
+    return adsk.core.Point3D.create(point[0], point[1], point[2])
+
+
+def find_joint_type(ctx, key):
+    """
+    Finds a joint type built by an earlier command in the design.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        key (str): Key of the joint type, see build_instance.
+
+    Returns:
+        JointType: The joint type, or None if the design has none with this key.
+    """
+    for attribute in ctx.design.findAttributes(config.attribute_group, config.joint_type_attribute):
+        component = adsk.fusion.Component.cast(attribute.parent)
+        if component is None or not component.isValid:
+            continue
+        try:
+            data = json.loads(attribute.value)
+        except ValueError:
+            continue
+        if data.get('key') == key:
+            frame = tuple(tuple(axis) for axis in data['frame'])
+            return JointType(component, frame, [tuple(direction) for direction in data['reference']])
+    return None
+
+
+@futil.traced()
+def fuse_bodies(newComp, bodies):
+    """
+    Joins bodies into the first one with a single combine feature.
+
+    Args:
+        newComp (adsk.fusion.Component): Component holding the bodies.
+        bodies (list of adsk.fusion.BRepBody): Bodies to join, at least two.
+
+    Returns:
+        adsk.fusion.BRepBody: The joined body.
+    """
+    tools = adsk.core.ObjectCollection.create()
+    for body in bodies[1:]:
+        tools.add(body)
+
+    combines = newComp.features.combineFeatures
+    combine_input = combines.createInput(bodies[0], tools)
+    combine_input.operation = adsk.fusion.FeatureOperations.JoinFeatureOperation
+    combine_input.isKeepToolBodies = False
+    with futil.span('joint.fuse', bodies=len(bodies)):
+        combines.add(combine_input)
+    return bodies[0]
+
+
+@futil.traced()
+def fuse_assembly(ctx):
+    """
+    Combines every body generated by this execution into one, after all joints are built.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+    """
+    newComp = ctx.component
+    bodies = list(newComp.bRepBodies)
+    if len(bodies) > 1:
+        fuse_bodies(newComp, bodies)
+
+
+@futil.traced()
+def create_joint_direct(circle_geometries, intersection_point, newComp, baseFeat):
+    """
+    Builds the caps and connectors of a joint as transient bodies and commits them in one add.
+
+    Every cap is a solid cylinder with the dowel bored out of it, every
+    connector a solid cylinder from behind the cap to the joint point with a
+    bore for the cap. The connectors are united first so no connector fills
+    another's bore, then the bores are cut and the caps added.
+
+    Args:
+        circle_geometries (list of dict): Circle geometries of the dowel ends in the joint.
+        intersection_point (adsk.core.Point3D): The joint point.
+        newComp (adsk.fusion.Component): Component that receives the body.
+        baseFeat (adsk.fusion.BaseFeature): Base feature being edited, or None for direct designs.
+
+    Returns:
+        list of tuple: (role, radius, center, direction, size) of every face to thread, or None if a dowel has
+            no thread size and nothing was added.
+    """
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+    difference = adsk.fusion.BooleanTypes.DifferenceBooleanType
+    union = adsk.fusion.BooleanTypes.UnionBooleanType
+
+    # Small extension so cutting tools never share a face with the body they cut
+    extra = 0.01
+
+    connectors = None
+    bores = []
+    caps = []
+    thread_specs = []
+    for geom in circle_geometries:
+        center_point = geom['center_point']
+        radius = geom['radius']
+        direction_vector = center_point.vectorTo(intersection_point)
+        direction_vector.normalize()
+
+        def along(distance):
+            point = center_point.copy()
+            offset = direction_vector.copy()
+            offset.scaleBy(distance)
+            point.translateBy(offset)
+            return point
+
+        size = match_thread_size(newComp, jointUtils.cap_outer_radius(radius))
+        if size is None:
+            # Logged rather than shown, so a batch reports its failures once at the end
+            futil.warning('Could not find a thread size for a %.1f mm cap', jointUtils.cap_outer_radius(radius) * 20)
+            return None
+
+        with futil.span('direct.cap'):
+            cap_radius = jointUtils.cap_outer_radius(radius)
+            cap = temp_brep.createCylinderOrCone(along(-jointUtils.CAP_HEIGHT), cap_radius, along(jointUtils.OVERLAP_AMOUNT), cap_radius)
+            dowel = temp_brep.createCylinderOrCone(along(-jointUtils.CAP_HEIGHT - extra), radius, center_point, radius)
+            temp_brep.booleanOperation(cap, dowel, difference)
+            caps.append(cap)
+
+        with futil.span('direct.connector'):
+            connector_radius = jointUtils.connector_outer_radius(radius)
+            bore_radius = jointUtils.connector_bore_radius(radius)
+            connector = temp_brep.createCylinderOrCone(along(-jointUtils.CONNECTOR_OFFSET), connector_radius, intersection_point, connector_radius)
+            bores.append(temp_brep.createCylinderOrCone(along(-jointUtils.CONNECTOR_OFFSET - extra), bore_radius, along(jointUtils.OVERLAP_AMOUNT + jointUtils.THREAD_CLEARANCE), bore_radius))
+            if connectors is None:
+                connectors = connector
+            else:
+                temp_brep.booleanOperation(connectors, connector, union)
 
-def create_cap(circle_geom, newComp, cap_collection):
+        thread_specs.append(('cap', cap_radius, center_point, direction_vector, size))
+        thread_specs.append(('connector', bore_radius, center_point, direction_vector, size))
+
+    with futil.span('direct.boolean'):
+        for bore in bores:
+            temp_brep.booleanOperation(connectors, bore, difference)
+        # The bores leave a gap around every cap, so each cap stays its own lump
+        for cap in caps:
+            temp_brep.booleanOperation(connectors, cap, union)
+
+    with futil.span('direct.add'):
+        if baseFeat:
+            newComp.bRepBodies.add(connectors, baseFeat)
+        else:
+            newComp.bRepBodies.add(connectors)
+
+    return thread_specs
+
+
+@futil.traced()
+def thread_direct_joint(newComp, bodies, thread_specs, is_modeled):
+    """
+    Threads the caps and connector bores of a joint built by create_joint_direct.
+
+    Args:
+        newComp (adsk.fusion.Component): Component that receives the thread features.
+        bodies (list of adsk.fusion.BRepBody): Bodies of the joint.
+        thread_specs (list of tuple): Faces to thread, as returned by create_joint_direct.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+    """
+    for role, radius, center_point, direction_vector, size in thread_specs:
+        face = find_cylinder_face(bodies, radius, center_point, direction_vector)
+        if face is None:
+            futil.warning('Could not find the %s face to thread', role)
+            continue
+        add_thread(newComp, face, size, role == 'connector', is_modeled, role)
+
+
+def find_cylinder_face(bodies, radius, axis_point, axis_direction):
+    """
+    Finds the cylindrical face with a given radius on a given axis.
+
+    Args:
+        bodies (list of adsk.fusion.BRepBody): Bodies to search.
+        radius (float): Radius of the face.
+        axis_point (adsk.core.Point3D): A point on the axis.
+        axis_direction (adsk.core.Vector3D): Unit direction of the axis.
+
+    Returns:
+        adsk.fusion.BRepFace: The face, or None if there is none.
+    """
+    for body in bodies:
+        for face in body.faces:
+            cylinder = face.geometry
+            if not isinstance(cylinder, adsk.core.Cylinder) or abs(cylinder.radius - radius) > 0.001:
+                continue
+            if not cylinder.axis.isParallelTo(axis_direction):
+                continue
+            # Distance from the point to the face's axis
+            offset = cylinder.origin.vectorTo(axis_point)
+            along = offset.dotProduct(cylinder.axis) / cylinder.axis.length
+            if offset.length ** 2 - along ** 2 < 1e-6:
+                return face
+    return None
+
+
+@futil.traced()
+def place_joint_template(template, frame, newComp, baseFeat):
+    """
+    Adds copies of a cached joint's bodies, moved onto a congruent joint.
+
+    Args:
+        template (dict): Cached 'bodies' and the 'frame' they were built in.
+        frame (tuple): Frame of the joint being placed, from jointUtils.joint_frame.
+        newComp (adsk.fusion.Component): Component that receives the bodies.
+        baseFeat (adsk.fusion.BaseFeature): Base feature being edited, or None to open one here if the design
+            is parametric.
+    """
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+    matrix = adsk.core.Matrix3D.create()
+    matrix.setWithArray(jointUtils.frame_to_frame_matrix(template['frame'], frame))
+
+    # Sessions of the features engine open no edit, but a parametric design only takes bodies inside one
+    own_edit = baseFeat is None and newComp.parentDesign.designType == adsk.fusion.DesignTypes.ParametricDesignType
+    if own_edit:
+        baseFeat = newComp.features.baseFeatures.add()
+        baseFeat.startEdit()
+
+    for body in template['bodies']:
+        body_copy = temp_brep.copy(body)
+        temp_brep.transform(body_copy, matrix)
+        if baseFeat:
+            newComp.bRepBodies.add(body_copy, baseFeat)
+        else:
+            newComp.bRepBodies.add(body_copy)
+
+    if own_edit:
+        baseFeat.finishEdit()
+
+
+def geometry_cache_key(newComp, signature, order, radii):
+    """
+    Computes the key of a modeled joint in the geometry cache.
+
+    Args:
+        newComp (adsk.fusion.Component): Component receiving the joint, whose thread features load the catalog.
+        signature (tuple): Signature from jointUtils.joint_signature.
+        order (list of int): Canonical dowel order from jointUtils.joint_signature.
+        radii (list of float): Radius of every dowel.
+
+    Returns:
+        str: The key.
+    """
+    catalog = get_thread_catalog(newComp.features.threadFeatures)
+    sizes = [catalog.nearest(jointUtils.cap_outer_radius(radii[i]) * 2 * 10) for i in order]
+    return jointUtils.joint_cache_key(signature, [size.designation if size else None for size in sizes],
+                                      format=GEOMETRY_CACHE_SUFFIX, thread_type=THREAD_TYPE)
+
+
+@futil.traced()
+def load_cached_joint(key):
+    """
+    Imports the bodies of a joint from the geometry cache.
+
+    Args:
+        key (str): Key from geometry_cache_key.
+
+    Returns:
+        dict: Template with the transient 'bodies' and the canonical 'frame' they are stored in,
+            or None if the joint is not cached.
+    """
+    path = geometry_cache.get(key, GEOMETRY_CACHE_SUFFIX)
+    futil.debug('Geometry cache hit rate: %.2f', geometry_cache.hit_rate)
+    if path is None:
+        return None
+    try:
+        bodies = adsk.fusion.TemporaryBRepManager.get().createFromFile(path)
+    except:
+        futil.handle_error('load_cached_joint')
+        return None
+    if not bodies or bodies.count == 0:
+        return None
+    return {'bodies': list(bodies), 'frame': jointUtils.CANONICAL_FRAME}
+
+
+@futil.traced()
+def store_cached_joint(key, bodies, frame):
+    """
+    Exports the bodies of a joint to the geometry cache, moved into the canonical frame.
+
+    A joint that cannot be stored is still built, so errors are only logged.
+
+    Args:
+        key (str): Key from geometry_cache_key.
+        bodies (list of adsk.fusion.BRepBody): Transient bodies of the joint.
+        frame (tuple): Frame the bodies were built in, from jointUtils.joint_frame.
+    """
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+    matrix = adsk.core.Matrix3D.create()
+    matrix.setWithArray(jointUtils.frame_to_frame_matrix(frame, jointUtils.CANONICAL_FRAME))
+    canonical = []
+    for body in bodies:
+        body_copy = temp_brep.copy(body)
+        temp_brep.transform(body_copy, matrix)
+        canonical.append(body_copy)
+    try:
+        geometry_cache.put(key, GEOMETRY_CACHE_SUFFIX, lambda path: temp_brep.exportToFile(canonical, path))
+    except:
+        futil.handle_error('store_cached_joint')
+        return
+    # Only the counters the cache keeps in memory, since this runs for every new joint type
+    futil.debug('Geometry cache wrote %d joints, holds %.1f MB, %d evicted', geometry_cache.writes,
+                geometry_cache.tracked_bytes / 1e6, geometry_cache.evictions)
+
+
+def get_thread_catalog(threads):
+    """
+    Returns the thread catalog, loading it from disk or building it on first use.
+
+    Args:
+        threads (adsk.fusion.ThreadFeatures): Thread features whose query builds a missing catalog.
+
+    Returns:
+        jointUtils.ThreadCatalog: The catalog of ISO metric sizes.
+    """
+    global thread_catalog
+    if thread_catalog is None:
+        thread_catalog = jointUtils.ThreadCatalog.load_or_build(config.thread_catalog_path, threads.threadDataQuery, THREAD_TYPE)
+        futil.log(f'Thread catalog has {len(thread_catalog.entries)} sizes')
+    return thread_catalog
+
+
+@futil.traced()
+def create_cap(circle_geom, newComp, cap_collection, is_modeled):
 
     circle_face = circle_geom['circle_face']
     center_point = circle_geom['center_point']
     radius = circle_geom['radius']
 
     # Define wall thickness and cap height (in cm)
-    wall_thickness = .4  # 4 mm wall thickness (0.4 cm)
-    cap_height = 1.0      # 10 mm cap height (1.0 cm)
-    overlap_amount = 0.5  # 5 mm overlap over dowel (0.5 cm)
+    wall_thickness = jointUtils.WALL_THICKNESS  # 4 mm wall thickness (0.4 cm)
+    cap_height = jointUtils.CAP_HEIGHT      # 10 mm cap height (1.0 cm)
+    overlap_amount = jointUtils.OVERLAP_AMOUNT  # 5 mm overlap over dowel (0.5 cm)
 
     # Create a new sketch on the circle face
     sketches = newComp.sketches
-    sketch = sketches.add(circle_face)
+    with futil.span('cap.sketch'):
+        sketch = sketches.add(circle_face)
 
     # Transform the circle's center point into the sketch's coordinate system
     sketch_center_point = sketch.modelToSketchSpace(center_point)
 
     # Create the circles at the transformed center point
     sketch_circles = sketch.sketchCurves.sketchCircles
-    outer_circle = sketch_circles.addByCenterRadius(sketch_center_point, radius + wall_thickness)
-    inner_circle = sketch_circles.addByCenterRadius(sketch_center_point, radius)
+    sketch_circles.addByCenterRadius(sketch_center_point, radius + wall_thickness)
+    sketch_circles.addByCenterRadius(sketch_center_point, radius)
 
     # Get the profiles defined by the circles
     ring_profile = None
     inner_profile = None
-    for prof in sketch.profiles:
-        if prof.profileLoops.count == 2:
-            ring_profile = prof  # The ring between outer and inner circles
-        elif prof.profileLoops.count == 1:
-            # Check if this profile is the inner circle
-            prof_centroid = prof.areaProperties().centroid
-            distance_to_center = prof_centroid.distanceTo(sketch_center_point)
-            if distance_to_center < 0.001:
-                inner_profile = prof  # The area inside the inner circle
+    with futil.span('cap.profiles'):
+        for prof in sketch.profiles:
+            if prof.profileLoops.count == 2:
+                ring_profile = prof  # The ring between outer and inner circles
+            elif prof.profileLoops.count == 1:
+                # Check if this profile is the inner circle
+                prof_centroid = prof.areaProperties().centroid
+                distance_to_center = prof_centroid.distanceTo(sketch_center_point)
+                if distance_to_center < 0.001:
+                    inner_profile = prof  # The area inside the inner circle
 
     # Ensure both profiles are found
     if ring_profile is None or inner_profile is None:
-        ui.messageBox('Could not find the necessary profiles.')
-        return
+        futil.warning('Could not find the necessary profiles.')
+        return None
 
     # Create an extrusion input for the cap walls (ring profile)
     extrudes = newComp.features.extrudeFeatures
@@ -282,7 +1764,8 @@ def create_cap(circle_geom, newComp, cap_collection):
     ext_input_walls.setTwoSidesExtent(extent_distance_negative, extent_distance_positive, taper_angle_zero, taper_angle_zero)
 
     # Create the extrusion to form the cap walls
-    cap_walls_extrusion = extrudes.add(ext_input_walls)
+    with futil.span('cap.extrude'):
+        cap_walls_extrusion = extrudes.add(ext_input_walls)
     cap_body = cap_walls_extrusion.bodies.item(0)
     cap_collection.add(cap_body)
 
@@ -296,74 +1779,47 @@ def create_cap(circle_geom, newComp, cap_collection):
     ext_input_inner.participantBodies = [cap_collection.item(cap_collection.count - 1)]
 
     # Create the extrusion to cap off the end
-    cap_end_extrusion = extrudes.add(ext_input_inner)
+    with futil.span('cap.extrude'):
+        extrudes.add(ext_input_inner)
 
     # Add threading to the outer face
     # Find the outer cylindrical face
     outer_faces = cap_body.faces
     outer_radius = radius + wall_thickness
+    size = None
     for face in outer_faces:
         if isinstance(face.geometry, adsk.core.Cylinder):
             face_radius = face.geometry.radius
             if abs(face_radius - outer_radius) < 0.001:
                 # Apply threading to this face
-                threads = newComp.features.threadFeatures
-                thread_data_query = threads.threadDataQuery
-                threadTypes = thread_data_query.allThreadTypes
-                thread_type = 'ISO Metric profile'  # Specify your thread type
-                is_internal = False  # False for external threads
-                # Calculate the outer diameter (in mm if units are cm)
-                outer_diameter_mm = (outer_radius * 2) * 10  # Convert cm to mm
-                # Get all available sizes for the thread type and isInternal
-                all_sizes = thread_data_query.allSizes(threadTypes[10])
-                size = None
-                # Find the closest matching size
-                for s in all_sizes:
-                    try:
-                        # Remove any non-numeric characters (e.g., 'M')
-                        thread_size = float(s.replace('M', '').split('x')[0])
-                        if abs(thread_size - outer_diameter_mm) < 2.5:
-                            size = s
-                            break
-                    except ValueError:
-                        continue
+                size = match_thread_size(newComp, outer_radius)
                 if size is None:
-                    ui.messageBox('Could not find a suitable thread size.')
-                    return
-                # Get all designations for the matched size
-                all_designations = thread_data_query.allDesignations(thread_type, size)
-                # For simplicity, select the first designation
-                designation = all_designations[0]
-
-                allClasses = thread_data_query.allClasses(False, thread_type, designation)
-                threadClass = allClasses[0]
-                
-                # Create the thread info
-                thread_info = threads.createThreadInfo(is_internal, thread_type, designation, threadClass)
-                thread_input = threads.createInput(face, thread_info)
-                # Set threading properties
-                thread_input.isFullLength = True
-                thread_input.isModeled = True
-                threads.add(thread_input)
+                    futil.warning('Could not find a thread size for a %.1f mm cap', outer_radius * 20)
+                    return None
+
+                add_thread(newComp, face, size, False, is_modeled, 'cap')
                 break
     
     return size
     
 
-def create_tube(circle_geom, intersection_point, newComp, size, connector_collection):
+@futil.traced()
+def create_tube(circle_geom, intersection_point, newComp, size, connector_collection, is_modeled):
     """
     Creates a tube from the circle to the intersection point.
 
     Args:
         circle_geom (dict): Dictionary containing 'center_point', 'normal_vector', and 'radius'.
         intersection_point (adsk.core.Point3D): The point to which the tube extends.
+
+    Returns:
+        adsk.fusion.BRepBody: The connector, or None if its profile was not found.
     """
     center_point = circle_geom['center_point']
-    normal_vector = circle_geom['normal_vector']
     radius = circle_geom['radius']
     circle_face = circle_geom['circle_face']
     # Wall thickness (convert 4 mm to cm if units are cm)
-    wall_thickness = 0.4  # 4 mm wall thickness (0.4 cm)
+    wall_thickness = jointUtils.WALL_THICKNESS  # 4 mm wall thickness (0.4 cm)
 
     # Direction vector from center_point to intersection_point
     direction_vector = adsk.core.Vector3D.create(
@@ -374,7 +1830,7 @@ def create_tube(circle_geom, intersection_point, newComp, size, connector_collec
     direction_vector.normalize()
 
     # Offset distance in cm (10 mm = 1 cm)
-    offset_distance = -1.0  # Negative to move back along the path
+    offset_distance = -jointUtils.CONNECTOR_OFFSET  # Negative to move back along the path
 
     # Calculate the offset vector
     offset_vector = direction_vector.copy()
@@ -384,16 +1840,18 @@ def create_tube(circle_geom, intersection_point, newComp, size, connector_collec
     new_start_point = center_point.copy()
     new_start_point.translateBy(offset_vector)
 
-    path_sketch = newComp.sketches.add(rootComp.xYConstructionPlane)
-    path_sketch.is3D = True
+    with futil.span('tube.path'):
+        path_sketch = newComp.sketches.add(newComp.parentDesign.rootComponent.xYConstructionPlane)
+        path_sketch.is3D = True
 
-    path_line = path_sketch.sketchCurves.sketchLines.addByTwoPoints(new_start_point, intersection_point)
+        path_line = path_sketch.sketchCurves.sketchLines.addByTwoPoints(new_start_point, intersection_point)
 
-    path = newComp.features.createPath(path_line,False)
+        path = newComp.features.createPath(path_line,False)
 
     # Create a sketch on the profile plane
     connector_sketches = newComp.sketches
-    sketch = connector_sketches.add(circle_face)
+    with futil.span('tube.sketch'):
+        sketch = connector_sketches.add(circle_face)
 
     sketch_center_point = sketch.modelToSketchSpace(center_point)
     # Draw two concentric circles representing the tube cross-section
@@ -401,32 +1859,33 @@ def create_tube(circle_geom, intersection_point, newComp, size, connector_collec
     # # Inner circle (matches circle's radius)
     # inner_circle = sketch_circles.addByCenterRadius(sketch_center_point, radius + wall_thickness)
     # Outer circle (radius + wall thickness)
-    outer_circle = sketch_circles.addByCenterRadius(sketch_center_point, radius + wall_thickness + wall_thickness)
+    sketch_circles.addByCenterRadius(sketch_center_point, radius + wall_thickness + wall_thickness)
 
     # Get the profiles of the sketch
     profiles = sketch.profiles
     if profiles.count == 0:
-        ui.messageBox('No profile found in the sketch.')
-        return
+        futil.warning('No profile found in the sketch.')
+        return None
 
     # Initialize variables to store the largest area and corresponding profile
     max_area = 0
     largest_profile = None
 
     # Loop over the profiles to find the one with the largest area
-    for i in range(profiles.count):
-        prof = profiles.item(i)
-        # Get the area properties of the profile
-        area_props = prof.areaProperties(adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy)
-        area = area_props.area
-        if area > max_area:
-            max_area = area
-            largest_profile = prof
+    with futil.span('tube.profiles'):
+        for i in range(profiles.count):
+            prof = profiles.item(i)
+            # Get the area properties of the profile
+            area_props = prof.areaProperties(adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy)
+            area = area_props.area
+            if area > max_area:
+                max_area = area
+                largest_profile = prof
 
     # Check if a profile was found
     if largest_profile is None:
-        ui.messageBox('No valid profile found in the sketch.')
-        return
+        futil.warning('No valid profile found in the sketch.')
+        return None
 
     profile = largest_profile  # Use the profile with the largest area
 
@@ -438,10 +1897,11 @@ def create_tube(circle_geom, intersection_point, newComp, size, connector_collec
     sweep_input.orientation = adsk.fusion.SweepOrientationTypes.PerpendicularOrientationType
 
     # Create the sweep
-    sweep = sweeps.add(sweep_input)
+    with futil.span('tube.sweep'):
+        sweep = sweeps.add(sweep_input)
     connector_body = sweep.bodies.item(0)
     connector_collection.add(connector_body)
-    futil.log(f'connector collection: {connector_collection.count}')
+    futil.debug('connector collection: %d', connector_collection.count)
     # connector_body = connector_body.moveToComponent(newOccu)
     
     # overlap_amount = 1  
@@ -467,120 +1927,89 @@ def create_tube(circle_geom, intersection_point, newComp, size, connector_collec
             inner_radius = face.geometry.radius
             if (outer_radius > inner_radius):
                 # Apply threading to this face
-                futil.log(f'face radius: {inner_radius}')
-                connector_threads = newComp.features.threadFeatures
-                thread_data_query = connector_threads.threadDataQuery
-
-                thread_type = thread_data_query.allThreadTypes[10]  # Specify your thread type
-                is_internal = True  # False for external threads
-                futil.log(f'{size}')
-                # Get all designations for the matched size
-                all_designations = thread_data_query.allDesignations(thread_type, size)
-                # For simplicity, select the first designation
-                designation = all_designations[0]
-                futil.log(f'{designation}')
-
-                allClasses = thread_data_query.allClasses(True, thread_type, designation)
-                threadClass = allClasses[0]
-                futil.log(f'{threadClass}')
-                # Create the thread info
-                thread_info = connector_threads.createThreadInfo(is_internal, thread_type, designation, threadClass)
-                thread_input = connector_threads.createInput(face, thread_info)
-                # Set threading properties
-                thread_input.isFullLength = True
-                thread_input.isModeled = True
-                connector_threads.add(thread_input)
+                futil.debug('face radius: %s', inner_radius)
+                # The size was matched by create_cap, so the internal class comes straight from the catalog
+                futil.debug('%s', size)
+                add_thread(newComp, face, size, True, is_modeled, 'connector')
                 break
+    return connector_body
 
 
-def compute_best_intersection(points, directions):
+def match_thread_size(newComp, outer_radius):
     """
-    Computes the point that minimizes the sum of squared distances to all lines defined by points and directions.
+    Finds the thread size closest to a cylinder radius.
 
     Args:
-        points (list of adsk.core.Point3D): Points through which the lines pass.
-        directions (list of adsk.core.Vector3D): Direction vectors of the lines.
+        newComp (adsk.fusion.Component): Component whose thread data builds a missing catalog.
+        outer_radius (float): Radius of the threaded cylinder in cm.
 
     Returns:
-        adsk.core.Point3D: The point closest to all lines, or None if computation fails.
+        jointUtils.ThreadSpec: The closest size, or None if nothing is close enough.
     """
-    n = len(points)
-    if n < 2:
-        return None
-
-    # Initialize matrices
-    S = [[0.0]*3 for _ in range(3)]
-    C = [0.0]*3
-
-    for i in range(n):
-        p = points[i]
-        d = directions[i]
-        d.normalize()  # Ensure the direction vector is a unit vector
-
-        # Extract components
-        dx, dy, dz = d.x, d.y, d.z
-        px, py, pz = p.x, p.y, p.z
-
-        d_array = [dx, dy, dz]
-        p_array = [px, py, pz]
-
-        # Build the projection matrix M = I - d d^T
-        M = [[0.0]*3 for _ in range(3)]
-        for j in range(3):
-            for k in range(3):
-                M[j][k] = - d_array[j] * d_array[k]
-                if j == k:
-                    M[j][k] += 1.0  # Add 1 to diagonal elements
-
-        # Accumulate S and C
-        for j in range(3):
-            for k in range(3):
-                S[j][k] += M[j][k]
-
-        for j in range(3):
-            C[j] += sum(M[j][k] * p_array[k] for k in range(3))
-
-    # Solve the linear system S * x = C
-    try:
-        x = solve_linear_system(S, C)
-        intersection_point = adsk.core.Point3D.create(x[0], x[1], x[2])
-        return intersection_point
-    except Exception as e:
-        ui.messageBox(f'Error computing intersection point: {str(e)}')
-        return None
+    # Calculate the outer diameter (in mm if units are cm)
+    outer_diameter_mm = (outer_radius * 2) * 10  # Convert cm to mm
+    with futil.span('thread_size'):
+        return get_thread_catalog(newComp.features.threadFeatures).nearest(outer_diameter_mm)
 
 
-def solve_linear_system(A, b):
+def add_thread(newComp, face, size, is_internal, is_modeled, role):
     """
-    Solves the linear system A x = b for x using Cramer's rule.
+    Threads a cylindrical face and tags the thread as part of a joint.
 
     Args:
-        A (list of list of float): Coefficient matrix (3x3).
-        b (list of float): Right-hand side vector (length 3).
+        newComp (adsk.fusion.Component): Component that receives the thread feature.
+        face (adsk.fusion.BRepFace): Cylindrical face to thread.
+        size (jointUtils.ThreadSpec): Size from the thread catalog.
+        is_internal (bool): True for the bore of a connector, False for the outside of a cap.
+        is_modeled (bool): Whether the thread is modeled or cosmetic.
+        role (str): 'cap' or 'connector', stored on the thread.
 
     Returns:
-        list of float: Solution vector x.
+        adsk.fusion.ThreadFeature: The new thread.
+    """
+    threads = newComp.features.threadFeatures
+    thread_class = size.internal_class if is_internal else size.external_class
+
+    # Create the thread info
+    thread_info = threads.createThreadInfo(is_internal, THREAD_TYPE, size.designation, thread_class)
+    thread_input = threads.createInput(face, thread_info)
+    # Set threading properties
+    thread_input.isFullLength = True
+    thread_input.isModeled = is_modeled
+    with futil.span(f'{role}.thread', modeled=is_modeled):
+        thread = threads.add(thread_input)
+    # Tag the thread so it can be found later without scanning the design
+    thread.attributes.add(config.attribute_group, config.thread_attribute, role)
+    return thread
+
+
+@futil.traced()
+def compute_best_intersection(points, directions):
     """
+    Computes the point that minimizes the sum of squared distances to all lines defined by points and directions.
 
-    def determinant(matrix):
-        return (matrix[0][0]*(matrix[1][1]*matrix[2][2] - matrix[1][2]*matrix[2][1]) -
-                matrix[0][1]*(matrix[1][0]*matrix[2][2] - matrix[1][2]*matrix[2][0]) +
-                matrix[0][2]*(matrix[1][0]*matrix[2][1] - matrix[1][1]*matrix[2][0]))
+    Args:
+        points (list of adsk.core.Point3D): Points through which the lines pass.
+        directions (list of adsk.core.Vector3D): Direction vectors of the lines.
 
-    D = determinant(A)
-    if abs(D) < 1e-6:
-        raise ValueError('Singular matrix')
+    Returns:
+        adsk.core.Point3D: The point closest to all lines, or None if computation fails.
+    """
+    if len(points) < 2:
+        return None
 
-    x = []
-    for i in range(3):
-        Ai = deepcopy(A)
-        for j in range(3):
-            Ai[j][i] = b[j]
-        Di = determinant(Ai)
-        xi = Di / D
-        x.append(xi)
+    equations = jointUtils.NormalEquations()
+    for p, d in zip(points, directions):
+        equations.add((p.x, p.y, p.z), (d.x, d.y, d.z))
+    x, condition = equations.solve()
 
-    return x
+    if x is None:
+        # Near-parallel dowels have no meaningful meeting point, so stop before building anything
+        ui.messageBox(f'Error computing intersection point: the dowels are too close to parallel '
+                      f'(condition estimate {condition:.3g}).')
+        return None
+    futil.debug('Intersection residual: %s, condition estimate: %s', equations.residual(x), condition)
+    return adsk.core.Point3D.create(x[0], x[1], x[2])
 
 
 # This function will be called when the user completes the command.
@@ -588,5 +2017,10 @@ def command_destroy(args: adsk.core.CommandEventArgs):
     global local_handlers
     local_handlers = []
     futil.log(f'{CMD_NAME} Command Destroy Event')
+    stop_preview()
+
+    # Keep the latest timings on disk while debugging
+    if config.DEBUG and futil.is_tracing():
+        futil.export_chrome_trace(config.trace_path)
 
 
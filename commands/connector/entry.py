@@ -3,15 +3,11 @@ import math
 import adsk.core
 import adsk.fusion
 import os
-from copy import deepcopy
 from ...lib import fusionAddInUtils as futil
+from ...lib import jointUtils
 from ... import config
 app = adsk.core.Application.get()
 ui = app.userInterface
-design = app.activeProduct
-rootComp = design.rootComponent
-newOccu = rootComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
-newComp = newOccu.component
 
 CMD_NAME = os.path.basename(os.path.dirname(__file__))
 CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
@@ -116,6 +112,9 @@ def command_execute_intersection(args: adsk.core.CommandEventArgs):
     futil.log('Find Intersection Command Execute Event')
     inputs = args.command.commandInputs
 
+    # The design and the component for the new bodies are resolved when first needed
+    ctx = futil.ExecutionContext()
+
     # Get the selection input
     selection_input = inputs.itemById('selection_input')
 
@@ -144,7 +143,7 @@ def command_execute_intersection(args: adsk.core.CommandEventArgs):
                 for j in range(edge_faces.count):
                     edge_face = edge_faces.item(j)
                     face_eval = edge_face.geometry.surfaceType
-                    futil.log(f'Selection {i} face {j} surfaceType: {face_eval}')
+                    futil.debug('Selection %d face %d surfaceType: %s', i, j, face_eval)
                     if (face_eval == 0):
                         circle_face = edge_face
                         break
@@ -153,7 +152,7 @@ def command_execute_intersection(args: adsk.core.CommandEventArgs):
                 center_point = edge_geometry.center
                 normal_vector = face_geometries.normal
                 radius = edge_geometry.radius
-                futil.log(f'Center point: {center_point}, normal: {normal_vector}, radius: {radius}')
+                futil.debug('Center point: %s, normal: %s, radius: %s', center_point, normal_vector, radius)
                 # Store the point and direction
                 points.append(center_point)
                 directions.append(normal_vector)
@@ -177,18 +176,18 @@ def command_execute_intersection(args: adsk.core.CommandEventArgs):
 
     if intersection_point:
         baseFeat = None
-        if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
-            baseFeat = rootComp.features.baseFeatures.add()
+        if ctx.design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+            baseFeat = ctx.root_component.features.baseFeatures.add()
             baseFeat.startEdit()
 
         # Create a construction point at the intersection
-        points_collection = rootComp.constructionPoints
+        points_collection = ctx.root_component.constructionPoints
         pointInput = points_collection.createInput()
         pointInput.setByPoint(intersection_point)
         points_collection.add(pointInput)
 
         for geom in circle_geometries:
-            create_tube(geom, intersection_point, baseFeat)
+            create_tube(geom, intersection_point, ctx.component, baseFeat)
 
         if baseFeat:
             baseFeat.finishEdit()
@@ -212,91 +211,31 @@ def compute_best_intersection(points, directions):
     Returns:
         adsk.core.Point3D: The point closest to all lines, or None if computation fails.
     """
-    n = len(points)
-    if n < 2:
-        return None
-
-    # Initialize matrices
-    S = [[0.0]*3 for _ in range(3)]
-    C = [0.0]*3
-
-    for i in range(n):
-        p = points[i]
-        d = directions[i]
-        d.normalize()  # Ensure the direction vector is a unit vector
-
-        # Extract components
-        dx, dy, dz = d.x, d.y, d.z
-        px, py, pz = p.x, p.y, p.z
-
-        d_array = [dx, dy, dz]
-        p_array = [px, py, pz]
-
-        # Build the projection matrix M = I - d d^T
-        M = [[0.0]*3 for _ in range(3)]
-        for j in range(3):
-            for k in range(3):
-                M[j][k] = - d_array[j] * d_array[k]
-                if j == k:
-                    M[j][k] += 1.0  # Add 1 to diagonal elements
-
-        # Accumulate S and C
-        for j in range(3):
-            for k in range(3):
-                S[j][k] += M[j][k]
-
-        for j in range(3):
-            C[j] += sum(M[j][k] * p_array[k] for k in range(3))
-
-    # Solve the linear system S * x = C
-    try:
-        x = solve_linear_system(S, C)
-        intersection_point = adsk.core.Point3D.create(x[0], x[1], x[2])
-        return intersection_point
-    except Exception as e:
-        ui.messageBox(f'Error computing intersection point: {str(e)}')
+    if len(points) < 2:
         return None
 
+    equations = jointUtils.NormalEquations()
+    for p, d in zip(points, directions):
+        equations.add((p.x, p.y, p.z), (d.x, d.y, d.z))
+    x, condition = equations.solve()
 
-def solve_linear_system(A, b):
-    """
-    Solves the linear system A x = b for x using Cramer's rule.
-
-    Args:
-        A (list of list of float): Coefficient matrix (3x3).
-        b (list of float): Right-hand side vector (length 3).
-
-    Returns:
-        list of float: Solution vector x.
-    """
-
-    def determinant(matrix):
-        return (matrix[0][0]*(matrix[1][1]*matrix[2][2] - matrix[1][2]*matrix[2][1]) -
-                matrix[0][1]*(matrix[1][0]*matrix[2][2] - matrix[1][2]*matrix[2][0]) +
-                matrix[0][2]*(matrix[1][0]*matrix[2][1] - matrix[1][1]*matrix[2][0]))
-
-    D = determinant(A)
-    if abs(D) < 1e-6:
-        raise ValueError('Singular matrix')
-
-    x = []
-    for i in range(3):
-        Ai = deepcopy(A)
-        for j in range(3):
-            Ai[j][i] = b[j]
-        Di = determinant(Ai)
-        xi = Di / D
-        x.append(xi)
+    if x is None:
+        # Near-parallel dowels have no meaningful meeting point, so stop before building anything
+        ui.messageBox(f'Error computing intersection point: the dowels are too close to parallel '
+                      f'(condition estimate {condition:.3g}).')
+        return None
+    futil.debug('Intersection residual: %s, condition estimate: %s', equations.residual(x), condition)
+    return adsk.core.Point3D.create(x[0], x[1], x[2])
 
-    return x
 
-def create_tube(circle_geom, intersection_point, baseFeat):
+def create_tube(circle_geom, intersection_point, newComp, baseFeat):
     """
     Creates a tube from the circle to the intersection point.
 
     Args:
         circle_geom (dict): Dictionary containing 'center_point', 'normal_vector', and 'radius'.
         intersection_point (adsk.core.Point3D): The point to which the tube extends.
+        newComp (adsk.fusion.Component): Component that receives the tube.
     """
     center_point = circle_geom['center_point']
     normal_vector = circle_geom['normal_vector']
@@ -305,7 +244,7 @@ def create_tube(circle_geom, intersection_point, baseFeat):
     # Wall thickness (convert 4 mm to cm if units are cm)
     wall_thickness = 0.4  # 4 mm wall thickness (0.4 cm)
 
-    path_sketch = newComp.sketches.add(rootComp.xYConstructionPlane)
+    path_sketch = newComp.sketches.add(newComp.parentDesign.rootComponent.xYConstructionPlane)
     path_sketch.is3D = True
 
     path_line = path_sketch.sketchCurves.sketchLines.addByTwoPoints(center_point, intersection_point)
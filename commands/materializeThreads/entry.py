@@ -0,0 +1,147 @@
+import adsk.core
+import adsk.fusion
+import os
+from ...lib import fusionAddInUtils as futil
+from ... import config
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+CMD_NAME = os.path.basename(os.path.dirname(__file__))
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
+CMD_Description = 'Converts the cosmetic threads of joints into modeled threads for printing'
+IS_PROMOTED = False
+
+# Global variables by referencing values from /config.py
+WORKSPACE_ID = config.design_workspace
+TAB_ID = config.tools_tab_id
+TAB_NAME = config.my_tab_name
+
+PANEL_ID = config.my_panel_id
+PANEL_NAME = config.my_panel_name
+PANEL_AFTER = config.my_panel_after
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Holds references to event handlers
+local_handlers = []
+
+
+# Executed when add-in is run.
+def start():
+    # ******************************** Create Command Definition ********************************
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Add command created handler. The function passed here will be executed when the command is executed.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******************************** Create Command Control ********************************
+    # Get target workspace for the command.
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+
+    # Get target toolbar tab for the command and create the tab if necessary.
+    toolbar_tab = workspace.toolbarTabs.itemById(TAB_ID)
+    if toolbar_tab is None:
+        toolbar_tab = workspace.toolbarTabs.add(TAB_ID, TAB_NAME)
+
+    # Get target panel for the command and and create the panel if necessary.
+    panel = toolbar_tab.toolbarPanels.itemById(PANEL_ID)
+    if panel is None:
+        panel = toolbar_tab.toolbarPanels.add(PANEL_ID, PANEL_NAME, PANEL_AFTER, False)
+
+    # Create the command control, i.e. a button in the UI.
+    control = panel.controls.addCommand(cmd_def)
+
+    # Now you can set various options on the control such as promoting it to always be shown.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+    toolbar_tab = workspace.toolbarTabs.itemById(TAB_ID)
+    command_control = panel.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+    # Delete the panel if it is empty
+    if panel.controls.count == 0:
+        panel.deleteMe()
+
+    # Delete the tab if it is empty
+    if toolbar_tab.toolbarPanels.count == 0:
+        toolbar_tab.deleteMe()
+
+
+# Function to be called when a user clicks the corresponding button in the UI.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    futil.log(f'{CMD_NAME} Command Created Event')
+
+    # Connect to the events that are needed by this command.
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+    inputs = args.command.commandInputs
+
+    # Only the threads on the bodies being exported are modeled
+    selection_input = inputs.addSelectionInput('body_input', 'Bodies', 'Select the bodies to export')
+    selection_input.addSelectionFilter('SolidBodies')
+    selection_input.setSelectionLimits(1, 0)
+
+
+# This function will be called when the user clicks the OK button in the command dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    futil.log(f'{CMD_NAME} Command Execute Event')
+    inputs = args.command.commandInputs
+    ctx = futil.ExecutionContext()
+
+    body_input = inputs.itemById('body_input')
+    selected_bodies = []
+    for i in range(body_input.selectionCount):
+        body = body_input.selection(i).entity
+        # Selections made in an assembly context are proxies of the bodies the threads were built on
+        selected_bodies.append(body.nativeObject or body)
+
+    # The joint command tags its threads, so only those are visited instead of every feature in the design
+    threads = []
+    for attribute in ctx.design.findAttributes(config.attribute_group, config.thread_attribute):
+        thread = adsk.fusion.ThreadFeature.cast(attribute.parent)
+        if thread is None or thread.isModeled:
+            continue
+        if any(body in selected_bodies for body in thread.bodies):
+            threads.append(thread)
+
+    if not threads:
+        ui.messageBox('The selected bodies have no cosmetic joint threads.')
+        return
+
+    # Convert all of them in a single pass, in timeline order. Compute is deferred so the design is
+    # recomputed once at the end instead of after every thread, and always turned back on.
+    threads.sort(key=lambda thread: thread.timelineObject.index)
+    design = ctx.design
+    design.isComputeDeferred = True
+    try:
+        for thread in threads:
+            thread.isModeled = True
+    finally:
+        design.isComputeDeferred = False
+
+    futil.log(f'Modeled {len(threads)} threads')
+    ui.messageBox(f'Modeled {len(threads)} threads.')
+
+
+# This function will be called when the user completes the command.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    global local_handlers
+    local_handlers = []
+    futil.log(f'{CMD_NAME} Command Destroy Event')
@@ -0,0 +1,264 @@
+import adsk.core
+import adsk.fusion
+import os
+from ...lib import fusionAddInUtils as futil
+from ...lib import jointUtils
+from ... import config
+from ..commandDialog import entry as joint_command
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+CMD_NAME = os.path.basename(os.path.dirname(__file__))
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
+CMD_Description = 'Rebuilds the joints whose dowels moved or changed size since they were generated'
+IS_PROMOTED = False
+
+# Global variables by referencing values from /config.py
+WORKSPACE_ID = config.design_workspace
+TAB_ID = config.tools_tab_id
+TAB_NAME = config.my_tab_name
+
+PANEL_ID = config.my_panel_id
+PANEL_NAME = config.my_panel_name
+PANEL_AFTER = config.my_panel_after
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Holds references to event handlers
+local_handlers = []
+
+
+# Executed when add-in is run.
+def start():
+    # ******************************** Create Command Definition ********************************
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Add command created handler. The function passed here will be executed when the command is executed.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******************************** Create Command Control ********************************
+    # Get target workspace for the command.
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+
+    # Get target toolbar tab for the command and create the tab if necessary.
+    toolbar_tab = workspace.toolbarTabs.itemById(TAB_ID)
+    if toolbar_tab is None:
+        toolbar_tab = workspace.toolbarTabs.add(TAB_ID, TAB_NAME)
+
+    # Get target panel for the command and and create the panel if necessary.
+    panel = toolbar_tab.toolbarPanels.itemById(PANEL_ID)
+    if panel is None:
+        panel = toolbar_tab.toolbarPanels.add(PANEL_ID, PANEL_NAME, PANEL_AFTER, False)
+
+    # Create the command control, i.e. a button in the UI.
+    control = panel.controls.addCommand(cmd_def)
+
+    # Now you can set various options on the control such as promoting it to always be shown.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+    toolbar_tab = workspace.toolbarTabs.itemById(TAB_ID)
+    command_control = panel.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+    # Delete the panel if it is empty
+    if panel.controls.count == 0:
+        panel.deleteMe()
+
+    # Delete the tab if it is empty
+    if toolbar_tab.toolbarPanels.count == 0:
+        toolbar_tab.deleteMe()
+
+
+# Function to be called when a user clicks the corresponding button in the UI.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    futil.log(f'{CMD_NAME} Command Created Event')
+
+    # Connect to the events that are needed by this command.
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This function will be called when the user clicks the OK button in the command dialog.
+@futil.traced()
+def command_execute(args: adsk.core.CommandEventArgs):
+    futil.log(f'{CMD_NAME} Command Execute Event')
+    ctx = futil.ExecutionContext()
+
+    # Every generated joint tags its bodies, point, sketches and features with the dowel ends it was built from
+    records = {}
+    outputs = {}
+    for attribute in ctx.design.findAttributes(config.attribute_group, config.joint_attribute):
+        record = jointUtils.decode_joint_record(attribute.value)
+        if record is None:
+            continue
+        records[record.joint_id] = record
+        if attribute.parent:
+            outputs.setdefault(record.joint_id, []).append(attribute.parent)
+
+    if not records:
+        ui.messageBox('The design has no generated joints to refresh.')
+        return
+
+    # Only the stored ends are read, never the whole design
+    with futil.span('refresh.diff', joints=len(records)):
+        ends = {}
+        current_hashes = {}
+        for record in records.values():
+            for token in record.tokens:
+                if token not in ends:
+                    ends[token] = read_end(ctx, token)
+                    current_hashes[token] = jointUtils.geometry_hash(*joint_command.dowel_end_values(ends[token])) if ends[token] else None
+        diff = jointUtils.diff_joints(list(records.values()), current_hashes)
+    futil.log(f'{len(diff.changed)} joints changed, {len(diff.removed)} removed, {len(diff.unchanged)} unchanged')
+
+    # Rebuilt joints go back into the component they were generated in
+    occurrences = {joint_id: generated_occurrence(ctx, outputs.get(joint_id, [])) for joint_id in diff.changed}
+    for joint_id in diff.changed + diff.removed:
+        delete_outputs(outputs.get(joint_id, []))
+
+    rebuilt = 0
+    joint_types = {}
+    for joint_id in diff.changed:
+        record = records[joint_id]
+        circle_geometries = [ends[token] for token in record.tokens if ends[token]]
+        joint_ctx = futil.ExecutionContext(occurrences[joint_id])
+        is_modeled = record.options.get('modeled', False)
+        engine = record.options.get('engine', 'features')
+        fuse = 'joint' if record.options.get('fuse', False) else 'none'
+        if record.options.get('instance', False):
+            built = rebuild_instance(joint_ctx, circle_geometries, is_modeled, engine, fuse, joint_types)
+        else:
+            built = joint_command.build_joint(joint_ctx, circle_geometries, is_modeled, engine, fuse)
+        if built:
+            rebuilt += 1
+
+    ui.messageBox(f'Rebuilt {rebuilt} of {len(diff.changed)} changed joints and removed {len(diff.removed)} joints '
+                  f'without dowels. {len(diff.unchanged)} joints were up to date.')
+
+
+def read_end(ctx, token):
+    """
+    Reads the current geometry of a dowel end from the entity token of its edge.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        token (str): Entity token stored when the joint was built.
+
+    Returns:
+        dict: Circle geometry of the end, or None if the edge no longer exists.
+    """
+    for entity in ctx.design.findEntityByToken(token):
+        edge = adsk.fusion.BRepEdge.cast(entity)
+        if edge:
+            return joint_command.read_dowel_end(edge)
+    return None
+
+
+def rebuild_instance(ctx, circle_geometries, is_modeled, engine, fuse, joint_types):
+    """
+    Places a changed instanced joint again as an occurrence of its joint type.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the generated component.
+        circle_geometries (list of dict): Current circle geometries of the dowel ends in the joint.
+        is_modeled (bool): Whether threads are modeled or cosmetic.
+        engine (str): Engine the joint was built with.
+        fuse (str): 'joint' or 'none'.
+        joint_types (dict): Joint types shared by the joints rebuilt in one refresh.
+
+    Returns:
+        adsk.core.Point3D: The joint point, or None if the joint could not be built.
+    """
+    point = joint_command.compute_best_intersection([geom['center_point'] for geom in circle_geometries],
+                                                    [geom['normal_vector'] for geom in circle_geometries])
+    if point is None:
+        return None
+    # The type is looked up in the design first, so the joint goes back onto the component it shares
+    return joint_command.build_instance(ctx, circle_geometries, is_modeled, engine, fuse, (point.x, point.y, point.z),
+                                        joint_types)
+
+
+def generated_occurrence(ctx, entities):
+    """
+    Finds the generated occurrence that holds the bodies of a joint.
+
+    Args:
+        ctx (futil.ExecutionContext): Context of the running command.
+        entities (list): Bodies, construction point and features of the joint, or the occurrence of an
+            instanced joint.
+
+    Returns:
+        adsk.fusion.Occurrence: The occurrence, or None to generate into a new one.
+    """
+    for entity in entities:
+        body = adsk.fusion.BRepBody.cast(entity)
+        if body is not None and body.isValid:
+            component = body.parentComponent
+        else:
+            # An instanced joint is an occurrence inside the generated component
+            occurrence = adsk.fusion.Occurrence.cast(entity)
+            if occurrence is None or not occurrence.isValid:
+                continue
+            component = occurrence.sourceComponent
+        occurrences = ctx.root_component.allOccurrencesByComponent(component)
+        if occurrences.count:
+            return occurrences.item(0)
+    return None
+
+
+def delete_outputs(entities):
+    """
+    Deletes the bodies, construction point, sketches and features of a joint.
+
+    Features are deleted from the last in the timeline to the first, so none
+    is left depending on a deleted one, and bodies go last since deleting
+    the feature that made a body deletes the body too. An instanced joint
+    only loses its occurrence, so the component of its joint type stays for
+    the other joints placed from it.
+
+    Args:
+        entities (list): Entities tagged with the joint record.
+    """
+    for entity in sorted(entities, key=timeline_index, reverse=True):
+        if entity.isValid:
+            entity.deleteMe()
+
+
+def timeline_index(entity):
+    """
+    Returns the position of an entity in the timeline.
+
+    Args:
+        entity: Entity tagged with a joint record.
+
+    Returns:
+        int: The index, or -1 for entities without a timeline object, such as bodies.
+    """
+    try:
+        timeline_object = entity.timelineObject
+    except (AttributeError, RuntimeError):
+        return -1
+    return timeline_object.index if timeline_object else -1
+
+
+# This function will be called when the user completes the command.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    global local_handlers
+    local_handlers = []
+    futil.log(f'{CMD_NAME} Command Destroy Event')
@@ -0,0 +1,127 @@
+import adsk.core
+import adsk.fusion
+import os
+import time
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ..commandDialog import entry as joint_command
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+CMD_NAME = os.path.basename(os.path.dirname(__file__))
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
+CMD_Description = 'Finds every dowel end in the design and reports what was found'
+IS_PROMOTED = False
+
+# Global variables by referencing values from /config.py
+WORKSPACE_ID = config.design_workspace
+TAB_ID = config.tools_tab_id
+TAB_NAME = config.my_tab_name
+
+PANEL_ID = config.my_panel_id
+PANEL_NAME = config.my_panel_name
+PANEL_AFTER = config.my_panel_after
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Holds references to event handlers
+local_handlers = []
+
+
+# Executed when add-in is run.
+def start():
+    # ******************************** Create Command Definition ********************************
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Add command created handler. The function passed here will be executed when the command is executed.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******************************** Create Command Control ********************************
+    # Get target workspace for the command.
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+
+    # Get target toolbar tab for the command and create the tab if necessary.
+    toolbar_tab = workspace.toolbarTabs.itemById(TAB_ID)
+    if toolbar_tab is None:
+        toolbar_tab = workspace.toolbarTabs.add(TAB_ID, TAB_NAME)
+
+    # Get target panel for the command and and create the panel if necessary.
+    panel = toolbar_tab.toolbarPanels.itemById(PANEL_ID)
+    if panel is None:
+        panel = toolbar_tab.toolbarPanels.add(PANEL_ID, PANEL_NAME, PANEL_AFTER, False)
+
+    # Create the command control, i.e. a button in the UI.
+    control = panel.controls.addCommand(cmd_def)
+
+    # Now you can set various options on the control such as promoting it to always be shown.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+    toolbar_tab = workspace.toolbarTabs.itemById(TAB_ID)
+    command_control = panel.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+    # Delete the panel if it is empty
+    if panel.controls.count == 0:
+        panel.deleteMe()
+
+    # Delete the tab if it is empty
+    if toolbar_tab.toolbarPanels.count == 0:
+        toolbar_tab.deleteMe()
+
+
+# Function to be called when a user clicks the corresponding button in the UI.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    futil.log(f'{CMD_NAME} Command Created Event')
+
+    # Connect to the events that are needed by this command.
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This function will be called when the user clicks the OK button in the command dialog.
+@futil.traced()
+def command_execute(args: adsk.core.CommandEventArgs):
+    futil.log(f'{CMD_NAME} Command Execute Event')
+    ctx = futil.ExecutionContext()
+
+    # Bodies unchanged since the last scan come from the cache shared with the joint command
+    started = time.perf_counter()
+    ends, refs = joint_command.collect_dowel_ends(ctx)
+    scan_time = time.perf_counter() - started
+    stats = joint_command.document_scan_cache(ctx).stats
+
+    joints = joint_command.group_dowel_ends(ends)
+    joined = sum(len(joint) for joint in joints)
+    radii = sorted({round(radius * 10, 2) for radius in ends.radii})
+
+    futil.info('Scanned %d dowel ends on %d bodies in %.3f s (%d bodies walked, %d from the cache)',
+               len(ends), stats.bodies, scan_time, stats.scanned, stats.reused)
+    message = (f'Found {len(ends)} dowel ends on {stats.bodies} bodies in {scan_time:.3f} s.\n'
+               f'{stats.scanned} bodies were scanned, {stats.reused} were unchanged since the last scan.\n'
+               f'{len(joints)} joints use {joined} of the ends.')
+    if radii:
+        message += '\nDowel diameters (mm): ' + ', '.join(f'{radius * 2:g}' for radius in radii)
+    ui.messageBox(message)
+
+
+# This function will be called when the user completes the command.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    global local_handlers
+    local_handlers = []
+    futil.log(f'{CMD_NAME} Command Destroy Event')
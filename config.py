@@ -7,6 +7,14 @@ import os
 
 DEBUG = True
 
+# Lowest level written by futil.log and friends: 'debug', 'info', 'warning' or 'error'
+log_level = 'debug' if DEBUG else 'info'
+
+# Optional rotating log file, set to a path to enable it
+log_file_path = None
+log_file_max_bytes = 1000000
+log_file_backups = 3
+
 ADDIN_NAME = os.path.basename(os.path.dirname(__file__))
 
 COMPANY_NAME = 'ACME'
@@ -19,3 +27,61 @@ my_tab_name = "test2"  # Only used if creating a custom Tab
 my_panel_id = f'{ADDIN_NAME}_panel_3'
 my_panel_name = ADDIN_NAME
 my_panel_after = ''
+
+# Automatic joint discovery (in cm)
+joint_search_radius = 5.0  # Farthest a joint point may be from a dowel end
+joint_axis_tolerance = 0.05  # Largest gap between dowel axes that still counts as meeting
+
+# Dowel ends found on each body are cached by entity token, so rescans only walk bodies that changed
+scan_cache = True
+scan_cache_documents = 8  # Documents whose scans are kept, the least recently scanned one is dropped past this
+
+# Threads are created cosmetic ('cosmetic') or fully modeled ('modeled') by default.
+# Cosmetic threads can be modeled later with the materializeThreads command before export.
+thread_mode = 'cosmetic'
+
+# Joints are built with sketches and sweeps ('features') or as transient bodies ('direct') by default
+joint_engine = 'features'
+
+# Low-poly preview of the caps and connectors while picking dowel ends
+preview_enabled = True
+preview_delay = 0.05  # Seconds without a selection change before the preview is redrawn
+preview_segments = 16  # Segments around each dowel axis in the preview
+
+# Caps and connectors are left as separate bodies ('none') or combined per joint ('joint') or per assembly ('assembly')
+fuse_mode = 'none'
+
+# Many joints are built in one batch by default, with the design computed once at the end and the
+# bodies of the direct engine added in one base feature edit
+batch_session = True
+defer_compute = True
+
+# Congruent joints are placed as occurrences of one component per joint type instead of being built again
+instance_joints = False
+
+# Batches of joints are planned on a worker thread while the command waits with a progress dialog,
+# so the UI stays responsive and the batch is still built as a single undo step
+background_planning = True
+
+# Planned caps and connectors are checked for interference before any feature is built
+interference_check = True
+interference_margin = 0.0  # Smallest gap in cm between parts of different dowels or joints
+
+# Attribute group used to tag everything this add-in creates
+attribute_group = 'DowelConnector'
+thread_attribute = 'thread'  # Marks the thread features of a joint
+joint_attribute = 'joint'  # Marks the bodies of a joint with the dowel ends they were built from
+joint_type_attribute = 'joint_type'  # Marks the component of a joint type with its key and frame
+
+# Timing spans for each phase of joint generation, kept in a ring buffer.
+# Recording is cheap enough to leave on; the trace is written for chrome://tracing when DEBUG is True.
+trace_enabled = True
+trace_buffer_size = 10000
+trace_path = os.path.join(os.path.dirname(__file__), 'trace.json')
+
+# Thread sizes are indexed once and cached next to the add-in
+thread_catalog_path = os.path.join(os.path.dirname(__file__), 'thread_catalog.json')
+
+# Modeled joints are exported here and imported into any design with a congruent joint, set to None to disable
+geometry_cache_path = os.path.join(os.path.dirname(__file__), 'geometry_cache')
+geometry_cache_max_mb = 200  # Least recently used joints are deleted past this size
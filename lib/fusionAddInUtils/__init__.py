@@ -1,2 +1,4 @@
 from .general_utils import *
 from .event_utils import *
+from .context_utils import *
+from .trace_utils import *
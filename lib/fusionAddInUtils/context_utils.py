@@ -0,0 +1,70 @@
+import adsk.core
+import adsk.fusion
+
+app = adsk.core.Application.get()
+
+# Attempt to read the attribute group from parent config.
+try:
+    from ... import config
+    ATTRIBUTE_GROUP = config.attribute_group
+except:
+    ATTRIBUTE_GROUP = 'DowelConnector'
+
+
+class ExecutionContext:
+    """Document state for one command execution, resolved on first use.
+
+    Nothing is read from or added to the document until a property is used,
+    so creating a context, or importing a command that uses one, has no side
+    effects on whichever document happens to be active.
+    """
+
+    def __init__(self, occurrence: adsk.fusion.Occurrence = None):
+        """Arguments:
+        occurrence -- An existing generated occurrence to add to, instead of a new one.
+        """
+        self._design = None
+        self._occurrence = occurrence
+
+    @property
+    def design(self) -> adsk.fusion.Design:
+        """The active design."""
+        if self._design is None:
+            self._design = adsk.fusion.Design.cast(app.activeProduct)
+        return self._design
+
+    @property
+    def root_component(self) -> adsk.fusion.Component:
+        """The root component of the active design."""
+        return self.design.rootComponent
+
+    @property
+    def occurrence(self) -> adsk.fusion.Occurrence:
+        """The occurrence that holds everything generated by this execution, created when first needed."""
+        if self._occurrence is None:
+            self._occurrence = self.root_component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+            mark_generated_component(self._occurrence.component)
+        return self._occurrence
+
+    @property
+    def component(self) -> adsk.fusion.Component:
+        """The component of the generated occurrence."""
+        return self.occurrence.component
+
+
+def mark_generated_component(component: adsk.fusion.Component):
+    """Marks a component so later scans can tell generated geometry from the user's.
+
+    Arguments:
+    component -- The component to mark.
+    """
+    component.attributes.add(ATTRIBUTE_GROUP, 'generated', 'joints')
+
+
+def is_generated_component(component: adsk.fusion.Component) -> bool:
+    """Checks if a component was created by an ExecutionContext.
+
+    Arguments:
+    component -- The component to check.
+    """
+    return component.attributes.itemByName(ATTRIBUTE_GROUP, 'generated') is not None
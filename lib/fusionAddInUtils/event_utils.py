@@ -13,7 +13,7 @@ import sys
 from typing import Callable
 
 import adsk.core
-from .general_utils import handle_error
+from .general_utils import handle_error, flush_log
 
 
 # Global Variable to hold Event Handlers
@@ -84,5 +84,8 @@ def _define_handler(handler_type, callback, name: str = None):
                 callback(args)
             except:
                 handle_error(name)
+            finally:
+                # Write everything the handler logged in one batch
+                flush_log()
 
     return Handler
@@ -9,6 +9,8 @@
 #  AUTODESK, INC. DOES NOT WARRANT THAT THE OPERATION OF THE PROGRAM WILL BE
 #  UNINTERRUPTED OR ERROR FREE.
 
+import logging
+import logging.handlers
 import os
 import traceback
 import adsk.core
@@ -16,34 +18,173 @@ import adsk.core
 app = adsk.core.Application.get()
 ui = app.userInterface
 
-# Attempt to read DEBUG flag from parent config.
+# Log levels, lowest first. Fusion has no debug level so debug messages are logged as info.
+DEBUG_LEVEL = 10
+INFO_LEVEL = 20
+WARNING_LEVEL = 30
+ERROR_LEVEL = 40
+
+_LEVEL_NAMES = {'debug': DEBUG_LEVEL, 'info': INFO_LEVEL, 'warning': WARNING_LEVEL, 'error': ERROR_LEVEL}
+
+# Attempt to read DEBUG flag and logging settings from parent config.
 try:
     from ... import config
     DEBUG = config.DEBUG
+    LOG_LEVEL = _LEVEL_NAMES[config.log_level]
+    LOG_FILE_PATH = config.log_file_path
+    LOG_FILE_MAX_BYTES = config.log_file_max_bytes
+    LOG_FILE_BACKUPS = config.log_file_backups
 except:
     DEBUG = False
+    LOG_LEVEL = INFO_LEVEL
+    LOG_FILE_PATH = None
+    LOG_FILE_MAX_BYTES = 1000000
+    LOG_FILE_BACKUPS = 3
+
+# Messages waiting for the next flush as (level, message, args, force_console)
+_buffer = []
+
+# Rotating file sink, opened on first flush if LOG_FILE_PATH is set
+_file_logger = None
+
+
+def debug(message, *args):
+    """Logs a debug message. The message is only formatted if it is written.
+
+    Arguments:
+    message -- A %-style format string, or a callable returning the message.
+    args -- Values for the format string.
+    """
+    if LOG_LEVEL > DEBUG_LEVEL:
+        return
+    _buffer.append((DEBUG_LEVEL, message, args, False))
+
+
+def info(message, *args):
+    """Logs an info message. The message is only formatted if it is written.
+
+    Arguments:
+    message -- A %-style format string, or a callable returning the message.
+    args -- Values for the format string.
+    """
+    if LOG_LEVEL > INFO_LEVEL:
+        return
+    _buffer.append((INFO_LEVEL, message, args, False))
+
+
+def warning(message, *args):
+    """Logs a warning message. The message is only formatted if it is written.
+
+    Arguments:
+    message -- A %-style format string, or a callable returning the message.
+    args -- Values for the format string.
+    """
+    if LOG_LEVEL > WARNING_LEVEL:
+        return
+    _buffer.append((WARNING_LEVEL, message, args, False))
+
+
+def error(message, *args):
+    """Logs an error message and flushes the log right away.
+
+    Arguments:
+    message -- A %-style format string, or a callable returning the message.
+    args -- Values for the format string.
+    """
+    _buffer.append((ERROR_LEVEL, message, args, False))
+    flush_log()
 
 
-def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False):
+def log(message, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False):
     """Utility function to easily handle logging in your app.
 
+    Messages are buffered and written by flush_log, which runs after every
+    event handler. Errors are written immediately.
+
     Arguments:
-    message -- The message to log.
+    message -- The message to log, or a callable returning it so it is only built when written.
     level -- The logging severity level.
     force_console -- Forces the message to be written to the Text Command window. 
-    """    
+    """
+    if level == adsk.core.LogLevels.ErrorLogLevel:
+        _buffer.append((ERROR_LEVEL, message, (), force_console))
+        flush_log()
+        return
+
+    numeric_level = WARNING_LEVEL if level == adsk.core.LogLevels.WarningLogLevel else INFO_LEVEL
+    if LOG_LEVEL > numeric_level and not force_console:
+        return
+    _buffer.append((numeric_level, message, (), force_console))
+
+
+def flush_log():
+    """Writes every buffered message.
+
+    Each flush prints once, writes one block to the Text Command window and
+    one batch to the file sink, instead of once per message.
+    """
+    global _buffer
+    if not _buffer:
+        return
+    records, _buffer = _buffer, []
+
+    lines = []
+    console_lines = []
+    highest_level = INFO_LEVEL
+    for numeric_level, message, args, force_console in records:
+        text = _format_message(message, args)
+        lines.append(text)
+
+        # Log all errors to Fusion log file.
+        if numeric_level == ERROR_LEVEL:
+            app.log(text, adsk.core.LogLevels.ErrorLogLevel, adsk.core.LogTypes.FileLogType)
+
+        # If config.DEBUG is True write all log messages to the console.
+        if DEBUG or force_console:
+            console_lines.append(text)
+            highest_level = max(highest_level, numeric_level)
+
     # Always print to console, only seen through IDE.
-    print(message)  
+    print('\n'.join(lines))
+
+    if console_lines:
+        app.log('\n'.join(console_lines), _fusion_level(highest_level), adsk.core.LogTypes.ConsoleLogType)
+
+    file_logger = _get_file_logger()
+    if file_logger:
+        for (numeric_level, _, _, _), text in zip(records, lines):
+            file_logger.log(numeric_level, text)
+
+
+def _format_message(message, args) -> str:
+    if callable(message):
+        message = message()
+    if args:
+        try:
+            return message % args
+        except (TypeError, ValueError):
+            return f'{message} {args}'
+    return str(message)
+
+
+def _fusion_level(numeric_level: int) -> adsk.core.LogLevels:
+    if numeric_level >= ERROR_LEVEL:
+        return adsk.core.LogLevels.ErrorLogLevel
+    if numeric_level >= WARNING_LEVEL:
+        return adsk.core.LogLevels.WarningLogLevel
+    return adsk.core.LogLevels.InfoLogLevel
 
-    # Log all errors to Fusion log file.
-    if level == adsk.core.LogLevels.ErrorLogLevel:
-        log_type = adsk.core.LogTypes.FileLogType
-        app.log(message, level, log_type)
 
-    # If config.DEBUG is True write all log messages to the console.
-    if DEBUG or force_console:
-        log_type = adsk.core.LogTypes.ConsoleLogType
-        app.log(message, level, log_type)
+def _get_file_logger():
+    global _file_logger
+    if _file_logger is None and LOG_FILE_PATH:
+        _file_logger = logging.getLogger(f'{__name__}.file')
+        _file_logger.propagate = False
+        _file_logger.setLevel(DEBUG_LEVEL)
+        handler = logging.handlers.RotatingFileHandler(LOG_FILE_PATH, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        _file_logger.addHandler(handler)
+    return _file_logger
 
 
 def handle_error(name: str, show_message_box: bool = False):
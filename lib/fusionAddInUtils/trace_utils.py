@@ -0,0 +1,139 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Attempt to read the tracing settings from parent config.
+try:
+    from ... import config
+    _enabled = config.trace_enabled
+    TRACE_BUFFER_SIZE = config.trace_buffer_size
+except:
+    _enabled = False
+    TRACE_BUFFER_SIZE = 10000
+
+# Finished spans as (name, start_ns, duration_ns, thread_id, args), oldest dropped first
+_spans = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        end = time.perf_counter_ns()
+        _spans.append((self.name, self.start, end - self.start, threading.get_ident(), self.args))
+        return False
+
+    def annotate(self, **args):
+        # The recorded span shares this dict, so values can be added after the block ends
+        self.args.update(args)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+    def annotate(self, **args):
+        pass
+
+
+# Shared by every span taken while tracing is off so nothing is allocated
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **args):
+    """Times the enclosed block when tracing is enabled.
+
+    Spans opened inside other spans nest in the exported trace. Values known
+    only later, such as counts, can be added with the span's annotate method.
+
+    Arguments:
+    name -- The name shown for the span, such as 'cap.sketch'.
+    args -- Optional values recorded with the span.
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def traced(name: str = None):
+    """Decorator that wraps every call of a function in a span.
+
+    Arguments:
+    name -- The name shown for the span. Defaults to the function name.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def set_tracing(enabled: bool):
+    """Turns span recording on or off.
+
+    Arguments:
+    enabled -- True to record spans.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_tracing() -> bool:
+    """Returns True if spans are being recorded."""
+    return _enabled
+
+
+def clear_spans():
+    """Drops every recorded span."""
+    _spans.clear()
+
+
+def export_chrome_trace(path: str):
+    """Writes the recorded spans as Chrome trace JSON.
+
+    The file can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+    Arguments:
+    path -- Location of the file to write.
+    """
+    pid = os.getpid()
+    events = []
+    for name, start, duration, thread_id, args in list(_spans):
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': start / 1000.0,
+            'dur': duration / 1000.0,
+            'pid': pid,
+            'tid': thread_id,
+        }
+        if args:
+            event['args'] = {key: str(value) for key, value in args.items()}
+        events.append(event)
+
+    with open(path, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
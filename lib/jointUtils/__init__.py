@@ -0,0 +1,14 @@
+# Pure-Python geometry helpers for dowel joints.
+# Nothing in this package may import adsk so it can be used outside of Fusion.
+from .solver import *
+from .clustering import *
+from .thread_catalog import *
+from .signature import *
+from .dimensions import *
+from .regeneration import *
+from .interference import *
+from .progress import *
+from .planner import *
+from .dowel_ends import *
+from .scan_cache import *
+from .geometry_cache import *
@@ -0,0 +1,291 @@
+"""
+Generates printable caps and connectors from a JSON furniture spec without Fusion.
+
+Run it from the add-in folder:
+
+    python -m lib.jointUtils spec.json output_folder --format stl
+
+The spec lists joints, each with the center, outward normal and radius of
+its dowel ends, or a flat list of dowel ends that are grouped into joints
+automatically. Lengths are in cm unless "units" is "mm".
+
+    {"units": "cm",
+     "joints": [{"name": "leg_1", "dowels": [{"center": [0, 0, 10], "normal": [0, 0, 1], "radius": 0.635}, ...]}]}
+
+    {"dowel_ends": [{"center": [...], "normal": [...], "radius": 0.635}, ...]}
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+
+from .clustering import cluster_dowel_ends
+from .dimensions import cap_outer_radius
+from .export import decode_parts, encode_parts, write_3mf, write_stl
+from .geometry_cache import CANONICAL_FRAME, GeometryCache, joint_cache_key
+from .mesh import Part, joint_parts, transform_mesh
+from .parallel import mesh_joints_parallel
+from .signature import frame_to_frame_matrix, joint_frame, joint_signature
+from .solver import compute_best_intersections, compute_best_intersections_array, has_numpy, pad_joints
+from .thread_catalog import ThreadCatalog
+
+__all__ = ['THREAD_TYPE', 'CACHE_SUFFIX', 'DEFAULT_CACHE_MB', 'DEFAULT_SEARCH_RADIUS', 'DEFAULT_AXIS_TOLERANCE',
+           'load_spec', 'solve_joints', 'generate', 'plan_cached_joints', 'place_parts', 'main']
+
+THREAD_TYPE = 'ISO Metric profile'
+
+# File extension of the packed meshes kept in the geometry cache
+CACHE_SUFFIX = '.djp'
+DEFAULT_CACHE_MB = 200
+
+# Defaults used to group a flat list of dowel ends into joints (in cm)
+DEFAULT_SEARCH_RADIUS = 5.0
+DEFAULT_AXIS_TOLERANCE = 0.05
+
+
+def load_spec(path):
+    """
+    Reads a furniture spec and returns its joints in cm.
+
+    Args:
+        path (str): Location of the JSON spec.
+
+    Returns:
+        list of dict: Joints with 'name', 'centers', 'normals' and 'radii'.
+    """
+    with open(path, 'r') as spec_file:
+        spec = json.load(spec_file)
+
+    scale = 0.1 if spec.get('units', 'cm') == 'mm' else 1.0
+
+    def read_dowels(dowels):
+        centers = [tuple(c * scale for c in dowel['center']) for dowel in dowels]
+        normals = [tuple(dowel['normal']) for dowel in dowels]
+        radii = [dowel['radius'] * scale for dowel in dowels]
+        return centers, normals, radii
+
+    joints = []
+    if 'joints' in spec:
+        for index, joint in enumerate(spec['joints']):
+            centers, normals, radii = read_dowels(joint['dowels'])
+            joints.append({'name': joint.get('name', f'joint_{index}'), 'centers': centers, 'normals': normals, 'radii': radii})
+    else:
+        centers, normals, radii = read_dowels(spec['dowel_ends'])
+        search_radius = spec.get('search_radius', DEFAULT_SEARCH_RADIUS / scale) * scale
+        axis_tolerance = spec.get('axis_tolerance', DEFAULT_AXIS_TOLERANCE / scale) * scale
+        for index, cluster in enumerate(cluster_dowel_ends(centers, normals, search_radius, axis_tolerance)):
+            joints.append({
+                'name': f'joint_{index}',
+                'centers': [centers[i] for i in cluster],
+                'normals': [normals[i] for i in cluster],
+                'radii': [radii[i] for i in cluster],
+            })
+    return joints
+
+
+def solve_joints(joints):
+    """
+    Solves the point of every joint, with NumPy when it is installed.
+
+    Args:
+        joints (list of dict): Joints from load_spec.
+
+    Returns:
+        tuple: (points, residuals, conditions) as from compute_best_intersections.
+    """
+    centers = [joint['centers'] for joint in joints]
+    normals = [joint['normals'] for joint in joints]
+    if not has_numpy() or not joints:
+        return compute_best_intersections(centers, normals)
+
+    points, residuals, conditions = compute_best_intersections_array(*pad_joints(centers, normals))
+    # Unsolved joints come back as NaN rows
+    residuals = [None if math.isnan(residual) else residual for residual in residuals.tolist()]
+    points = [None if residual is None else tuple(point) for point, residual in zip(points.tolist(), residuals)]
+    return points, residuals, conditions.tolist()
+
+
+def generate(joints, output_folder, file_format='stl', segments=64, catalog=None, workers=1, threaded=False, cache=None):
+    """
+    Solves every joint and writes its caps and connectors.
+
+    Args:
+        joints (list of dict): Joints from load_spec.
+        output_folder (str): Folder that receives the files and a manifest.json.
+        file_format (str): 'stl' for one file per part or '3mf' for one file per joint.
+        segments (int): Number of segments around each dowel axis.
+        catalog (ThreadCatalog): Optional catalog used to name the thread of every cap.
+        workers (int): Number of processes meshing joints, 1 to mesh in this process.
+        threaded (bool): Model the ISO coarse thread between every cap and its connector.
+        cache (GeometryCache): Cache of meshed joints shared between runs, or None.
+
+    Returns:
+        dict: The manifest, listing the files and thread designations of every joint.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    points, residuals, conditions = solve_joints(joints)
+
+    manifest = {'joints': []}
+    jobs = []
+    for index, (joint, point, residual, condition) in enumerate(zip(joints, points, residuals, conditions)):
+        entry = {'name': joint['name'], 'files': []}
+        manifest['joints'].append(entry)
+        if point is None:
+            entry['error'] = f'dowels are too close to parallel (condition estimate {condition:.3g})'
+            continue
+        entry['point'] = list(point)
+        entry['residual'] = residual
+
+        if catalog is not None:
+            entry['threads'] = []
+            for radius in joint['radii']:
+                size = catalog.nearest(cap_outer_radius(radius) * 2 * 10)
+                entry['threads'].append(size.designation if size else None)
+
+        jobs.append((index, point, joint['centers'], joint['radii']))
+
+    # Joints congruent to one meshed before are moved into place instead of meshed again
+    reused = []
+    if cache is not None:
+        jobs, reused, store = plan_cached_joints(jobs, cache, segments, threaded)
+
+    # Every joint is independent once its point is known, so meshing can be spread over processes
+    if workers > 1 and len(jobs) > 1:
+        results = mesh_joints_parallel(jobs, workers, segments, threaded)
+    else:
+        results = ((index, joint_parts(point, centers, radii, segments, threaded)) for index, point, centers, radii in jobs)
+    if cache is not None:
+        results = itertools.chain(reused, store(results))
+
+    # Files are written as joints finish instead of after all of them
+    for index, parts in results:
+        name = joints[index]['name']
+        entry = manifest['joints'][index]
+        if file_format == '3mf':
+            path = os.path.join(output_folder, f'{name}.3mf')
+            write_3mf(path, [(f'{part.kind}_{part.dowel}', part.mesh) for part in parts])
+            entry['files'].append(os.path.basename(path))
+        else:
+            for part in parts:
+                path = os.path.join(output_folder, f'{name}_{part.kind}_{part.dowel}.stl')
+                write_stl(path, part.mesh)
+                entry['files'].append(os.path.basename(path))
+
+    if cache is not None:
+        stats = cache.stats
+        manifest['cache'] = {'hits': stats.hits, 'misses': stats.misses, 'writes': stats.writes,
+                             'evictions': stats.evictions, 'entries': stats.entries, 'bytes': stats.bytes}
+
+    with open(os.path.join(output_folder, 'manifest.json'), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+
+def plan_cached_joints(jobs, cache, segments, threaded):
+    """
+    Splits meshing jobs into joints found in the cache and joints that must be meshed.
+
+    Cached parts are stored in the canonical frame with their dowels in
+    canonical order, so they fit every joint with the same signature.
+
+    Args:
+        jobs (list of tuple): (index, point, centers, radii) of every joint.
+        cache (GeometryCache): The cache.
+        segments (int): Number of segments around each dowel axis.
+        threaded (bool): Whether threads are modeled.
+
+    Returns:
+        tuple: The jobs left to mesh, (index, parts) of the joints taken from the cache, and a
+            function that takes the (index, parts) results of the meshed jobs and yields them,
+            storing them in the cache and adding every joint that shares their key.
+    """
+    placements = {}
+    canonical = {}
+    keys = {}
+    followers = {}
+    remaining = []
+    reused = []
+    for index, point, centers, radii in jobs:
+        signature, order = joint_signature(point, centers, radii)
+        frame = joint_frame(point, centers, order)
+        placements[index] = (order, frame)
+        # Mesh threads follow from the radii, so no designations are needed
+        key = joint_cache_key(signature, [], format='mesh', segments=segments, threaded=threaded)
+        if key in followers:
+            # Congruent to a joint meshed in this run
+            followers[key].append(index)
+            continue
+        if key not in canonical:
+            data = cache.read_bytes(key, CACHE_SUFFIX)
+            parts = decode_parts(data) if data is not None else None
+            if parts is None:
+                keys[index] = key
+                followers[key] = []
+                remaining.append((index, point, centers, radii))
+                continue
+            canonical[key] = parts
+        reused.append((index, place_parts(canonical[key], order, frame)))
+
+    def store(results):
+        for index, parts in results:
+            yield index, parts
+            key = keys[index]
+            order, frame = placements[index]
+            # Parts go into the canonical frame, with dowel i of the canonical order numbered i
+            matrix = frame_to_frame_matrix(frame, CANONICAL_FRAME)
+            parts = [Part(part.kind, order.index(part.dowel), transform_mesh(part.mesh, matrix)) for part in parts]
+            cache.put_bytes(key, CACHE_SUFFIX, encode_parts(parts))
+            for other in followers[key]:
+                yield other, place_parts(parts, *placements[other])
+
+    return remaining, reused, store
+
+
+def place_parts(parts, order, frame):
+    """
+    Moves canonical parts onto a joint.
+
+    Args:
+        parts (list of Part): Parts in the canonical frame, with dowels in canonical order.
+        order (list of int): Canonical dowel order of the joint, from joint_signature.
+        frame (tuple): Frame of the joint, from joint_frame.
+
+    Returns:
+        list of Part: The parts of the joint, numbered by its own dowels.
+    """
+    matrix = frame_to_frame_matrix(CANONICAL_FRAME, frame)
+    return [Part(part.kind, order[part.dowel], transform_mesh(part.mesh, matrix)) for part in parts]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate printable dowel joint caps and connectors.')
+    parser.add_argument('spec', help='JSON furniture spec')
+    parser.add_argument('output', help='folder for the generated files')
+    parser.add_argument('--format', choices=['stl', '3mf'], default='stl', help='output file format')
+    parser.add_argument('--segments', type=int, default=64, help='segments around each dowel axis')
+    parser.add_argument('--threads', action='store_true', help='model the thread between caps and connectors')
+    parser.add_argument('--workers', type=int, default=1, help='processes used to mesh joints')
+    parser.add_argument('--thread-catalog', help='thread_catalog.json written by the add-in, used to name thread sizes')
+    parser.add_argument('--cache', help='folder of meshed joints reused across runs')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_MB, help='megabytes the cache folder is kept under')
+    args = parser.parse_args(argv)
+
+    catalog = None
+    if args.thread_catalog:
+        catalog = ThreadCatalog.load(args.thread_catalog, THREAD_TYPE)
+        if catalog is None:
+            print(f'Could not read a thread catalog from {args.thread_catalog}', file=sys.stderr)
+            return 1
+
+    cache = GeometryCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+
+    joints = load_spec(args.spec)
+    manifest = generate(joints, args.output, args.format, args.segments, catalog, args.workers, args.threads, cache)
+
+    failed = [entry for entry in manifest['joints'] if 'error' in entry]
+    print(f'Generated {len(joints) - len(failed)} of {len(joints)} joints in {args.output}')
+    for entry in failed:
+        print(f'Skipped {entry["name"]}: {entry["error"]}', file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,138 @@
+import itertools
+import math
+
+__all__ = ['cluster_dowel_ends', 'cluster_flat_dowel_ends', 'axes_meet']
+
+
+def cluster_dowel_ends(centers, normals, reach, tolerance):
+    """
+    Groups dowel ends into joints by where their axes meet.
+
+    Two ends are linked when the closest approach of their axes is within
+    tolerance and lies in front of both ends, no further than reach along
+    each outward normal. Only ends whose centers share a neighbourhood of a
+    uniform grid with cells of 2 * reach are compared, so the cost grows with
+    the number of nearby pairs instead of with the square of the end count.
+
+    Args:
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        normals (list of tuple): (x, y, z) outward direction of every dowel end.
+        reach (float): Largest distance from an end to the joint point.
+        tolerance (float): Largest gap between two axes that still meet.
+
+    Returns:
+        list of list of int: Indices of the ends in each joint, for joints
+            with at least two ends, ordered by their lowest index.
+    """
+    return cluster_flat_dowel_ends([value for center in centers for value in center],
+                                   [value for normal in normals for value in normal], reach, tolerance)
+
+
+def cluster_flat_dowel_ends(centers, normals, reach, tolerance):
+    """
+    Groups dowel ends stored as flat coordinates into joints, see cluster_dowel_ends.
+
+    The coordinates are read in place, so the arrays of a DowelEndSet are
+    clustered without building a tuple per end.
+
+    Args:
+        centers (sequence of float): x, y and z of the center of every dowel end, such as an array('d').
+        normals (sequence of float): x, y and z of the outward direction of every dowel end.
+        reach (float): Largest distance from an end to the joint point.
+        tolerance (float): Largest gap between two axes that still meet.
+
+    Returns:
+        list of list of int: Indices of the ends in each joint, for joints
+            with at least two ends, ordered by their lowest index.
+    """
+    count = len(centers) // 3
+    cell_size = 2.0 * reach
+
+    # Normalize directions once up front and bucket every end into the grid. Ends without a
+    # direction are never linked, so they are left out of the grid.
+    units = [0.0] * (3 * count)
+    grid = {}
+    for i in range(count):
+        k = 3 * i
+        dx, dy, dz = normals[k], normals[k + 1], normals[k + 2]
+        length = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if length == 0.0:
+            continue
+        units[k] = dx / length
+        units[k + 1] = dy / length
+        units[k + 2] = dz / length
+        cell = (math.floor(centers[k] / cell_size), math.floor(centers[k + 1] / cell_size),
+                math.floor(centers[k + 2] / cell_size))
+        grid.setdefault(cell, []).append(i)
+
+    parents = list(range(count))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    # Every pair of neighbouring cells is visited once, from the cell whose offset to the other is positive
+    offsets = [(a, b, c) for a in (-1, 0, 1) for b in (-1, 0, 1) for c in (-1, 0, 1) if (a, b, c) > (0, 0, 0)]
+    for (cx, cy, cz), members in grid.items():
+        neighbours = []
+        for ox, oy, oz in offsets:
+            neighbours.extend(grid.get((cx + ox, cy + oy, cz + oz), ()))
+        for position, i in enumerate(members):
+            k = 3 * i
+            px, py, pz = centers[k], centers[k + 1], centers[k + 2]
+            dx, dy, dz = units[k], units[k + 1], units[k + 2]
+            # Later ends of the same cell, then every end of the neighbouring cells
+            for j in itertools.chain(members[position + 1:], neighbours):
+                m = 3 * j
+                if _axes_meet(px, py, pz, dx, dy, dz, centers[m], centers[m + 1], centers[m + 2],
+                              units[m], units[m + 1], units[m + 2], reach, tolerance):
+                    root_i = find(i)
+                    root_j = find(j)
+                    if root_i != root_j:
+                        parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return [group for root, group in sorted(groups.items()) if len(group) > 1]
+
+
+def axes_meet(p, d, q, e, reach, tolerance):
+    """
+    Checks whether two dowel axes meet in front of both ends.
+
+    Args:
+        p, q (tuple): (x, y, z) centers of the two ends.
+        d, e (tuple): Unit outward directions of the two ends.
+        reach (float): Largest distance along each axis to the meeting point.
+        tolerance (float): Largest gap between the axes at closest approach.
+
+    Returns:
+        bool: True if the axes meet within reach and tolerance.
+    """
+    return _axes_meet(p[0], p[1], p[2], d[0], d[1], d[2], q[0], q[1], q[2], e[0], e[1], e[2], reach, tolerance)
+
+
+def _axes_meet(px, py, pz, dx, dy, dz, qx, qy, qz, ex, ey, ez, reach, tolerance):
+    wx = px - qx
+    wy = py - qy
+    wz = pz - qz
+    b = dx * ex + dy * ey + dz * ez
+    dw = dx * wx + dy * wy + dz * wz
+    ew = ex * wx + ey * wy + ez * wz
+    denom = 1.0 - b * b
+    if denom < 1e-9:
+        # Parallel axes, such as the two ends of one dowel, never form a joint
+        return False
+
+    t = (b * ew - dw) / denom
+    s = (ew - b * dw) / denom
+    if t < -tolerance or s < -tolerance or t > reach or s > reach:
+        return False
+
+    gx = wx + t * dx - s * ex
+    gy = wy + t * dy - s * ey
+    gz = wz + t * dz - s * ez
+    return gx * gx + gy * gy + gz * gz <= tolerance * tolerance
@@ -0,0 +1,49 @@
+# Dimension rules shared by every way of building a joint (in cm)
+
+__all__ = ['WALL_THICKNESS', 'CAP_HEIGHT', 'OVERLAP_AMOUNT', 'CONNECTOR_OFFSET', 'THREAD_CLEARANCE',
+           'cap_outer_radius', 'connector_outer_radius', 'connector_bore_radius']
+
+WALL_THICKNESS = 0.4  # 4 mm wall thickness
+CAP_HEIGHT = 1.0  # 10 mm of cap sliding over the dowel
+OVERLAP_AMOUNT = 0.5  # 5 mm of cap past the dowel end, closed off at the end
+CONNECTOR_OFFSET = 1.0  # Connectors start 10 mm back along the dowel to cover the cap
+THREAD_CLEARANCE = 0.02  # 0.2 mm between a cap and the connector bore it screws into
+
+
+def cap_outer_radius(radius):
+    """
+    Radius of the threaded outside of a cap.
+
+    Args:
+        radius (float): Dowel radius.
+
+    Returns:
+        float: Outer radius of the cap.
+    """
+    return radius + WALL_THICKNESS
+
+
+def connector_outer_radius(radius):
+    """
+    Radius of the outside of a connector tube.
+
+    Args:
+        radius (float): Dowel radius.
+
+    Returns:
+        float: Outer radius of the connector.
+    """
+    return radius + 2 * WALL_THICKNESS
+
+
+def connector_bore_radius(radius):
+    """
+    Radius of the threaded bore of a connector that a cap screws into.
+
+    Args:
+        radius (float): Dowel radius.
+
+    Returns:
+        float: Bore radius of the connector.
+    """
+    return cap_outer_radius(radius) + THREAD_CLEARANCE
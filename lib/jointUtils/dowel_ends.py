@@ -0,0 +1,145 @@
+from array import array
+
+__all__ = ['DowelEnd', 'DowelEndSet']
+
+
+class DowelEnd:
+    """
+    Center, outward normal and radius of one dowel end, as plain floats.
+    """
+
+    __slots__ = ('x', 'y', 'z', 'nx', 'ny', 'nz', 'radius')
+
+    def __init__(self, center, normal, radius):
+        """
+        Args:
+            center (tuple): (x, y, z) center of the end.
+            normal (tuple): (x, y, z) outward normal of the end.
+            radius (float): Dowel radius.
+        """
+        self.x, self.y, self.z = center
+        self.nx, self.ny, self.nz = normal
+        self.radius = radius
+
+    @property
+    def center(self):
+        """(x, y, z) center of the end."""
+        return (self.x, self.y, self.z)
+
+    @property
+    def normal(self):
+        """(x, y, z) outward normal of the end."""
+        return (self.nx, self.ny, self.nz)
+
+    def values(self):
+        """
+        Returns:
+            tuple: (center, normal, radius), as taken by the planner and the regeneration hashes.
+        """
+        return (self.x, self.y, self.z), (self.nx, self.ny, self.nz), self.radius
+
+    def __repr__(self):
+        return f'DowelEnd({self.center}, {self.normal}, {self.radius})'
+
+
+class DowelEndSet:
+    """
+    Many dowel ends stored as three flat arrays of doubles, for whole-design scans.
+
+    Ends are addressed by index, so anything that belongs to an end but is
+    not a number, such as the Fusion face it was read from, is kept in a
+    separate list with the same indices.
+    """
+
+    def __init__(self):
+        self._centers = array('d')
+        self._normals = array('d')
+        self.radii = array('d')
+
+    def __len__(self):
+        return len(self.radii)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.radii)
+        i = 3 * index
+        return DowelEnd(self._centers[i:i + 3], self._normals[i:i + 3], self.radii[index])
+
+    def __iter__(self):
+        for index in range(len(self.radii)):
+            yield self[index]
+
+    def add(self, center, normal, radius):
+        """
+        Appends an end.
+
+        Args:
+            center (tuple): (x, y, z) center of the end.
+            normal (tuple): (x, y, z) outward normal of the end.
+            radius (float): Dowel radius.
+
+        Returns:
+            int: Index of the new end.
+        """
+        self._centers.extend(center)
+        self._normals.extend(normal)
+        self.radii.append(radius)
+        return len(self.radii) - 1
+
+    def values(self, index):
+        """
+        Reads one end without creating a DowelEnd.
+
+        Args:
+            index (int): Index of the end.
+
+        Returns:
+            tuple: (center, normal, radius).
+        """
+        i = 3 * index
+        centers = self._centers
+        normals = self._normals
+        return (centers[i], centers[i + 1], centers[i + 2]), (normals[i], normals[i + 1], normals[i + 2]), self.radii[index]
+
+    def centers(self):
+        """
+        Returns:
+            list of tuple: (x, y, z) center of every end.
+        """
+        centers = self._centers
+        return list(zip(centers[0::3], centers[1::3], centers[2::3]))
+
+    def normals(self):
+        """
+        Returns:
+            list of tuple: (x, y, z) normal of every end.
+        """
+        normals = self._normals
+        return list(zip(normals[0::3], normals[1::3], normals[2::3]))
+
+    @property
+    def flat_centers(self):
+        """The x, y and z of every center in one array('d'), shared with the set and not to be modified."""
+        return self._centers
+
+    @property
+    def flat_normals(self):
+        """The x, y and z of every normal in one array('d'), shared with the set and not to be modified."""
+        return self._normals
+
+    def select(self, indices):
+        """
+        Reads a group of ends, such as the ends of one joint.
+
+        Args:
+            indices (list of int): Indices of the ends.
+
+        Returns:
+            list of tuple: (center, normal, radius) of every end, in the order of indices.
+        """
+        return [self.values(index) for index in indices]
+
+    @property
+    def nbytes(self):
+        """Bytes used by the stored numbers."""
+        return (len(self._centers) + len(self._normals) + len(self.radii)) * self.radii.itemsize
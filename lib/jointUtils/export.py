@@ -0,0 +1,153 @@
+import struct
+import zipfile
+from xml.sax.saxutils import escape
+
+from .mesh import Mesh, Part
+
+__all__ = ['MM_PER_CM', 'write_stl', 'write_stl_bytes', 'write_3mf', 'encode_parts', 'decode_parts']
+
+# Joint geometry is in cm, print files are in mm
+MM_PER_CM = 10.0
+
+# First bytes of the parts packed by encode_parts
+_PARTS_MAGIC = b'DJP1'
+
+_CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>'''
+
+_RELS = '''<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>'''
+
+
+def write_stl(path, mesh, scale=MM_PER_CM):
+    """
+    Writes a mesh as binary STL.
+
+    Args:
+        path (str): Location of the file to write.
+        mesh (Mesh): The mesh, in cm.
+        scale (float): Factor applied to every coordinate, mm by default.
+    """
+    with open(path, 'wb') as stl_file:
+        stl_file.write(write_stl_bytes(mesh, scale))
+
+
+def write_stl_bytes(mesh, scale=MM_PER_CM):
+    """
+    Encodes a mesh as binary STL.
+
+    Args:
+        mesh (Mesh): The mesh, in cm.
+        scale (float): Factor applied to every coordinate, mm by default.
+
+    Returns:
+        bytes: The STL file contents.
+    """
+    vertices = [(x * scale, y * scale, z * scale) for x, y, z in mesh.vertices]
+    record = struct.Struct('<12fH')
+    chunks = [b'dowel joint'.ljust(80, b'\0'), struct.pack('<I', len(mesh.triangles))]
+    for a, b, c in mesh.triangles:
+        ax, ay, az = vertices[a]
+        bx, by, bz = vertices[b]
+        cx, cy, cz = vertices[c]
+        ux, uy, uz = bx - ax, by - ay, bz - az
+        vx, vy, vz = cx - ax, cy - ay, cz - az
+        nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+        length = (nx * nx + ny * ny + nz * nz) ** 0.5 or 1.0
+        chunks.append(record.pack(nx / length, ny / length, nz / length, ax, ay, az, bx, by, bz, cx, cy, cz, 0))
+    return b''.join(chunks)
+
+
+def write_3mf(path, meshes, scale=MM_PER_CM):
+    """
+    Writes meshes as the objects of one 3MF file.
+
+    Args:
+        path (str): Location of the file to write.
+        meshes (list of tuple): (name, Mesh) pairs, in cm.
+        scale (float): Factor applied to every coordinate, mm by default.
+    """
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">',
+        '<resources>',
+    ]
+    for object_id, (name, mesh) in enumerate(meshes, start=1):
+        name = escape(name, {'"': '&quot;'})
+        lines.append(f'<object id="{object_id}" name="{name}" type="model"><mesh><vertices>')
+        lines.extend(f'<vertex x="{x * scale:.5f}" y="{y * scale:.5f}" z="{z * scale:.5f}"/>' for x, y, z in mesh.vertices)
+        lines.append('</vertices><triangles>')
+        lines.extend(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in mesh.triangles)
+        lines.append('</triangles></mesh></object>')
+    lines.append('</resources>')
+    lines.append('<build>')
+    lines.extend(f'<item objectid="{object_id}"/>' for object_id in range(1, len(meshes) + 1))
+    lines.append('</build>')
+    lines.append('</model>')
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _RELS)
+        archive.writestr('3D/3dmodel.model', '\n'.join(lines))
+
+
+def encode_parts(parts):
+    """
+    Packs the parts of a joint into bytes, for the geometry cache.
+
+    Args:
+        parts (list of Part): Parts from joint_parts.
+
+    Returns:
+        bytes: The packed parts, read back by decode_parts.
+    """
+    chunks = [_PARTS_MAGIC, struct.pack('<I', len(parts))]
+    for part in parts:
+        kind = part.kind.encode('utf-8')
+        vertices = part.mesh.vertices
+        triangles = part.mesh.triangles
+        chunks.append(struct.pack('<B', len(kind)) + kind)
+        chunks.append(struct.pack('<III', part.dowel, len(vertices), len(triangles)))
+        chunks.append(struct.pack(f'<{3 * len(vertices)}d', *(value for vertex in vertices for value in vertex)))
+        chunks.append(struct.pack(f'<{3 * len(triangles)}I', *(index for triangle in triangles for index in triangle)))
+    return b''.join(chunks)
+
+
+def decode_parts(data):
+    """
+    Unpacks parts written by encode_parts.
+
+    Args:
+        data (bytes): The packed parts.
+
+    Returns:
+        list of Part: The parts, or None if data is not packed parts.
+    """
+    if not data.startswith(_PARTS_MAGIC):
+        return None
+    try:
+        offset = len(_PARTS_MAGIC)
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        parts = []
+        for _ in range(count):
+            (kind_length,) = struct.unpack_from('<B', data, offset)
+            kind = data[offset + 1:offset + 1 + kind_length].decode('utf-8')
+            offset += 1 + kind_length
+            dowel, vertex_count, triangle_count = struct.unpack_from('<III', data, offset)
+            offset += 12
+            values = struct.unpack_from(f'<{3 * vertex_count}d', data, offset)
+            offset += 24 * vertex_count
+            indices = struct.unpack_from(f'<{3 * triangle_count}I', data, offset)
+            offset += 12 * triangle_count
+            vertices = list(zip(values[0::3], values[1::3], values[2::3]))
+            triangles = list(zip(indices[0::3], indices[1::3], indices[2::3]))
+            parts.append(Part(kind, dowel, Mesh(vertices, triangles)))
+    except (struct.error, UnicodeDecodeError):
+        return None
+    return parts
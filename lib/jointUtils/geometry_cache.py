@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import namedtuple
+
+from .dimensions import CAP_HEIGHT, CONNECTOR_OFFSET, OVERLAP_AMOUNT, THREAD_CLEARANCE, WALL_THICKNESS
+
+__all__ = ['GEOMETRY_CACHE_VERSION', 'CANONICAL_FRAME', 'STALE_TEMP_AGE', 'CacheStats', 'joint_cache_key',
+           'GeometryCache']
+
+# Bump whenever the geometry of a joint or the layout of an entry changes, old entries are then never hit
+GEOMETRY_CACHE_VERSION = 1
+
+# Frame every cached joint is stored in, so an entry can be moved onto any congruent joint
+CANONICAL_FRAME = ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+# Temporary files older than this (in seconds) were left by a writer that died and are removed
+STALE_TEMP_AGE = 3600.0
+
+_TEMP_PREFIX = 'tmp-'
+
+# Lookups and changes made through one cache object, with the entries and bytes found on disk
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'writes', 'evictions', 'entries', 'bytes'])
+
+
+def joint_cache_key(signature, designations, **options):
+    """
+    Hashes everything that decides the geometry of a joint into a cache key.
+
+    The key covers the joint signature, which holds the radii, lengths and
+    relative angles of the dowels, the thread designation of every dowel,
+    the dimension rules and any build options, so a cached joint is only
+    reused where building it again would give the same shape.
+
+    Args:
+        signature (tuple): Signature from joint_signature.
+        designations (list of str): Thread designation of every dowel in canonical order, or None where unknown.
+        **options: Anything else the geometry depends on, such as the mesh segments or the file format.
+
+    Returns:
+        str: Hex digest naming the entry.
+    """
+    canonical = {
+        'version': GEOMETRY_CACHE_VERSION,
+        'signature': signature,
+        'threads': list(designations),
+        'dimensions': [WALL_THICKNESS, CAP_HEIGHT, OVERLAP_AMOUNT, CONNECTOR_OFFSET, THREAD_CLEARANCE],
+        'options': options,
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+class GeometryCache:
+    """
+    Directory of joint geometry files named by their content key, shared by every document and process.
+
+    Entries are written to a temporary file and renamed into place, so a
+    reader sees either nothing or a whole file, and two processes writing
+    the same key leave one good copy. Reading an entry refreshes its
+    modification time, and the oldest entries are deleted once the
+    directory grows past max_bytes.
+
+    The directory is only listed by the first write and whenever the size
+    tracked since then goes past max_bytes. Entries written by other
+    processes in between are counted at that next listing.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        Args:
+            directory (str): Folder holding the entries, created when missing.
+            max_bytes (int): Size the entries are trimmed back to after every write.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        # Size of every entry by path, or None until the directory has been listed
+        self._sizes = None
+        self._total = 0
+
+    def path(self, key, suffix):
+        """
+        Args:
+            key (str): Key from joint_cache_key.
+            suffix (str): File extension of the entry, such as '.smt'.
+
+        Returns:
+            str: Location of the entry, whether it exists or not.
+        """
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key, suffix):
+        """
+        Looks up an entry and counts the hit or miss.
+
+        Args:
+            key (str): Key from joint_cache_key.
+            suffix (str): File extension of the entry.
+
+        Returns:
+            str: Location of the entry, or None if it is not cached.
+        """
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def read_bytes(self, key, suffix):
+        """
+        Reads an entry, see get.
+
+        Args:
+            key (str): Key from joint_cache_key.
+            suffix (str): File extension of the entry.
+
+        Returns:
+            bytes: The entry, or None if it is not cached.
+        """
+        path = self.get(key, suffix)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as entry_file:
+                return entry_file.read()
+        except OSError:
+            # Evicted by another process between the lookup and the read
+            self.hits -= 1
+            self.misses += 1
+            return None
+
+    def put(self, key, suffix, write):
+        """
+        Stores an entry written by a callback.
+
+        Args:
+            key (str): Key from joint_cache_key.
+            suffix (str): File extension of the entry.
+            write (callable): Takes a path ending in suffix and writes the entry there. Returning
+                False means nothing was written.
+
+        Returns:
+            str: Location of the entry, or None if it could not be written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = os.path.join(self.directory, f'{_TEMP_PREFIX}{os.getpid()}-{uuid.uuid4().hex}{suffix}')
+        path = self.path(key, suffix)
+        try:
+            if write(temp_path) is False or not os.path.exists(temp_path):
+                return None
+            os.replace(temp_path, path)
+        except OSError:
+            # Usually another process holding the same entry open, which is as good as having written it
+            return path if os.path.exists(path) else None
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        self.writes += 1
+        if self._sizes is None:
+            self.evict()
+            return path
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        self._total += size - self._sizes.get(path, 0)
+        self._sizes[path] = size
+        if self._total > self.max_bytes:
+            self.evict()
+        return path
+
+    def put_bytes(self, key, suffix, data):
+        """
+        Stores an entry, see put.
+
+        Args:
+            key (str): Key from joint_cache_key.
+            suffix (str): File extension of the entry.
+            data (bytes): Contents of the entry.
+
+        Returns:
+            str: Location of the entry, or None if it could not be written.
+        """
+        def write(temp_path):
+            with open(temp_path, 'wb') as entry_file:
+                entry_file.write(data)
+
+        return self.put(key, suffix, write)
+
+    def _scan(self):
+        # (modification time, size, path) of every entry, and the temporary files left by dead writers
+        entries = []
+        stale = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries, stale
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            if name.startswith(_TEMP_PREFIX):
+                if now - status.st_mtime > STALE_TEMP_AGE:
+                    stale.append(path)
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+        return entries, stale
+
+    def evict(self):
+        """
+        Deletes the least recently used entries until the directory fits in max_bytes.
+
+        The directory is listed again, so the tracked size starts over from what is on disk.
+
+        Returns:
+            int: Number of entries deleted.
+        """
+        entries, stale = self._scan()
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        sizes = {path: size for _, size, path in entries}
+        total = sum(sizes.values())
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Gone already, or open in another process, which evicts it later
+                continue
+            del sizes[path]
+            total -= size
+            removed += 1
+        self.evictions += removed
+        self._sizes = sizes
+        self._total = total
+        return removed
+
+    def clear(self):
+        """
+        Deletes every entry and resets the counters.
+        """
+        entries, _ = self._scan()
+        for _, _, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.hits = self.misses = self.writes = self.evictions = 0
+        self._sizes = {}
+        self._total = 0
+
+    @property
+    def tracked_bytes(self):
+        """Size of the entries as tracked since the last listing, without reading the directory."""
+        return self._total
+
+    @property
+    def stats(self):
+        """CacheStats of this cache object and its directory, which is listed to fill entries and bytes."""
+        entries, _ = self._scan()
+        return CacheStats(self.hits, self.misses, self.writes, self.evictions, len(entries),
+                          sum(size for _, size, _ in entries))
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that found an entry."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,219 @@
+import math
+from collections import namedtuple
+
+from .dimensions import CAP_HEIGHT, CONNECTOR_OFFSET, OVERLAP_AMOUNT, cap_outer_radius, connector_outer_radius
+
+__all__ = ['BVH_LEAF_SIZE', 'Capsule', 'Interference', 'InterferenceReport', 'joint_capsules', 'expected_contact',
+           'segment_distance', 'check_interference']
+
+# Primitives per leaf of the bounding volume hierarchy
+BVH_LEAF_SIZE = 4
+
+# A planned cap or connector, modeled as the set of points within radius of a segment
+Capsule = namedtuple('Capsule', ['start', 'end', 'radius', 'joint', 'dowel', 'kind'])
+
+# Two capsules closer than the requested margin, with the gap between their surfaces (negative when they overlap)
+Interference = namedtuple('Interference', ['first', 'second', 'clearance'])
+
+# Result of an interference check: overlapping pairs, the smallest gap seen and how many pairs were measured
+InterferenceReport = namedtuple('InterferenceReport', ['conflicts', 'min_clearance', 'pairs_tested'])
+
+
+def joint_capsules(point, centers, radii, joint=None):
+    """
+    Plans the cap and connector of every dowel in a joint as capsules.
+
+    Args:
+        point (tuple): (x, y, z) joint point.
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        radii (list of float): Radius of every dowel.
+        joint: Identifier of the joint stored on the capsules, such as its index.
+
+    Returns:
+        list of Capsule: A cap and a connector for every dowel.
+    """
+    capsules = []
+    for dowel, (center, radius) in enumerate(zip(centers, radii)):
+        dx = point[0] - center[0]
+        dy = point[1] - center[1]
+        dz = point[2] - center[2]
+        length = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if length == 0.0:
+            continue
+        dx /= length
+        dy /= length
+        dz /= length
+
+        def along(distance):
+            return (center[0] + dx * distance, center[1] + dy * distance, center[2] + dz * distance)
+
+        capsules.append(Capsule(along(-CAP_HEIGHT), along(OVERLAP_AMOUNT), cap_outer_radius(radius), joint, dowel, 'cap'))
+        capsules.append(Capsule(along(-CONNECTOR_OFFSET), tuple(point), connector_outer_radius(radius), joint, dowel, 'connector'))
+    return capsules
+
+
+def expected_contact(first, second):
+    """
+    Checks if two capsules are meant to touch.
+
+    The connectors of a joint are united at the joint point and every cap
+    sits inside its own connector, so those pairs are not interference.
+    Every connector bore is cut from the united connectors, so a cap that
+    reaches into another connector of its joint is bored free as well.
+    Measuring that pair would also be misleading: the rounded end of a
+    connector capsule at the joint point reaches past the flat end of the
+    real connector, and compact joints would report overlaps that the
+    built parts do not have.
+
+    Args:
+        first (Capsule): A capsule.
+        second (Capsule): Another capsule.
+
+    Returns:
+        bool: True for pairs that are allowed to overlap.
+    """
+    if first.joint != second.joint:
+        return False
+    return first.dowel == second.dowel or first.kind == 'connector' or second.kind == 'connector'
+
+
+def segment_distance(p0, p1, q0, q1):
+    """
+    Computes the smallest distance between two line segments.
+
+    Args:
+        p0, p1 (tuple): (x, y, z) ends of the first segment.
+        q0, q1 (tuple): (x, y, z) ends of the second segment.
+
+    Returns:
+        float: The distance between the closest points of the segments.
+    """
+    d1 = (p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2])
+    d2 = (q1[0] - q0[0], q1[1] - q0[1], q1[2] - q0[2])
+    r = (p0[0] - q0[0], p0[1] - q0[1], p0[2] - q0[2])
+    a = d1[0] * d1[0] + d1[1] * d1[1] + d1[2] * d1[2]
+    e = d2[0] * d2[0] + d2[1] * d2[1] + d2[2] * d2[2]
+    f = d2[0] * r[0] + d2[1] * r[1] + d2[2] * r[2]
+
+    # Closest points p0 + s d1 and q0 + t d2, clamped to both segments
+    if a <= 1e-12 and e <= 1e-12:
+        s = t = 0.0
+    elif a <= 1e-12:
+        s = 0.0
+        t = min(max(f / e, 0.0), 1.0)
+    else:
+        c = d1[0] * r[0] + d1[1] * r[1] + d1[2] * r[2]
+        if e <= 1e-12:
+            t = 0.0
+            s = min(max(-c / a, 0.0), 1.0)
+        else:
+            b = d1[0] * d2[0] + d1[1] * d2[1] + d1[2] * d2[2]
+            denominator = a * e - b * b
+            s = min(max((b * f - c * e) / denominator, 0.0), 1.0) if denominator > 1e-12 else 0.0
+            t = (b * s + f) / e
+            if t < 0.0:
+                t = 0.0
+                s = min(max(-c / a, 0.0), 1.0)
+            elif t > 1.0:
+                t = 1.0
+                s = min(max((b - c) / a, 0.0), 1.0)
+
+    x = r[0] + d1[0] * s - d2[0] * t
+    y = r[1] + d1[1] * s - d2[1] * t
+    z = r[2] + d1[2] * s - d2[2] * t
+    return math.sqrt(x * x + y * y + z * z)
+
+
+def _bounds(capsule):
+    start, end, radius = capsule.start, capsule.end, capsule.radius
+    return (min(start[0], end[0]) - radius, min(start[1], end[1]) - radius, min(start[2], end[2]) - radius,
+            max(start[0], end[0]) + radius, max(start[1], end[1]) + radius, max(start[2], end[2]) + radius)
+
+
+def _build_bvh(boxes, leaf_size):
+    # Nodes are flat lists: box, then either the two child node indices or the primitive indices of a leaf
+    nodes = []
+
+    def build(indices):
+        box = (min(boxes[i][0] for i in indices), min(boxes[i][1] for i in indices), min(boxes[i][2] for i in indices),
+               max(boxes[i][3] for i in indices), max(boxes[i][4] for i in indices), max(boxes[i][5] for i in indices))
+        node = len(nodes)
+        nodes.append(None)
+        if len(indices) <= leaf_size:
+            nodes[node] = (box, None, None, indices)
+            return node
+
+        # Split at the median center along the longest side
+        axis = max(range(3), key=lambda k: box[k + 3] - box[k])
+        indices.sort(key=lambda i: boxes[i][axis] + boxes[i][axis + 3])
+        half = len(indices) // 2
+        left = build(indices[:half])
+        right = build(indices[half:])
+        nodes[node] = (box, left, right, None)
+        return node
+
+    if boxes:
+        build(list(range(len(boxes))))
+    return nodes
+
+
+def check_interference(capsules, margin=0.0, allowed=expected_contact, leaf_size=BVH_LEAF_SIZE):
+    """
+    Finds every pair of planned capsules that overlap or come closer than a margin.
+
+    Capsule bounding boxes are indexed in a bounding volume hierarchy, and
+    each capsule only measures the capsules whose boxes it reaches, so large
+    designs cost about n log n instead of n squared distance tests.
+
+    Args:
+        capsules (list of Capsule): Planned caps and connectors, for example from joint_capsules.
+        margin (float): Smallest acceptable gap between surfaces. Pairs closer than this are reported.
+        allowed (callable): Takes two capsules and returns True for pairs that may touch.
+        leaf_size (int): Capsules per leaf of the hierarchy.
+
+    Returns:
+        InterferenceReport: Conflicting pairs as indices into capsules, sorted by clearance, the
+            smallest clearance among the measured pairs (None if no pair was close enough to be
+            measured) and the number of measured pairs.
+    """
+    boxes = [_bounds(capsule) for capsule in capsules]
+    nodes = _build_bvh(boxes, leaf_size)
+
+    conflicts = []
+    min_clearance = None
+    pairs_tested = 0
+    for i, capsule in enumerate(capsules):
+        x0, y0, z0, x1, y1, z1 = boxes[i]
+        x0 -= margin
+        y0 -= margin
+        z0 -= margin
+        x1 += margin
+        y1 += margin
+        z1 += margin
+
+        stack = [0] if nodes else []
+        while stack:
+            box, left, right, leaf = nodes[stack.pop()]
+            if box[0] > x1 or box[3] < x0 or box[1] > y1 or box[4] < y0 or box[2] > z1 or box[5] < z0:
+                continue
+            if leaf is None:
+                stack.append(left)
+                stack.append(right)
+                continue
+
+            for j in leaf:
+                # Every pair is measured once, from its lower index
+                if j <= i:
+                    continue
+                other = capsules[j]
+                if allowed is not None and allowed(capsule, other):
+                    continue
+                pairs_tested += 1
+                clearance = segment_distance(capsule.start, capsule.end, other.start, other.end) - capsule.radius - other.radius
+                if min_clearance is None or clearance < min_clearance:
+                    min_clearance = clearance
+                if clearance < margin:
+                    conflicts.append(Interference(i, j, clearance))
+
+    conflicts.sort(key=lambda conflict: conflict.clearance)
+    return InterferenceReport(conflicts, min_clearance, pairs_tested)
@@ -0,0 +1,260 @@
+import math
+from collections import namedtuple
+
+from .dimensions import (CAP_HEIGHT, CONNECTOR_OFFSET, OVERLAP_AMOUNT, THREAD_CLEARANCE, cap_outer_radius,
+                         connector_outer_radius)
+from .thread import DEFAULT_SAMPLES_PER_PITCH, coarse_pitch, thread_rings
+
+__all__ = ['Mesh', 'Part', 'axis_basis', 'revolve', 'signed_volume', 'thread_pitch', 'cap_mesh', 'connector_mesh',
+           'joint_parts', 'flatten_meshes', 'transform_mesh']
+
+# Triangle mesh with vertices as (x, y, z) tuples and triangles as index triples
+Mesh = namedtuple('Mesh', ['vertices', 'triangles'])
+
+# A cap or connector of a joint, with the dowel it belongs to
+Part = namedtuple('Part', ['kind', 'dowel', 'mesh'])
+
+
+def axis_basis(direction):
+    """
+    Builds two unit vectors perpendicular to a direction and to each other.
+
+    Args:
+        direction (tuple): Unit (x, y, z) direction.
+
+    Returns:
+        tuple: (u, v) so that u, v and direction form a right-handed frame.
+    """
+    dx, dy, dz = direction
+    helper = (0.0, 0.0, 1.0) if abs(dz) < 0.9 else (1.0, 0.0, 0.0)
+    ux = helper[1] * dz - helper[2] * dy
+    uy = helper[2] * dx - helper[0] * dz
+    uz = helper[0] * dy - helper[1] * dx
+    length = math.sqrt(ux * ux + uy * uy + uz * uz)
+    ux, uy, uz = ux / length, uy / length, uz / length
+    return (ux, uy, uz), (dy * uz - dz * uy, dz * ux - dx * uz, dx * uy - dy * ux)
+
+
+def revolve(profile, origin, direction, segments):
+    """
+    Revolves a closed (radius, height) profile around an axis into a watertight mesh.
+
+    Profile points on the axis (radius 0) become a single pole vertex, so
+    solid ends close without slivers. A profile point can also carry a list
+    with one radius per segment instead of a single radius, which is how
+    threads are swept around the axis.
+
+    Args:
+        profile (list of tuple): Closed polygon of (radius, height) points, without repeating the first point.
+        origin (tuple): (x, y, z) point on the axis at height 0.
+        direction (tuple): Unit (x, y, z) direction of the axis.
+        segments (int): Number of segments around the axis.
+
+    Returns:
+        Mesh: The mesh, with outward-facing triangles.
+    """
+    u, v = axis_basis(direction)
+    angles = [2.0 * math.pi * s / segments for s in range(segments)]
+    spokes = [
+        (c * u[0] + s * v[0], c * u[1] + s * v[1], c * u[2] + s * v[2])
+        for c, s in ((math.cos(angle), math.sin(angle)) for angle in angles)
+    ]
+    poles = [not isinstance(radius, list) and radius == 0.0 for radius, _ in profile]
+
+    vertices = []
+    rings = []
+    for radius, height in profile:
+        cx = origin[0] + direction[0] * height
+        cy = origin[1] + direction[1] * height
+        cz = origin[2] + direction[2] * height
+        start = len(vertices)
+        if isinstance(radius, list):
+            vertices.extend((cx + r * sx, cy + r * sy, cz + r * sz) for r, (sx, sy, sz) in zip(radius, spokes))
+            rings.append(list(range(start, start + segments)))
+        elif radius == 0.0:
+            vertices.append((cx, cy, cz))
+            rings.append([start] * segments)
+        else:
+            vertices.extend((cx + radius * sx, cy + radius * sy, cz + radius * sz) for sx, sy, sz in spokes)
+            rings.append(list(range(start, start + segments)))
+
+    triangles = []
+    for p in range(len(profile)):
+        ring_a = rings[p]
+        ring_b = rings[(p + 1) % len(profile)]
+        pole_a = poles[p]
+        pole_b = poles[(p + 1) % len(profile)]
+        if pole_a and pole_b:
+            continue
+        for s in range(segments):
+            t = (s + 1) % segments
+            if not pole_a:
+                triangles.append((ring_a[s], ring_a[t], ring_b[t] if not pole_b else ring_b[0]))
+            if not pole_b:
+                triangles.append((ring_a[s] if not pole_a else ring_a[0], ring_b[t], ring_b[s]))
+
+    mesh = Mesh(vertices, triangles)
+    if signed_volume(mesh) < 0.0:
+        mesh = Mesh(vertices, [(a, c, b) for a, b, c in triangles])
+    return mesh
+
+
+def signed_volume(mesh):
+    """
+    Computes the signed volume of a closed mesh, positive when triangles face outward.
+
+    Args:
+        mesh (Mesh): The mesh.
+
+    Returns:
+        float: The signed volume.
+    """
+    vertices = mesh.vertices
+    total = 0.0
+    for a, b, c in mesh.triangles:
+        ax, ay, az = vertices[a]
+        bx, by, bz = vertices[b]
+        cx, cy, cz = vertices[c]
+        total += ax * (by * cz - bz * cy) - ay * (bx * cz - bz * cx) + az * (bx * cy - by * cx)
+    return total / 6.0
+
+
+def thread_pitch(radius):
+    """
+    ISO coarse pitch of the thread between the cap and connector of a dowel.
+
+    Args:
+        radius (float): Dowel radius.
+
+    Returns:
+        float: The pitch in cm.
+    """
+    return coarse_pitch(cap_outer_radius(radius) * 2 * 10) / 10
+
+
+def cap_mesh(center, direction, radius, segments=64, pitch=None, samples_per_pitch=DEFAULT_SAMPLES_PER_PITCH):
+    """
+    Meshes the cap that slides over a dowel end.
+
+    Args:
+        center (tuple): (x, y, z) center of the dowel end.
+        direction (tuple): Unit (x, y, z) direction from the end towards the joint point.
+        radius (float): Dowel radius.
+        segments (int): Number of segments around the axis, and per turn of the thread.
+        pitch (float): Pitch of the external thread on the outside, or None for a plain cylinder.
+        samples_per_pitch (int): Number of thread rings per pitch.
+
+    Returns:
+        Mesh: The cap.
+    """
+    outer = cap_outer_radius(radius)
+    if pitch is None:
+        wall = [(outer, -CAP_HEIGHT), (outer, OVERLAP_AMOUNT)]
+    else:
+        wall = thread_rings(outer, pitch, -CAP_HEIGHT, OVERLAP_AMOUNT, segments, samples_per_pitch=samples_per_pitch)
+    profile = [(radius, -CAP_HEIGHT)] + wall + [
+        (0.0, OVERLAP_AMOUNT),
+        (0.0, 0.0),
+        (radius, 0.0),
+    ]
+    return revolve(profile, center, direction, segments)
+
+
+def connector_mesh(center, direction, radius, length, segments=64, pitch=None, clearance=THREAD_CLEARANCE,
+                   samples_per_pitch=DEFAULT_SAMPLES_PER_PITCH):
+    """
+    Meshes the connector that a cap screws into, running from behind the cap to the joint point.
+
+    Args:
+        center (tuple): (x, y, z) center of the dowel end.
+        direction (tuple): Unit (x, y, z) direction from the end towards the joint point.
+        radius (float): Dowel radius.
+        length (float): Distance from the dowel end to the joint point.
+        segments (int): Number of segments around the axis, and per turn of the thread.
+        pitch (float): Pitch of the internal thread in the bore, or None for a plain bore.
+        clearance (float): Radial print clearance between the cap thread and the bore thread.
+        samples_per_pitch (int): Number of thread rings per pitch.
+
+    Returns:
+        Mesh: The connector.
+    """
+    outer = connector_outer_radius(radius)
+    bore_end = OVERLAP_AMOUNT + THREAD_CLEARANCE
+    if pitch is None:
+        bore = cap_outer_radius(radius) + clearance
+        wall = [(bore, bore_end), (bore, -CONNECTOR_OFFSET)]
+    else:
+        wall = thread_rings(cap_outer_radius(radius), pitch, -CONNECTOR_OFFSET, bore_end, segments, internal=True,
+                            clearance=clearance, samples_per_pitch=samples_per_pitch)[::-1]
+    profile = [
+        (outer, -CONNECTOR_OFFSET),
+        (outer, length),
+        (0.0, length),
+        (0.0, bore_end),
+    ] + wall
+    return revolve(profile, center, direction, segments)
+
+
+def joint_parts(point, centers, radii, segments=64, threaded=False):
+    """
+    Meshes every cap and connector of a joint.
+
+    Args:
+        point (tuple): (x, y, z) joint point.
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        radii (list of float): Radius of every dowel.
+        segments (int): Number of segments around each axis.
+        threaded (bool): Model the ISO coarse thread between every cap and its connector.
+
+    Returns:
+        list of Part: A cap and a connector for every dowel.
+    """
+    parts = []
+    for dowel, (center, radius) in enumerate(zip(centers, radii)):
+        dx = point[0] - center[0]
+        dy = point[1] - center[1]
+        dz = point[2] - center[2]
+        length = math.sqrt(dx * dx + dy * dy + dz * dz)
+        direction = (dx / length, dy / length, dz / length)
+        pitch = thread_pitch(radius) if threaded else None
+        parts.append(Part('cap', dowel, cap_mesh(center, direction, radius, segments, pitch)))
+        parts.append(Part('connector', dowel, connector_mesh(center, direction, radius, length, segments, pitch)))
+    return parts
+
+
+def flatten_meshes(meshes):
+    """
+    Merges meshes into flat coordinate and index lists, as custom graphics and most mesh APIs take them.
+
+    Args:
+        meshes (list of Mesh): The meshes.
+
+    Returns:
+        tuple: ([x0, y0, z0, x1, ...] coordinates, [a0, b0, c0, a1, ...] triangle indices).
+    """
+    coordinates = []
+    indices = []
+    for mesh in meshes:
+        offset = len(coordinates) // 3
+        for vertex in mesh.vertices:
+            coordinates.extend(vertex)
+        for triangle in mesh.triangles:
+            indices.extend((triangle[0] + offset, triangle[1] + offset, triangle[2] + offset))
+    return coordinates, indices
+
+
+def transform_mesh(mesh, matrix):
+    """
+    Moves a mesh by a rigid transform.
+
+    Args:
+        mesh (Mesh): The mesh.
+        matrix (list of float): 4x4 transform in row-major order, such as from frame_to_frame_matrix.
+
+    Returns:
+        Mesh: The moved mesh, sharing the triangles of the original.
+    """
+    m00, m01, m02, m03, m10, m11, m12, m13, m20, m21, m22, m23 = matrix[:12]
+    vertices = [(m00 * x + m01 * y + m02 * z + m03, m10 * x + m11 * y + m12 * z + m13, m20 * x + m21 * y + m22 * z + m23)
+                for x, y, z in mesh.vertices]
+    return Mesh(vertices, mesh.triangles)
@@ -0,0 +1,92 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+from .mesh import Mesh, Part, joint_parts
+
+__all__ = ['SHARDS_PER_WORKER', 'mesh_joints_parallel']
+
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+
+def _mesh_shard(shard, segments, threaded):
+    # Runs in a worker: mesh every joint of the shard into one shared memory block
+    vertices = array('d')
+    triangles = array('I')
+    layout = []
+    for job_index, point, centers, radii in shard:
+        for part in joint_parts(point, centers, radii, segments, threaded):
+            mesh = part.mesh
+            layout.append((job_index, part.kind, part.dowel, len(vertices) // 3, len(mesh.vertices), len(triangles) // 3, len(mesh.triangles)))
+            for vertex in mesh.vertices:
+                vertices.extend(vertex)
+            for triangle in mesh.triangles:
+                triangles.extend(triangle)
+
+    vertex_bytes = len(vertices) * vertices.itemsize
+    triangle_bytes = len(triangles) * triangles.itemsize
+    block = shared_memory.SharedMemory(create=True, size=max(vertex_bytes + triangle_bytes, 1))
+    block.buf[:vertex_bytes] = memoryview(vertices).cast('B')
+    block.buf[vertex_bytes:vertex_bytes + triangle_bytes] = memoryview(triangles).cast('B')
+    name = block.name
+    block.close()
+
+    # Only the block name and the small layout go back through the pipe
+    return name, vertex_bytes, triangle_bytes, layout
+
+
+def _read_shard(name, vertex_bytes, triangle_bytes, layout):
+    # Runs in the parent: copy the meshes out of a worker's block and free it
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        vertices = block.buf[:vertex_bytes].cast('d')
+        triangles = block.buf[vertex_bytes:vertex_bytes + triangle_bytes].cast('I')
+        parts = {}
+        for job_index, kind, dowel, vertex_start, vertex_count, triangle_start, triangle_count in layout:
+            flat_vertices = vertices[vertex_start * 3:(vertex_start + vertex_count) * 3].tolist()
+            flat_triangles = triangles[triangle_start * 3:(triangle_start + triangle_count) * 3].tolist()
+            mesh = Mesh(
+                list(zip(flat_vertices[0::3], flat_vertices[1::3], flat_vertices[2::3])),
+                list(zip(flat_triangles[0::3], flat_triangles[1::3], flat_triangles[2::3])),
+            )
+            parts.setdefault(job_index, []).append(Part(kind, dowel, mesh))
+        vertices.release()
+        triangles.release()
+    finally:
+        block.close()
+        block.unlink()
+    return parts
+
+
+def mesh_joints_parallel(jobs, workers, segments=64, threaded=False):
+    """
+    Meshes joints in a process pool, yielding each joint's parts as soon as its shard is done.
+
+    Joints are split into shards that are meshed by worker processes. Each
+    worker writes its vertex and triangle arrays into a shared memory block
+    and returns only the block name and layout, so large meshes are never
+    pickled.
+
+    Args:
+        jobs (list of tuple): (job_index, point, centers, radii) for every joint.
+        workers (int): Number of worker processes.
+        segments (int): Number of segments around each dowel axis.
+        threaded (bool): Model the thread between every cap and its connector.
+
+    Yields:
+        tuple: (job_index, parts) with the list of Part of one joint, in completion order.
+    """
+    shard_count = max(1, min(len(jobs), workers * SHARDS_PER_WORKER))
+    shards = [jobs[i::shard_count] for i in range(shard_count)]
+
+    # Workers must share this process's resource tracker, otherwise each one
+    # tracks the blocks it creates and warns about them after the parent frees them
+    if hasattr(resource_tracker, 'ensure_running'):
+        resource_tracker.ensure_running()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_mesh_shard, shard, segments, threaded) for shard in shards if shard]
+        for future in as_completed(futures):
+            for job_index, parts in _read_shard(*future.result()).items():
+                yield job_index, parts
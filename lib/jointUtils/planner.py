@@ -0,0 +1,187 @@
+import itertools
+import threading
+from collections import namedtuple
+
+from .dimensions import cap_outer_radius
+from .interference import check_interference, joint_capsules
+from .solver import compute_best_intersections
+
+__all__ = ['JointPlan', 'plan_joints', 'BackgroundPlanner']
+
+# Everything decided about a joint before any geometry is created. The point is None when the
+# dowels do not meet, sizes holds the ThreadSpec of every dowel (None without a catalog or a
+# close enough size) and conflicts holds (capsule, other capsule, clearance) for every interference.
+JointPlan = namedtuple('JointPlan', ['point', 'residual', 'condition', 'sizes', 'conflicts'])
+
+
+def plan_joints(joints, catalog=None, interference=True, margin=0.0):
+    """
+    Plans joints from plain dowel end values.
+
+    Args:
+        joints (list of list of tuple): (center, normal, radius) of every dowel end in each joint.
+        catalog (ThreadCatalog): Catalog used to pick the thread size of every dowel, or None.
+        interference (bool): Check the planned caps and connectors of all joints against each other.
+        margin (float): Smallest acceptable gap between parts, see check_interference.
+
+    Returns:
+        list of JointPlan: One plan per joint, in order.
+    """
+    centers = [[center for center, _, _ in ends] for ends in joints]
+    normals = [[normal for _, normal, _ in ends] for ends in joints]
+    points, residuals, conditions = compute_best_intersections(centers, normals)
+
+    conflicts = [[] for _ in joints]
+    if interference:
+        capsules = []
+        for index, (point, ends) in enumerate(zip(points, joints)):
+            if point is not None:
+                capsules.extend(joint_capsules(point, centers[index], [radius for _, _, radius in ends], index))
+        for conflict in check_interference(capsules, margin).conflicts:
+            first = capsules[conflict.first]
+            second = capsules[conflict.second]
+            conflicts[first.joint].append((first, second, conflict.clearance))
+            if second.joint != first.joint:
+                conflicts[second.joint].append((second, first, conflict.clearance))
+
+    plans = []
+    for index, ends in enumerate(joints):
+        sizes = [catalog.nearest(cap_outer_radius(radius) * 2 * 10) if catalog else None for _, _, radius in ends]
+        plans.append(JointPlan(points[index], residuals[index], conditions[index], sizes, conflicts[index]))
+    return plans
+
+
+class BackgroundPlanner:
+    """
+    Plans joints on worker threads and hands the plans back on the thread that owns the design.
+
+    Work is submitted with plain values only. The owning thread either
+    blocks in wait, which keeps calling an idle function such as a UI event
+    pump and returns the plans once they are in, or lets the worker call
+    post with a ticket and has its event loop call deliver with that ticket
+    later, which runs the callback given to submit.
+    """
+
+    def __init__(self, post=None, start_thread=True):
+        """
+        Args:
+            post (callable): Takes a ticket string and schedules deliver(ticket) on the owning thread,
+                or None when the owning thread waits for its plans with wait.
+            start_thread (bool): Plan on a new thread. When False, plans are made inside submit, which
+                keeps tests deterministic.
+        """
+        self.post = post
+        self.start_thread = start_thread
+        self._tickets = itertools.count(1)
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._callbacks = {}
+        self._results = {}
+
+    def submit(self, joints, on_done=None, **options):
+        """
+        Starts planning joints.
+
+        Args:
+            joints (list of list of tuple): (center, normal, radius) of every dowel end in each joint.
+            on_done (callable): Called by deliver with the list of JointPlan, or with the exception planning raised.
+                Not needed when the plans are collected with wait.
+            **options: Passed on to plan_joints.
+
+        Returns:
+            str: Ticket identifying the work.
+        """
+        ticket = str(next(self._tickets))
+        with self._lock:
+            self._callbacks[ticket] = on_done
+        if self.start_thread:
+            threading.Thread(target=self._work, args=(ticket, joints, options), daemon=True).start()
+        else:
+            self._work(ticket, joints, options)
+        return ticket
+
+    def _work(self, ticket, joints, options):
+        try:
+            result = plan_joints(joints, **options)
+        except Exception as error:
+            result = error
+        with self._lock:
+            if ticket not in self._callbacks:
+                return
+            self._results[ticket] = result
+            self._finished.notify_all()
+        if self.post is not None:
+            self.post(ticket)
+
+    @property
+    def pending(self):
+        """Number of submitted plans not delivered yet."""
+        with self._lock:
+            return len(self._callbacks)
+
+    def wait(self, ticket, idle=None, cancelled=None, interval=0.05):
+        """
+        Blocks until work is finished and returns its plans on the calling thread.
+
+        The callback given to submit is not run, so the caller can close any
+        progress display before it acts on the plans.
+
+        Args:
+            ticket (str): Ticket returned by submit.
+            idle (callable): Called every interval seconds while waiting, such as a UI event pump.
+            cancelled (callable): Returns True to stop waiting and drop the work.
+            interval (float): Longest time in seconds between calls of idle.
+
+        Returns:
+            list of JointPlan: One plan per joint, or None if the work was cancelled or is unknown.
+
+        Raises:
+            Exception: The exception planning raised.
+        """
+        while True:
+            with self._finished:
+                if ticket not in self._callbacks:
+                    return None
+                if self._finished.wait_for(lambda: ticket in self._results, interval):
+                    del self._callbacks[ticket]
+                    result = self._results.pop(ticket)
+                    break
+            if cancelled is not None and cancelled():
+                self.cancel(ticket)
+                return None
+            if idle is not None:
+                idle()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def deliver(self, ticket):
+        """
+        Runs the callback of finished work on the calling thread.
+
+        Args:
+            ticket (str): Ticket passed to post.
+
+        Returns:
+            bool: False if the ticket is unknown, not finished or was cancelled.
+        """
+        with self._lock:
+            if ticket not in self._results:
+                return False
+            result = self._results.pop(ticket)
+            on_done = self._callbacks.pop(ticket, None)
+        if on_done is None:
+            return False
+        on_done(result)
+        return True
+
+    def cancel(self, ticket):
+        """
+        Drops submitted work, so its plans are never delivered.
+
+        Args:
+            ticket (str): Ticket returned by submit.
+        """
+        with self._lock:
+            self._callbacks.pop(ticket, None)
+            self._results.pop(ticket, None)
@@ -0,0 +1,185 @@
+import time
+from collections import namedtuple
+
+__all__ = ['Progress', 'EtaEstimator', 'WorkQueue', 'format_duration']
+
+# Snapshot of a running queue, passed to progress callbacks
+Progress = namedtuple('Progress', ['done', 'total', 'elapsed', 'eta', 'throughput'])
+
+
+class EtaEstimator:
+    """
+    Estimates the time left for a run of similar work items from the items finished so far.
+
+    The time per item is an exponential moving average, so the estimate
+    follows a run that speeds up or slows down, for example when later
+    joints have more dowels, without jumping on every item.
+    """
+
+    def __init__(self, smoothing=0.2, clock=time.perf_counter):
+        """
+        Args:
+            smoothing (float): Weight of the newest item in the moving average, between 0 and 1.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.smoothing = smoothing
+        self.clock = clock
+        self.seconds_per_item = None
+        self.items = 0
+        self.started = None
+        self._last = None
+
+    def start(self):
+        """
+        Starts or restarts timing, for example when a paused run is resumed.
+        """
+        now = self.clock()
+        if self.started is None:
+            self.started = now
+        self._last = now
+
+    @property
+    def elapsed(self):
+        """Seconds since the first start."""
+        return self.clock() - self.started if self.started is not None else 0.0
+
+    def record(self, count=1):
+        """
+        Records that items finished now.
+
+        Args:
+            count (int): Number of items finished since the last record.
+        """
+        if self._last is None:
+            self.start()
+        now = self.clock()
+        if count > 0:
+            sample = (now - self._last) / count
+            if self.seconds_per_item is None:
+                self.seconds_per_item = sample
+            else:
+                self.seconds_per_item += self.smoothing * (sample - self.seconds_per_item)
+            self.items += count
+        self._last = now
+
+    @property
+    def throughput(self):
+        """Items per second, or None before the first item."""
+        if not self.seconds_per_item:
+            return None
+        return 1.0 / self.seconds_per_item
+
+    def eta(self, remaining):
+        """
+        Estimates the seconds needed for the remaining items.
+
+        Args:
+            remaining (int): Number of items left.
+
+        Returns:
+            float: The estimate, or None before the first item.
+        """
+        if self.seconds_per_item is None:
+            return None
+        return self.seconds_per_item * remaining
+
+
+class WorkQueue:
+    """
+    Runs work items one step at a time, so the caller can report progress, yield and cancel in between.
+
+    The queue remembers its position, so a cancelled run can be resumed by
+    calling run again. Nothing in it depends on Fusion: yielding to the UI
+    and checking for cancellation are callbacks.
+    """
+
+    def __init__(self, items, step, estimator=None):
+        """
+        Args:
+            items (list): Work items.
+            step (callable): Takes one item and does its work. Its return value is collected in results.
+            estimator (EtaEstimator): Estimator for the remaining time, a new one when omitted.
+        """
+        self.items = list(items)
+        self.step = step
+        self.estimator = estimator or EtaEstimator()
+        self.position = 0
+        self.results = []
+        self.cancelled = False
+
+    @property
+    def done(self):
+        """Number of items finished."""
+        return self.position
+
+    @property
+    def total(self):
+        """Number of items in the queue."""
+        return len(self.items)
+
+    @property
+    def is_finished(self):
+        """True once every item has run."""
+        return self.position >= len(self.items)
+
+    def progress(self):
+        """
+        Takes a snapshot of the queue.
+
+        Returns:
+            Progress: Items done, total, elapsed seconds, estimated seconds left and items per second.
+        """
+        return Progress(self.position, len(self.items), self.estimator.elapsed,
+                        self.estimator.eta(len(self.items) - self.position), self.estimator.throughput)
+
+    def run(self, should_cancel=None, on_progress=None, pause=None):
+        """
+        Runs the remaining items until the queue is finished or cancelled.
+
+        Cancellation is checked before every item, so an item is either done
+        or not started when the run stops.
+
+        Args:
+            should_cancel (callable): Returns True to stop before the next item.
+            on_progress (callable): Called with a Progress after every item.
+            pause (callable): Called after every item to let other work run, such as UI events.
+
+        Returns:
+            bool: True if every item has run, False if the run was cancelled.
+        """
+        self.cancelled = False
+        self.estimator.start()
+        while self.position < len(self.items):
+            if should_cancel is not None and should_cancel():
+                self.cancelled = True
+                return False
+
+            self.results.append(self.step(self.items[self.position]))
+            self.position += 1
+            self.estimator.record()
+
+            if on_progress is not None:
+                on_progress(self.progress())
+            if pause is not None:
+                pause()
+        return True
+
+
+def format_duration(seconds):
+    """
+    Formats a duration for progress messages.
+
+    Args:
+        seconds (float): The duration, or None if it is not known yet.
+
+    Returns:
+        str: Such as '42 s' or '3 min 05 s', or '...' when unknown.
+    """
+    if seconds is None:
+        return '...'
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f'{seconds} s'
+    if seconds < 3600:
+        return f'{seconds // 60} min {seconds % 60:02d} s'
+    return f'{seconds // 3600} h {seconds % 3600 // 60:02d} min'
@@ -0,0 +1,121 @@
+import hashlib
+import json
+from collections import namedtuple
+
+__all__ = ['HASH_PRECISION', 'JointRecord', 'JointDiff', 'geometry_hash', 'joint_id', 'make_joint_record',
+           'encode_joint_record', 'decode_joint_record', 'diff_joints']
+
+# Geometry is rounded to this step (in cm) before hashing, so recomputes that move nothing do not count as edits
+HASH_PRECISION = 1e-6
+
+# What a generated joint was built from: its id, the entity token and geometry hash of every
+# dowel end edge, and the options it was built with
+JointRecord = namedtuple('JointRecord', ['joint_id', 'tokens', 'hashes', 'options'])
+
+# Joint ids split by what happened to their inputs since they were built
+JointDiff = namedtuple('JointDiff', ['unchanged', 'changed', 'removed'])
+
+
+def geometry_hash(center, normal, radius, precision=HASH_PRECISION):
+    """
+    Hashes the center, normal and radius of a dowel end.
+
+    Args:
+        center (tuple): (x, y, z) center of the end.
+        normal (tuple): (x, y, z) outward normal of the end.
+        radius (float): Dowel radius.
+        precision (float): Step the values are rounded to before hashing.
+
+    Returns:
+        str: Hex digest that only changes when the end moves, turns or changes size.
+    """
+    values = [round(value / precision) for value in (*center, *normal, radius)]
+    return hashlib.sha1(' '.join(str(value) for value in values).encode('ascii')).hexdigest()
+
+
+def joint_id(tokens):
+    """
+    Derives a stable joint id from the entity tokens of its dowel ends.
+
+    Args:
+        tokens (list of str): Entity tokens of the dowel end edges, in any order.
+
+    Returns:
+        str: The id, the same for every ordering of the tokens.
+    """
+    return hashlib.sha1('\n'.join(sorted(tokens)).encode('utf-8')).hexdigest()[:16]
+
+
+def make_joint_record(tokens, geometries, options=None):
+    """
+    Builds the record stored on a joint's bodies.
+
+    Args:
+        tokens (list of str): Entity tokens of the dowel end edges.
+        geometries (list of tuple): (center, normal, radius) of every end, in the order of tokens.
+        options (dict): Build options such as the thread mode, used to rebuild the joint the same way.
+
+    Returns:
+        JointRecord: The record.
+    """
+    hashes = [geometry_hash(center, normal, radius) for center, normal, radius in geometries]
+    return JointRecord(joint_id(tokens), list(tokens), hashes, dict(options or {}))
+
+
+def encode_joint_record(record):
+    """
+    Serializes a joint record for an attribute value.
+
+    Args:
+        record (JointRecord): The record.
+
+    Returns:
+        str: JSON text.
+    """
+    return json.dumps(record._asdict(), separators=(',', ':'))
+
+
+def decode_joint_record(text):
+    """
+    Reads a joint record written by encode_joint_record.
+
+    Args:
+        text (str): JSON text from an attribute value.
+
+    Returns:
+        JointRecord: The record, or None if the text is not a valid record.
+    """
+    try:
+        data = json.loads(text)
+        record = JointRecord(data['joint_id'], list(data['tokens']), list(data['hashes']), dict(data.get('options', {})))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if len(record.tokens) != len(record.hashes):
+        return None
+    return record
+
+
+def diff_joints(records, current_hashes):
+    """
+    Compares stored joint records against the current geometry of their dowel ends.
+
+    Args:
+        records (list of JointRecord): Records of the generated joints.
+        current_hashes (dict): Current geometry hash of every stored token, or None for ends that no longer exist.
+
+    Returns:
+        JointDiff: Ids of joints whose ends are untouched, joints with at least one moved
+        end that still has two ends to rebuild from, and joints that lost their ends.
+    """
+    unchanged = []
+    changed = []
+    removed = []
+    for record in records:
+        hashes = [current_hashes.get(token) for token in record.tokens]
+        if hashes == record.hashes:
+            unchanged.append(record.joint_id)
+        elif sum(1 for value in hashes if value is not None) < 2:
+            removed.append(record.joint_id)
+        else:
+            changed.append(record.joint_id)
+    return JointDiff(unchanged, changed, removed)
@@ -0,0 +1,171 @@
+from collections import OrderedDict, namedtuple
+
+from .regeneration import HASH_PRECISION
+
+__all__ = ['ScanStats', 'MAX_SCAN_DOCUMENTS', 'body_fingerprint', 'ScanCache', 'DocumentScanCaches']
+
+# Bodies looked at by the last scan, how many of them were taken from the cache and how many ends were found
+ScanStats = namedtuple('ScanStats', ['bodies', 'reused', 'scanned', 'ends'])
+
+# Documents whose scans are kept before the least recently scanned one is dropped
+MAX_SCAN_DOCUMENTS = 8
+
+
+def body_fingerprint(face_count, edge_count, vertex_count, box_min, box_max, precision=HASH_PRECISION):
+    """
+    Builds a cheap fingerprint of a body from values that are quick to read.
+
+    Any edit that adds or removes topology or moves the bounding box changes
+    the fingerprint. Edits that keep both, such as resizing a hole in the
+    middle of a face, do not, so a full rescan is still needed after those.
+
+    Args:
+        face_count (int): Number of faces of the body.
+        edge_count (int): Number of edges of the body.
+        vertex_count (int): Number of vertices of the body.
+        box_min (tuple): (x, y, z) lowest corner of the bounding box.
+        box_max (tuple): (x, y, z) highest corner of the bounding box.
+        precision (float): Step the corners are rounded to.
+
+    Returns:
+        tuple: The fingerprint, comparable with ==.
+    """
+    return (face_count, edge_count, vertex_count, *(round(value / precision) for value in (*box_min, *box_max)))
+
+
+class ScanCache:
+    """
+    Dowel ends found on each body, keyed by the body's entity token.
+
+    An entry is only used while the body's fingerprint is unchanged. The
+    ends are stored as plain values with the index of their face in the
+    body, so no API object outlives the scan that read it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.begin()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def begin(self):
+        """
+        Starts counting a new scan.
+        """
+        self._seen = set()
+        self._reused = 0
+        self._scanned = 0
+        self._ends = 0
+
+    def get(self, token, fingerprint):
+        """
+        Looks up the ends of a body.
+
+        Args:
+            token (str): Entity token of the body.
+            fingerprint (tuple): Current fingerprint of the body, see body_fingerprint.
+
+        Returns:
+            list of tuple: (face index, center, normal, radius) of every end, or None when the body
+                is new or changed and must be scanned.
+        """
+        self._seen.add(token)
+        entry = self._entries.get(token)
+        if entry is None or entry[0] != fingerprint:
+            self._scanned += 1
+            return None
+        self._reused += 1
+        self._ends += len(entry[1])
+        return entry[1]
+
+    def put(self, token, fingerprint, ends):
+        """
+        Stores the ends found on a scanned body.
+
+        Args:
+            token (str): Entity token of the body.
+            fingerprint (tuple): Fingerprint the body was scanned with.
+            ends (list of tuple): (face index, center, normal, radius) of every end.
+        """
+        self._seen.add(token)
+        self._entries[token] = (fingerprint, list(ends))
+        self._ends += len(ends)
+
+    def prune(self):
+        """
+        Drops the bodies the current scan did not look at, such as deleted ones.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        stale = [token for token in self._entries if token not in self._seen]
+        for token in stale:
+            del self._entries[token]
+        return len(stale)
+
+    def clear(self):
+        """
+        Forgets every body, so the next scan reads everything again.
+        """
+        self._entries.clear()
+        self.begin()
+
+    @property
+    def stats(self):
+        """ScanStats of the current scan."""
+        return ScanStats(len(self._seen), self._reused, self._scanned, self._ends)
+
+
+class DocumentScanCaches:
+    """
+    A ScanCache for each document, so switching documents does not prune the scans of the others.
+
+    Entity tokens are only unique within a document, and a scan prunes the
+    bodies it did not see, so one cache shared by every document would be
+    emptied by each switch.
+    """
+
+    def __init__(self, max_documents=MAX_SCAN_DOCUMENTS):
+        """
+        Args:
+            max_documents (int): Documents kept before the least recently scanned one is dropped.
+        """
+        self.max_documents = max_documents
+        self.caches = OrderedDict()
+
+    def __len__(self):
+        return len(self.caches)
+
+    def get(self, document_id):
+        """
+        Returns the cache of a document, creating it on first use.
+
+        Args:
+            document_id (str): Id that stays the same for the life of the document, such as its creation id.
+
+        Returns:
+            ScanCache: The document's cache.
+        """
+        cache = self.caches.get(document_id)
+        if cache is None:
+            cache = self.caches[document_id] = ScanCache()
+        self.caches.move_to_end(document_id)
+        while len(self.caches) > self.max_documents:
+            self.caches.popitem(last=False)
+        return cache
+
+    def discard(self, document_id):
+        """
+        Drops the cache of a document, such as one that was closed.
+
+        Args:
+            document_id (str): Id passed to get.
+        """
+        self.caches.pop(document_id, None)
+
+    def clear(self):
+        """
+        Drops every document's cache.
+        """
+        self.caches.clear()
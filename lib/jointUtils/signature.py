@@ -0,0 +1,345 @@
+import itertools
+import math
+from collections import OrderedDict
+
+__all__ = ['MAX_PERMUTATIONS', 'joint_signature', 'joint_frame', 'frame_to_frame_matrix', 'frame_directions',
+           'fit_rotation', 'fit_joint_frame', 'JointTemplateCache']
+
+# Orderings tried when breaking ties between dowels that look alike
+MAX_PERMUTATIONS = 5040
+
+
+def _unit(vector):
+    x, y, z = vector
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0.0:
+        return (0.0, 0.0, 0.0), 0.0
+    return (x / length, y / length, z / length), length
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def joint_signature(point, centers, radii, length_tolerance=1e-3, angle_tolerance=1e-4):
+    """
+    Computes a key that is equal for joints that are congruent up to rigid motion.
+
+    A joint is described by the vectors from its joint point to each dowel
+    end and by the dowel radii. The key holds the quantized radius and length
+    of every dowel, the quantized cosines between every pair of directions and
+    the handedness of the set, so mirrored joints get different keys. Dowels
+    are put in a canonical order first: sorted by radius and length, with
+    ties broken by the ordering giving the smallest key. When there are more
+    than MAX_PERMUTATIONS such orderings, the candidates are instead one
+    ordering per pair of leading dowels, with the tied dowels sorted by their
+    coordinates in the frame of that pair, which no rotation of the joint
+    changes.
+
+    Values are rounded to multiples of the tolerances, so joints that differ
+    by less than a tolerance usually, but not always, share a key.
+
+    Args:
+        point (tuple): (x, y, z) of the joint point.
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        radii (list of float): Radius of every dowel.
+        length_tolerance (float): Quantum for radii and lengths.
+        angle_tolerance (float): Quantum for the cosines between directions.
+
+    Returns:
+        tuple: (signature, order) where signature is a hashable tuple and
+            order lists the dowel indices in canonical order.
+    """
+    units = []
+    dowel_keys = []
+    for center, radius in zip(centers, radii):
+        unit, length = _unit((center[0] - point[0], center[1] - point[1], center[2] - point[2]))
+        units.append(unit)
+        dowel_keys.append((round(radius / length_tolerance), round(length / length_tolerance)))
+
+    # Dowels with different keys are always ordered by key, only ties need searching
+    sorted_indices = sorted(range(len(dowel_keys)), key=lambda i: dowel_keys[i])
+    groups = [list(group) for _, group in itertools.groupby(sorted_indices, key=lambda i: dowel_keys[i])]
+
+    candidate_count = 1
+    for group in groups:
+        candidate_count *= math.factorial(len(group))
+    if candidate_count > MAX_PERMUTATIONS:
+        orderings = _projected_orderings(units, dowel_keys, groups[0], angle_tolerance)
+    else:
+        orderings = (
+            [index for group in combination for index in group]
+            for combination in itertools.product(*(itertools.permutations(group) for group in groups))
+        )
+
+    best = None
+    for order in orderings:
+        cosines = tuple(
+            round(_dot(units[order[a]], units[order[b]]) / angle_tolerance)
+            for a in range(len(order)) for b in range(a + 1, len(order))
+        )
+        candidate = (cosines, _handedness([units[i] for i in order], angle_tolerance))
+        if best is None or candidate < best[0]:
+            best = (candidate, list(order))
+
+    signature = (tuple(dowel_keys[i] for i in best[1]),) + best[0]
+    return signature, best[1]
+
+
+def _projected_orderings(units, dowel_keys, first_group, tolerance):
+    # One ordering per first dowel a and second dowel b: the frame with x along a and y towards b
+    # turns with the joint, so sorting ties by quantized coordinates in it is the same for any pose
+    for a in first_group:
+        x_axis = units[a]
+        frames = []
+        for b in range(len(units)):
+            along = _dot(units[b], x_axis)
+            y_axis, length = _unit((units[b][0] - along * x_axis[0], units[b][1] - along * x_axis[1],
+                                    units[b][2] - along * x_axis[2]))
+            if b != a and length > 1e-6:
+                frames.append((x_axis, y_axis, _cross(x_axis, y_axis)))
+        # Dowels all on one line only have a coordinate along it
+        for axes in frames or [(x_axis,)]:
+            yield sorted(range(len(units)), key=lambda i: (
+                dowel_keys[i], i != a, tuple(round(_dot(units[i], axis) / tolerance) for axis in axes)))
+
+
+def _handedness(units, tolerance):
+    # Sign of the first clearly non-zero triple product, 0 for planar sets
+    for a, b, c in itertools.combinations(range(len(units)), 3):
+        triple = _dot(_cross(units[a], units[b]), units[c])
+        if abs(triple) > tolerance:
+            return 1 if triple > 0 else -1
+    return 0
+
+
+def joint_frame(point, centers, order):
+    """
+    Builds an orthonormal frame for a joint from its dowels in canonical order.
+
+    The x axis points at the first dowel end, the y axis towards the first
+    dowel that is not parallel to it and z completes a right-handed frame.
+
+    Args:
+        point (tuple): (x, y, z) of the joint point.
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        order (list of int): Canonical dowel order from joint_signature.
+
+    Returns:
+        tuple: (origin, x_axis, y_axis, z_axis) as (x, y, z) tuples.
+    """
+    units = [_unit((centers[i][0] - point[0], centers[i][1] - point[1], centers[i][2] - point[2]))[0] for i in order]
+    x_axis = units[0]
+
+    y_axis = None
+    for unit in units[1:]:
+        along = _dot(unit, x_axis)
+        candidate, length = _unit((unit[0] - along * x_axis[0], unit[1] - along * x_axis[1], unit[2] - along * x_axis[2]))
+        if length > 1e-6:
+            y_axis = candidate
+            break
+    if y_axis is None:
+        # Every dowel is on one line, so any perpendicular will do
+        helper = (0.0, 0.0, 1.0) if abs(x_axis[2]) < 0.9 else (1.0, 0.0, 0.0)
+        y_axis = _unit(_cross(helper, x_axis))[0]
+
+    z_axis = _cross(x_axis, y_axis)
+    return tuple(point), x_axis, y_axis, z_axis
+
+
+def frame_to_frame_matrix(source, target):
+    """
+    Computes the rigid transform that carries one frame onto another.
+
+    Args:
+        source (tuple): (origin, x_axis, y_axis, z_axis) of the frame to move.
+        target (tuple): (origin, x_axis, y_axis, z_axis) of the frame to move to.
+
+    Returns:
+        list of float: The 4x4 transform in row-major order, as used by Matrix3D.setWithArray.
+    """
+    source_origin, *source_axes = source
+    target_origin, *target_axes = target
+
+    # R = T S^T, where the columns of S and T are the frame axes
+    rotation = [[sum(target_axes[k][row] * source_axes[k][col] for k in range(3)) for col in range(3)] for row in range(3)]
+    translation = [target_origin[row] - _dot(rotation[row], source_origin) for row in range(3)]
+
+    return [
+        rotation[0][0], rotation[0][1], rotation[0][2], translation[0],
+        rotation[1][0], rotation[1][1], rotation[1][2], translation[1],
+        rotation[2][0], rotation[2][1], rotation[2][2], translation[2],
+        0.0, 0.0, 0.0, 1.0,
+    ]
+
+
+def frame_directions(point, centers, order, frame):
+    """
+    Expresses the directions from a joint point to its dowel ends in the coordinates of a frame.
+
+    Args:
+        point (tuple): (x, y, z) of the joint point.
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        order (list of int): Canonical dowel order from joint_signature.
+        frame (tuple): (origin, x_axis, y_axis, z_axis), such as from joint_frame.
+
+    Returns:
+        list of tuple: Unit direction to every dowel end in canonical order, in frame coordinates.
+    """
+    _, x_axis, y_axis, z_axis = frame
+    directions = []
+    for i in order:
+        unit = _unit((centers[i][0] - point[0], centers[i][1] - point[1], centers[i][2] - point[2]))[0]
+        directions.append((_dot(unit, x_axis), _dot(unit, y_axis), _dot(unit, z_axis)))
+    return directions
+
+
+def _symmetric_eigen(matrix, sweeps=32):
+    # Cyclic Jacobi rotations, returns the eigenvalues and the matching eigenvectors
+    size = len(matrix)
+    a = [list(row) for row in matrix]
+    v = [[1.0 if row == col else 0.0 for col in range(size)] for row in range(size)]
+    for _ in range(sweeps):
+        if sum(a[p][q] * a[p][q] for p in range(size) for q in range(p + 1, size)) < 1e-30:
+            break
+        for p in range(size - 1):
+            for q in range(p + 1, size):
+                if a[p][q] == 0.0:
+                    continue
+                theta = (a[q][q] - a[p][p]) / (2.0 * a[p][q])
+                t = (1.0 if theta >= 0.0 else -1.0) / (abs(theta) + math.sqrt(theta * theta + 1.0))
+                c = 1.0 / math.sqrt(t * t + 1.0)
+                s = t * c
+                for k in range(size):
+                    a[k][p], a[k][q] = c * a[k][p] - s * a[k][q], s * a[k][p] + c * a[k][q]
+                for k in range(size):
+                    a[p][k], a[q][k] = c * a[p][k] - s * a[q][k], s * a[p][k] + c * a[q][k]
+                for k in range(size):
+                    v[k][p], v[k][q] = c * v[k][p] - s * v[k][q], s * v[k][p] + c * v[k][q]
+    return [a[i][i] for i in range(size)], [[v[k][i] for k in range(size)] for i in range(size)]
+
+
+def fit_rotation(sources, targets):
+    """
+    Finds the rotation that carries unit vectors closest to others, in the least-squares sense.
+
+    Uses Horn's closed form: the rotation is the unit quaternion along the
+    eigenvector of the largest eigenvalue of a symmetric 4x4 matrix built
+    from the pairs. The result is always a proper rotation. When every
+    vector lies on one line the turn around that line is arbitrary.
+
+    Args:
+        sources (list of tuple): (x, y, z) unit vectors to rotate.
+        targets (list of tuple): (x, y, z) unit vectors they should land on, in the same order.
+
+    Returns:
+        list of list of float: The 3x3 rotation as rows.
+    """
+    s = [[sum(source[row] * target[col] for source, target in zip(sources, targets)) for col in range(3)] for row in range(3)]
+    (sxx, sxy, sxz), (syx, syy, syz), (szx, szy, szz) = s
+    values, vectors = _symmetric_eigen([
+        [sxx + syy + szz, syz - szy, szx - sxz, sxy - syx],
+        [syz - szy, sxx - syy - szz, sxy + syx, szx + sxz],
+        [szx - sxz, sxy + syx, -sxx + syy - szz, syz + szy],
+        [sxy - syx, szx + sxz, syz + szy, -sxx - syy + szz],
+    ])
+    w, x, y, z = vectors[max(range(4), key=lambda k: values[k])]
+    norm = math.sqrt(w * w + x * x + y * y + z * z)
+    w, x, y, z = w / norm, x / norm, y / norm, z / norm
+    return [
+        [1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)],
+        [2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)],
+        [2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)],
+    ]
+
+
+def fit_joint_frame(point, centers, order, reference):
+    """
+    Fits the frame of a joint to the dowel directions of a congruent reference joint.
+
+    Unlike joint_frame, which follows the first two dowels exactly, every
+    dowel counts equally, so joints that only match within the signature
+    tolerances are placed with the smallest overall error.
+
+    Args:
+        point (tuple): (x, y, z) of the joint point.
+        centers (list of tuple): (x, y, z) center of every dowel end.
+        order (list of int): Canonical dowel order from joint_signature.
+        reference (list of tuple): Directions of the reference joint in its own frame, from frame_directions.
+
+    Returns:
+        tuple: (origin, x_axis, y_axis, z_axis) of the frame that carries the reference onto this joint.
+    """
+    targets = [_unit((centers[i][0] - point[0], centers[i][1] - point[1], centers[i][2] - point[2]))[0] for i in order]
+    rotation = fit_rotation(reference, targets)
+    return (tuple(point),
+            (rotation[0][0], rotation[1][0], rotation[2][0]),
+            (rotation[0][1], rotation[1][1], rotation[2][1]),
+            (rotation[0][2], rotation[1][2], rotation[2][2]))
+
+
+class JointTemplateCache:
+    """
+    Least-recently-used cache of built joints keyed by joint signature.
+
+    Entries are opaque to the cache, so callers can store whatever is needed
+    to reproduce a joint, such as transient bodies and the frame they were
+    built in.
+    """
+
+    def __init__(self, max_entries=64):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used is dropped.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, signature):
+        """
+        Looks up a joint and counts the hit or miss.
+
+        Args:
+            signature (tuple): Key from joint_signature.
+
+        Returns:
+            The stored entry, or None.
+        """
+        entry = self.entries.get(signature)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(signature)
+        self.hits += 1
+        return entry
+
+    def put(self, signature, entry):
+        """
+        Stores a joint, evicting the least recently used one when full.
+
+        Args:
+            signature (tuple): Key from joint_signature.
+            entry: Whatever is needed to reproduce the joint.
+        """
+        self.entries[signature] = entry
+        self.entries.move_to_end(signature)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drops every entry and resets the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that found a joint."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
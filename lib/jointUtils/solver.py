@@ -0,0 +1,398 @@
+import importlib.util
+import math
+from collections import namedtuple
+
+__all__ = ['MAX_CONDITION', 'Solution', 'RECOMPUTE_INTERVAL', 'solve_symmetric_3x3', 'compute_best_intersections',
+           'has_numpy', 'pad_joints', 'compute_best_intersections_array', 'line_residual', 'NormalEquations']
+
+# Largest infinity-norm condition number accepted for a joint. Two dowels meeting
+# at roughly a third of a degree reach this, and their "intersection" is far away.
+MAX_CONDITION = 1e5
+
+Solution = namedtuple('Solution', ['point', 'condition'])
+
+# Updates between full recomputations of an accumulator, to bound rounding drift from removals
+RECOMPUTE_INTERVAL = 256
+
+
+def solve_symmetric_3x3(s00, s01, s02, s11, s12, s22, c0, c1, c2, max_condition=MAX_CONDITION):
+    """
+    Solves S x = c for a symmetric positive-semidefinite 3x3 matrix S.
+
+    Only the six unique entries of S are used. The inverse is formed from the
+    cofactors directly, so nothing is allocated besides the result, and the
+    infinity-norm condition number ||S|| * ||S^-1|| is computed from the same
+    cofactors. The singularity test is relative to the scale of S.
+
+    Args:
+        s00, s01, s02, s11, s12, s22 (float): Upper triangle of S.
+        c0, c1, c2 (float): Right-hand side vector.
+        max_condition (float): Systems worse conditioned than this are rejected.
+
+    Returns:
+        Solution: (point, condition) where point is an (x, y, z) tuple, or None
+            if the system is singular or too poorly conditioned.
+    """
+    # Cofactors of the symmetric matrix, which are also symmetric
+    a00 = s11 * s22 - s12 * s12
+    a01 = s02 * s12 - s01 * s22
+    a02 = s01 * s12 - s02 * s11
+    a11 = s00 * s22 - s02 * s02
+    a12 = s01 * s02 - s00 * s12
+    a22 = s00 * s11 - s01 * s01
+    det = s00 * a00 + s01 * a01 + s02 * a02
+
+    norm = max(abs(s00) + abs(s01) + abs(s02),
+               abs(s01) + abs(s11) + abs(s12),
+               abs(s02) + abs(s12) + abs(s22))
+    if norm == 0.0 or det <= 0.0:
+        return Solution(None, math.inf)
+
+    inv_norm = max(abs(a00) + abs(a01) + abs(a02),
+                   abs(a01) + abs(a11) + abs(a12),
+                   abs(a02) + abs(a12) + abs(a22)) / det
+    condition = norm * inv_norm
+    if condition > max_condition:
+        return Solution(None, condition)
+
+    x = (a00 * c0 + a01 * c1 + a02 * c2) / det
+    y = (a01 * c0 + a11 * c1 + a12 * c2) / det
+    z = (a02 * c0 + a12 * c1 + a22 * c2) / det
+    return Solution((x, y, z), condition)
+
+
+def compute_best_intersections(centers, normals, mask=None, max_condition=MAX_CONDITION):
+    """
+    Solves the closest-point problem for many joints in a single pass.
+
+    Each joint is a set of lines given by a dowel end center and its normal.
+    For every joint the point minimizing the sum of squared distances to its
+    lines is found by accumulating and solving the 3x3 normal equations
+    S x = C, where S = sum(I - d d^T) and C = sum((I - d d^T) p).
+
+    Args:
+        centers (list of list of tuple): N joints by K dowels of (x, y, z) centers.
+        normals (list of list of tuple): N joints by K dowels of (x, y, z) directions.
+            Directions do not need to be normalized.
+        mask (list of list of bool): Optional padding mask with the same shape.
+            Entries that are False are skipped, so ragged joints can be stacked.
+        max_condition (float): Joints whose system is worse conditioned than
+            this, such as near-parallel dowel sets, are left unsolved.
+
+    Returns:
+        tuple: (points, residuals, conditions) where points is a list of N
+            (x, y, z) tuples, or None for joints that could not be solved,
+            residuals is a list of N RMS line-to-point distances (None when
+            unsolved) and conditions holds the condition estimate of each joint.
+    """
+    points = []
+    residuals = []
+    conditions = []
+
+    for n in range(len(centers)):
+        joint_centers = centers[n]
+        joint_normals = normals[n]
+        joint_mask = mask[n] if mask is not None else None
+
+        # Unique entries of the symmetric matrix S and the vector C
+        s00 = s01 = s02 = s11 = s12 = s22 = 0.0
+        c0 = c1 = c2 = 0.0
+        lines = []
+
+        for k in range(len(joint_centers)):
+            if joint_mask is not None and not joint_mask[k]:
+                continue
+            px, py, pz = joint_centers[k]
+            dx, dy, dz = joint_normals[k]
+            length = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if length == 0.0:
+                continue
+            dx /= length
+            dy /= length
+            dz /= length
+
+            # M = I - d d^T applied to p is p - d (d . p)
+            dp = dx * px + dy * py + dz * pz
+            s00 += 1.0 - dx * dx
+            s01 -= dx * dy
+            s02 -= dx * dz
+            s11 += 1.0 - dy * dy
+            s12 -= dy * dz
+            s22 += 1.0 - dz * dz
+            c0 += px - dx * dp
+            c1 += py - dy * dp
+            c2 += pz - dz * dp
+            lines.append((px, py, pz, dx, dy, dz))
+
+        if len(lines) < 2:
+            points.append(None)
+            residuals.append(None)
+            conditions.append(math.inf)
+            continue
+
+        point, condition = solve_symmetric_3x3(s00, s01, s02, s11, s12, s22, c0, c1, c2, max_condition)
+        points.append(point)
+        residuals.append(line_residual(point, lines) if point is not None else None)
+        conditions.append(condition)
+
+    return points, residuals, conditions
+
+
+def has_numpy():
+    """
+    Checks if NumPy is installed, without importing it.
+
+    Fusion's Python does not always ship NumPy, and importing it would slow
+    down loading the add-in, so it is only imported by the functions that use it.
+
+    Returns:
+        bool: True if compute_best_intersections_array can be used.
+    """
+    return importlib.util.find_spec('numpy') is not None
+
+
+def pad_joints(centers, normals):
+    """
+    Pads joints with different numbers of dowels to the same length.
+
+    Args:
+        centers (list of list of tuple): (x, y, z) centers of every joint.
+        normals (list of list of tuple): (x, y, z) directions of every joint.
+
+    Returns:
+        tuple: (centers, normals, mask) as N x K nested lists, where K is the most dowels in a
+            joint, padding entries are zero and mask is False for them.
+    """
+    width = max((len(joint) for joint in centers), default=0)
+    padding = (0.0, 0.0, 0.0)
+    padded_centers = []
+    padded_normals = []
+    mask = []
+    for joint_centers, joint_normals in zip(centers, normals):
+        missing = width - len(joint_centers)
+        padded_centers.append(list(joint_centers) + [padding] * missing)
+        padded_normals.append(list(joint_normals) + [padding] * missing)
+        mask.append([True] * len(joint_centers) + [False] * missing)
+    return padded_centers, padded_normals, mask
+
+
+def compute_best_intersections_array(centers, normals, mask=None, max_condition=MAX_CONDITION):
+    """
+    Solves the same problem as compute_best_intersections for all joints at once with NumPy.
+
+    The normal equations of every joint are built with einsum and solved
+    as one stack of 3x3 systems, so there is no Python loop per joint or
+    per dowel. This is meant for large headless batches. Inside Fusion,
+    where NumPy may be missing, compute_best_intersections is used.
+
+    Args:
+        centers (array-like): N x K x 3 dowel end centers, for example from pad_joints.
+        normals (array-like): N x K x 3 dowel directions, not necessarily normalized.
+        mask (array-like): N x K booleans, False for padding, or None if every entry is a dowel.
+        max_condition (float): Joints whose system is worse conditioned than this are left unsolved.
+
+    Returns:
+        tuple: (points, residuals, conditions) as NumPy arrays of shape (N, 3), (N,) and (N,).
+            Points and residuals of unsolved joints are NaN, and their condition is the
+            estimate that rejected them, or inf.
+    """
+    import numpy
+
+    c = numpy.asarray(centers, dtype=float).reshape(len(centers), -1, 3)
+    d = numpy.asarray(normals, dtype=float).reshape(c.shape)
+    length = numpy.sqrt(numpy.einsum('nki,nki->nk', d, d))
+    valid = length > 0.0
+    if mask is not None:
+        valid &= numpy.asarray(mask, dtype=bool).reshape(valid.shape)
+    weight = valid.astype(float)
+    u = numpy.divide(d, length[..., None], out=numpy.zeros_like(d), where=valid[..., None])
+
+    # S = sum(I - d d^T) and C = sum(p - d (d . p)) over the dowels of each joint
+    # The unit direction is zero wherever a dowel is masked out, so only the centers need the weight
+    count = weight.sum(axis=1)
+    s = count[:, None, None] * numpy.eye(3) - numpy.einsum('nki,nkj->nij', u, u)
+    dp = numpy.einsum('nki,nki->nk', u, c)
+    rhs = numpy.einsum('nk,nki->ni', weight, c) - numpy.einsum('nk,nki->ni', dp, u)
+
+    # Infinity-norm condition estimate, as in solve_symmetric_3x3
+    solved = (count >= 2) & (numpy.linalg.det(s) > 0.0)
+    conditions = numpy.full(len(c), math.inf)
+    inverse = numpy.linalg.inv(s[solved])
+    conditions[solved] = numpy.abs(s[solved]).sum(axis=2).max(axis=1) * numpy.abs(inverse).sum(axis=2).max(axis=1)
+    accepted = conditions[solved] <= max_condition
+    solved[solved] = accepted
+
+    points = numpy.full((len(c), 3), math.nan)
+    points[solved] = numpy.einsum('nij,nj->ni', inverse[accepted], rhs[solved])
+
+    # RMS distance from each point to its dowel lines
+    offsets = points[:, None, :] - c
+    along = numpy.einsum('nki,nki->nk', offsets, u)
+    errors = offsets - along[..., None] * u
+    squared = numpy.einsum('nki,nki->nk', errors, errors) * weight
+    residuals = numpy.full(len(c), math.nan)
+    residuals[solved] = numpy.sqrt(squared[solved].sum(axis=1) / count[solved])
+    return points, residuals, conditions
+
+def line_residual(point, lines):
+    """
+    Computes the RMS distance from a point to a set of lines.
+
+    Args:
+        point (tuple): (x, y, z) of the point.
+        lines (list of tuple): (px, py, pz, dx, dy, dz) with unit directions.
+
+    Returns:
+        float: The root mean square of the point-to-line distances.
+    """
+    x, y, z = point
+    total = 0.0
+    for px, py, pz, dx, dy, dz in lines:
+        vx = x - px
+        vy = y - py
+        vz = z - pz
+        t = vx * dx + vy * dy + vz * dz
+        ex = vx - t * dx
+        ey = vy - t * dy
+        ez = vz - t * dz
+        total += ex * ex + ey * ey + ez * ez
+    return math.sqrt(total / len(lines))
+
+
+class NormalEquations:
+    """
+    Running normal equations S x = C of a changing set of dowel lines.
+
+    Adding or removing a line is a rank-1 update of S = sum(I - d d^T) and
+    C = sum((I - d d^T) p), so an interactive selection can be re-solved in
+    constant time per change instead of re-summing every dowel. Removals
+    subtract what additions added, which slowly accumulates rounding error,
+    so S and C are re-summed from the stored lines every recompute_interval
+    updates.
+    """
+
+    def __init__(self, recompute_interval=RECOMPUTE_INTERVAL):
+        """
+        Args:
+            recompute_interval (int): Updates between full recomputations.
+        """
+        self.recompute_interval = recompute_interval
+        self.lines = {}
+        self._next_key = 0
+        self.recompute()
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __contains__(self, key):
+        return key in self.lines
+
+    def add(self, point, direction, key=None):
+        """
+        Adds the line through a dowel end.
+
+        Args:
+            point (tuple): (x, y, z) center of the dowel end.
+            direction (tuple): (x, y, z) direction of the dowel, not necessarily normalized.
+            key: Hashable key to remove the line by later, generated when omitted.
+
+        Returns:
+            The key of the line, or None if the direction is zero and nothing was added.
+        """
+        dx, dy, dz = direction
+        length = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if length == 0.0:
+            return None
+        if key is None:
+            key = self._next_key
+            self._next_key += 1
+        if key in self.lines:
+            self.remove(key)
+
+        line = (point[0], point[1], point[2], dx / length, dy / length, dz / length)
+        self.lines[key] = line
+        self._update(line, 1.0)
+        return key
+
+    def remove(self, key):
+        """
+        Removes a line added before.
+
+        Args:
+            key: Key returned by add.
+
+        Returns:
+            bool: False if there was no line with that key.
+        """
+        line = self.lines.pop(key, None)
+        if line is None:
+            return False
+        if self.lines:
+            self._update(line, -1.0)
+        else:
+            # Nothing left to drift from
+            self.recompute()
+        return True
+
+    def _update(self, line, sign):
+        self._accumulate(line, sign)
+        self.updates += 1
+        if self.updates >= self.recompute_interval:
+            self.recompute()
+
+    def _accumulate(self, line, sign):
+        px, py, pz, dx, dy, dz = line
+        # M = I - d d^T applied to p is p - d (d . p)
+        dp = dx * px + dy * py + dz * pz
+        s = self.s
+        s[0] += sign * (1.0 - dx * dx)
+        s[1] -= sign * dx * dy
+        s[2] -= sign * dx * dz
+        s[3] += sign * (1.0 - dy * dy)
+        s[4] -= sign * dy * dz
+        s[5] += sign * (1.0 - dz * dz)
+        c = self.c
+        c[0] += sign * (px - dx * dp)
+        c[1] += sign * (py - dy * dp)
+        c[2] += sign * (pz - dz * dp)
+
+    def clear(self):
+        """
+        Removes every line.
+        """
+        self.lines.clear()
+        self.recompute()
+
+    def recompute(self):
+        """
+        Re-sums S and C from the stored lines.
+        """
+        self.s = [0.0] * 6
+        self.c = [0.0] * 3
+        self.updates = 0
+        for line in self.lines.values():
+            self._accumulate(line, 1.0)
+
+    def solve(self, max_condition=MAX_CONDITION):
+        """
+        Solves the current normal equations.
+
+        Returns:
+            Solution: (point, condition), with a None point for fewer than two
+                lines or a system worse conditioned than max_condition.
+        """
+        if len(self.lines) < 2:
+            return Solution(None, math.inf)
+        return solve_symmetric_3x3(*self.s, *self.c, max_condition)
+
+    def residual(self, point):
+        """
+        Computes the RMS distance from a point to the current lines.
+
+        Args:
+            point (tuple): (x, y, z) of the point.
+
+        Returns:
+            float: The root mean square of the point-to-line distances.
+        """
+        return line_residual(point, list(self.lines.values()))
@@ -0,0 +1,151 @@
+import bisect
+import math
+
+__all__ = ['ISO_COARSE_PITCHES', 'DEFAULT_SAMPLES_PER_PITCH', 'coarse_pitch', 'parse_pitch', 'thread_depth',
+           'iso_profile_table', 'thread_rings']
+
+# ISO 261 coarse pitches (mm) by nominal diameter (mm)
+ISO_COARSE_PITCHES = [
+    (1.0, 0.25), (1.2, 0.25), (1.6, 0.35), (2.0, 0.4), (2.5, 0.45), (3.0, 0.5), (4.0, 0.7), (5.0, 0.8),
+    (6.0, 1.0), (8.0, 1.25), (10.0, 1.5), (12.0, 1.75), (14.0, 2.0), (16.0, 2.0), (18.0, 2.5), (20.0, 2.5),
+    (22.0, 2.5), (24.0, 3.0), (27.0, 3.0), (30.0, 3.5), (33.0, 3.5), (36.0, 4.0), (39.0, 4.0), (42.0, 4.5),
+    (45.0, 4.5), (48.0, 5.0), (52.0, 5.0), (56.0, 5.5), (60.0, 5.5), (64.0, 6.0),
+]
+_COARSE_DIAMETERS = [diameter for diameter, _ in ISO_COARSE_PITCHES]
+
+# Axial samples per pitch of a thread mesh, enough to keep the crest and root flats
+DEFAULT_SAMPLES_PER_PITCH = 16
+
+
+def coarse_pitch(diameter_mm):
+    """
+    Looks up the ISO coarse pitch of the largest standard size not bigger than a diameter.
+
+    Args:
+        diameter_mm (float): Major diameter of the thread in mm.
+
+    Returns:
+        float: The pitch in mm.
+    """
+    index = bisect.bisect_right(_COARSE_DIAMETERS, diameter_mm + 1e-9) - 1
+    return ISO_COARSE_PITCHES[max(index, 0)][1]
+
+
+def parse_pitch(designation):
+    """
+    Reads the pitch in mm from a thread designation such as 'M10x1.5'.
+
+    Args:
+        designation (str): Designation from the thread data.
+
+    Returns:
+        float: The pitch, or None if the designation has none.
+    """
+    try:
+        return float(designation.split('x')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def thread_depth(pitch):
+    """
+    Radial depth of the ISO basic profile, 5/8 of the fundamental triangle height.
+
+    Args:
+        pitch (float): Thread pitch.
+
+    Returns:
+        float: Distance between the major and minor radius.
+    """
+    return 5.0 / 8.0 * math.sqrt(3.0) / 2.0 * pitch
+
+
+def iso_profile_table(pitch, major_radius, samples):
+    """
+    Samples the ISO metric 60 degree basic profile over one pitch.
+
+    The crest flat is P/8 wide at the major radius, the root flat is P/4 wide
+    at the minor radius and the 60 degree flanks join them.
+
+    Args:
+        pitch (float): Thread pitch.
+        major_radius (float): Radius of the crests.
+        samples (int): Number of evenly spaced phases in one pitch.
+
+    Returns:
+        list of float: Radius at phase i * pitch / samples for every i.
+    """
+    depth = thread_depth(pitch)
+    crest = pitch / 8.0
+    flank = 5.0 * pitch / 16.0
+    root_start = crest + flank
+    root_end = root_start + pitch / 4.0
+    radii = []
+    for i in range(samples):
+        phase = pitch * i / samples
+        if phase <= crest:
+            radii.append(major_radius)
+        elif phase < root_start:
+            radii.append(major_radius - depth * (phase - crest) / flank)
+        elif phase <= root_end:
+            radii.append(major_radius - depth)
+        else:
+            radii.append(major_radius - depth * (pitch - phase) / flank)
+    return radii
+
+
+def thread_rings(major_radius, pitch, start, end, segments, internal=False, clearance=0.0,
+                 samples_per_pitch=DEFAULT_SAMPLES_PER_PITCH):
+    """
+    Builds the rings of a helical ISO thread surface between two heights.
+
+    Heights are measured along the axis from the helix origin, so an external
+    and an internal thread built around the same axis mesh with each other.
+    Rings sit at multiples of pitch / samples_per_pitch, where the radius only
+    depends on the angle and the ring number modulo samples_per_pitch. The
+    whole profile is therefore evaluated once per phase and the rings in
+    between are copies. Within one pitch of either end the thread fades out,
+    to the minor radius outside a cap and to the major radius inside a bore,
+    so it starts cleanly.
+
+    Args:
+        major_radius (float): Crest radius of the external thread.
+        pitch (float): Thread pitch, in the same units as the radii.
+        start (float): Height of the first ring.
+        end (float): Height of the last ring.
+        segments (int): Number of segments per turn.
+        internal (bool): Build the matching internal thread of a bore instead.
+        clearance (float): Radial gap added to an internal thread.
+        samples_per_pitch (int): Number of rings per pitch.
+
+    Returns:
+        list of tuple: (radii, height) rings from start to end, with one radius per segment.
+    """
+    samples = samples_per_pitch * segments
+    step = pitch / samples_per_pitch
+    offset = clearance if internal else 0.0
+    table = [radius + offset for radius in iso_profile_table(pitch, major_radius, samples)]
+    faded = major_radius + offset if internal else major_radius - thread_depth(pitch)
+
+    # The phase of segment s on ring k is (k * segments - s * samples_per_pitch) / samples of a pitch
+    def ring(k):
+        base = (k % samples_per_pitch) * segments
+        return [table[(base - s * samples_per_pitch) % samples] for s in range(segments)]
+
+    def fade(radii, height):
+        weight = min(1.0, (height - start) / pitch, (end - height) / pitch)
+        if weight >= 1.0:
+            return radii
+        return [faded + (radius - faded) * weight for radius in radii]
+
+    periodic = [ring(k) for k in range(samples_per_pitch)]
+    first = math.floor(start / step + 1e-6) + 1
+    last = math.ceil(end / step - 1e-6) - 1
+
+    # The fade reaches its end value on the first and last ring, which are therefore round
+    rings = [([faded] * segments, start)]
+    for k in range(first, last + 1):
+        height = k * step
+        rings.append((fade(periodic[k % samples_per_pitch], height), height))
+    rings.append(([faded] * segments, end))
+    return rings
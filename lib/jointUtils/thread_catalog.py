@@ -0,0 +1,156 @@
+import bisect
+import json
+import os
+from collections import namedtuple
+
+__all__ = ['CATALOG_VERSION', 'ThreadSpec', 'parse_size', 'ThreadCatalog']
+
+# Bump whenever the layout of the cache file changes
+CATALOG_VERSION = 1
+
+ThreadSpec = namedtuple('ThreadSpec', ['size', 'diameter', 'designation', 'external_class', 'internal_class'])
+
+
+def parse_size(size):
+    """
+    Reads the nominal diameter in mm from a thread size string such as 'M10' or '10x1.5'.
+
+    Args:
+        size (str): Size string from the thread data.
+
+    Returns:
+        float: The diameter, or None if the size is not numeric.
+    """
+    try:
+        return float(size.replace('M', '').split('x')[0])
+    except ValueError:
+        return None
+
+
+class ThreadCatalog:
+    """
+    Sorted, numeric index of the sizes, designations and classes of one thread type.
+
+    The catalog is built once from a thread data query, which can be Fusion's
+    ThreadDataQuery or anything with the same allSizes, allDesignations and
+    allClasses methods, and is persisted to a versioned JSON cache.
+    """
+
+    def __init__(self, thread_type, entries):
+        """
+        Args:
+            thread_type (str): Name of the thread type, such as 'ISO Metric profile'.
+            entries (list of ThreadSpec): One spec per size, in any order.
+        """
+        self.thread_type = thread_type
+        self.entries = sorted(entries, key=lambda entry: entry.diameter)
+        self.diameters = [entry.diameter for entry in self.entries]
+
+    @classmethod
+    def build(cls, query, thread_type):
+        """
+        Builds the catalog by walking the thread data query once.
+
+        Args:
+            query: Object with allSizes, allDesignations and allClasses methods.
+            thread_type (str): Name of the thread type to index.
+
+        Returns:
+            ThreadCatalog: The new catalog.
+        """
+        entries = []
+        for size in query.allSizes(thread_type):
+            diameter = parse_size(size)
+            if diameter is None:
+                continue
+            designations = query.allDesignations(thread_type, size)
+            if not designations:
+                continue
+
+            # Internal and external classes are resolved together so a cap and its connector always match
+            designation = designations[0]
+            external_classes = query.allClasses(False, thread_type, designation)
+            internal_classes = query.allClasses(True, thread_type, designation)
+            if not external_classes or not internal_classes:
+                continue
+            entries.append(ThreadSpec(size, diameter, designation, external_classes[0], internal_classes[0]))
+
+        return cls(thread_type, entries)
+
+    @classmethod
+    def load(cls, path, thread_type):
+        """
+        Loads a catalog from the cache file.
+
+        Args:
+            path (str): Location of the cache file.
+            thread_type (str): Thread type the catalog must be for.
+
+        Returns:
+            ThreadCatalog: The cached catalog, or None if the cache is missing, stale or for another type.
+        """
+        try:
+            with open(path, 'r') as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('version') != CATALOG_VERSION or data.get('thread_type') != thread_type:
+            return None
+        return cls(thread_type, [ThreadSpec(*entry) for entry in data['entries']])
+
+    @classmethod
+    def load_or_build(cls, path, query, thread_type):
+        """
+        Loads the cached catalog, building and saving it when the cache cannot be used.
+
+        Args:
+            path (str): Location of the cache file.
+            query: Object with allSizes, allDesignations and allClasses methods.
+            thread_type (str): Name of the thread type to index.
+
+        Returns:
+            ThreadCatalog: The catalog.
+        """
+        catalog = cls.load(path, thread_type)
+        if catalog is None:
+            catalog = cls.build(query, thread_type)
+            catalog.save(path)
+        return catalog
+
+    def save(self, path):
+        """
+        Writes the catalog to the cache file.
+
+        Args:
+            path (str): Location of the cache file.
+        """
+        data = {
+            'version': CATALOG_VERSION,
+            'thread_type': self.thread_type,
+            'entries': [list(entry) for entry in self.entries],
+        }
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.replace(temp_path, path)
+
+    def nearest(self, diameter, max_difference=2.5):
+        """
+        Finds the size whose nominal diameter is closest to the given diameter.
+
+        Args:
+            diameter (float): Wanted diameter in mm.
+            max_difference (float): Largest accepted difference in mm.
+
+        Returns:
+            ThreadSpec: The closest size, or None if nothing is close enough.
+        """
+        index = bisect.bisect_left(self.diameters, diameter)
+        best = None
+        for candidate in (index - 1, index):
+            if 0 <= candidate < len(self.entries):
+                difference = abs(self.diameters[candidate] - diameter)
+                if difference <= max_difference and (best is None or difference < abs(best.diameter - diameter)):
+                    best = self.entries[candidate]
+        return best
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The pure helpers are imported the way the command line tool imports them
+LIB = os.path.join(ROOT, 'lib')
+if LIB not in sys.path:
+    sys.path.insert(0, LIB)
@@ -0,0 +1,103 @@
+import math
+import random
+import time
+from array import array
+
+import jointUtils
+
+REACH = 5.0
+TOLERANCE = 0.05
+
+# Clustering a scan of 5,000 ends should take well under this many seconds
+LARGE_SCAN_BUDGET = 0.1
+
+
+def all_pairs_clusters(centers, normals, reach, tolerance):
+    # Links every pair of ends whose axes meet, without the grid, and groups the linked ends
+    units = []
+    for normal in normals:
+        length = math.sqrt(sum(value * value for value in normal))
+        units.append(tuple(value / length for value in normal) if length > 0.0 else None)
+    groups = [{i} for i in range(len(centers))]
+    for i in range(len(centers)):
+        for j in range(i + 1, len(centers)):
+            if units[i] and units[j] and jointUtils.axes_meet(centers[i], units[i], centers[j], units[j], reach, tolerance):
+                merged = groups[i] | groups[j]
+                for k in merged:
+                    groups[k] = merged
+    unique = {min(group): sorted(group) for group in groups if len(group) > 1}
+    return [unique[key] for key in sorted(unique)]
+
+
+def lattice(rng, side, spacing, jitter=0.0):
+    # A joint of 2 to 4 dowels at every lattice point, centred on the origin so cells on both sides of zero are used
+    centers = []
+    normals = []
+    offset = (side - 1) * spacing / 2
+    for a in range(side):
+        for b in range(side):
+            for c in range(side):
+                point = (a * spacing - offset, b * spacing - offset, c * spacing - offset)
+                for _ in range(rng.randint(2, 4)):
+                    direction = [rng.gauss(0, 1) for _ in range(3)]
+                    length = math.sqrt(sum(value * value for value in direction))
+                    distance = rng.uniform(1.0, REACH * 0.9)
+                    centers.append(tuple(point[k] - direction[k] / length * distance + rng.uniform(-jitter, jitter)
+                                         for k in range(3)))
+                    normals.append(tuple(direction))
+    return centers, normals
+
+
+def test_dowel_end_set_is_clustered_from_its_arrays():
+    # Two dowels meeting at the origin, one meeting at (20, 0, 0) with the first, and a stray end
+    ends = jointUtils.DowelEndSet()
+    ends.add((-3.0, 0.0, 0.0), (1.0, 0.0, 0.0), 0.5)
+    ends.add((0.0, -4.0, 0.0), (0.0, 2.0, 0.0), 0.5)
+    ends.add((20.0, 3.0, 0.0), (0.0, -1.0, 0.0), 0.5)
+    ends.add((17.0, 0.0, 0.0), (1.0, 0.0, 0.0), 0.5)
+    ends.add((50.0, 50.0, 50.0), (0.0, 0.0, 0.0), 0.5)
+
+    assert isinstance(ends.flat_centers, array)
+    assert list(ends.flat_normals[3:6]) == [0.0, 2.0, 0.0]
+    clusters = jointUtils.cluster_flat_dowel_ends(ends.flat_centers, ends.flat_normals, REACH, TOLERANCE)
+    assert clusters == [[0, 1], [2, 3]]
+    assert clusters == jointUtils.cluster_dowel_ends(ends.centers(), ends.normals(), REACH, TOLERANCE)
+
+
+def test_grid_matches_all_pairs_on_a_lattice():
+    # A spacing below the cell size of 2 * REACH puts the ends of neighbouring joints in neighbouring cells
+    rng = random.Random(7)
+    for spacing in (6.0, 9.5, 20.0):
+        centers, normals = lattice(rng, 4, spacing)
+        assert jointUtils.cluster_dowel_ends(centers, normals, REACH, TOLERANCE) == \
+            all_pairs_clusters(centers, normals, REACH, TOLERANCE)
+
+
+def test_grid_matches_all_pairs_with_near_misses_and_stray_ends():
+    rng = random.Random(8)
+    centers, normals = lattice(rng, 3, 7.0, jitter=TOLERANCE)
+    # Ends without a direction, and a dowel whose two ends face away from each other
+    centers += [(0.0, 0.0, 0.0), (1.0, 1.0, 1.0), (0.0, 0.0, 30.0), (0.0, 0.0, 32.0)]
+    normals += [(0.0, 0.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, -1.0), (0.0, 0.0, 1.0)]
+
+    clusters = jointUtils.cluster_dowel_ends(centers, normals, REACH, TOLERANCE)
+
+    assert clusters == all_pairs_clusters(centers, normals, REACH, TOLERANCE)
+    assert not any(index >= len(centers) - 4 for cluster in clusters for index in cluster)
+
+
+def test_large_scan_is_clustered_within_budget():
+    rng = random.Random(9)
+    centers, normals = lattice(rng, 12, 20.0)
+    centers, normals = centers[:5000], normals[:5000]
+    assert len(centers) == 5000
+
+    best = math.inf
+    for _ in range(3):
+        start = time.perf_counter()
+        clusters = jointUtils.cluster_dowel_ends(centers, normals, REACH, TOLERANCE)
+        best = min(best, time.perf_counter() - start)
+
+    # Every end belongs to a joint, except the last one if the cut left its joint a single end
+    assert sum(len(cluster) for cluster in clusters) >= len(centers) - 1
+    assert best < LARGE_SCAN_BUDGET, f'clustering 5000 ends took {best * 1000:.0f} ms'
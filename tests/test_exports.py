@@ -0,0 +1,23 @@
+import types
+
+import pytest
+
+import jointUtils
+
+STAR_IMPORTED = ['solver', 'clustering', 'thread_catalog', 'signature', 'dimensions', 'regeneration', 'interference',
+                 'progress', 'planner', 'dowel_ends', 'scan_cache', 'geometry_cache']
+
+
+@pytest.mark.parametrize('name', STAR_IMPORTED)
+def test_submodule_exports_only_its_own_names(name):
+    module = getattr(jointUtils, name)
+    for exported in module.__all__:
+        value = getattr(module, exported)
+        assert getattr(jointUtils, exported) is value
+        assert not isinstance(value, types.ModuleType)
+
+
+def test_package_does_not_leak_imports():
+    # Standard library modules and helpers imported by the submodules stay out of the package namespace
+    for leaked in ('os', 'json', 'math', 'hashlib', 'namedtuple', 'itertools', 'threading', 'array', 'bisect'):
+        assert not hasattr(jointUtils, leaked)
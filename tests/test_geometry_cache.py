@@ -0,0 +1,79 @@
+import os
+
+import jointUtils
+from jointUtils import geometry_cache
+
+
+def put(cache, key, size):
+    return cache.put_bytes(key, '.bin', b'x' * size)
+
+
+def test_roundtrip_and_counters(tmp_path):
+    cache = jointUtils.GeometryCache(str(tmp_path), 1000)
+
+    assert cache.read_bytes('a', '.bin') is None
+    put(cache, 'a', 10)
+    assert cache.read_bytes('a', '.bin') == b'x' * 10
+
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.writes, stats.entries, stats.bytes) == (1, 1, 1, 1, 10)
+    assert cache.hit_rate == 0.5
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = jointUtils.GeometryCache(str(tmp_path), 350)
+    for index, key in enumerate('abc'):
+        put(cache, key, 100)
+        os.utime(cache.path(key, '.bin'), (1000 + index, 1000 + index))
+    # Reading refreshes 'a', so 'b' is now the oldest
+    cache.get('a', '.bin')
+    os.utime(cache.path('a', '.bin'), (2000, 2000))
+
+    put(cache, 'd', 100)
+
+    assert [key for key in 'abcd' if os.path.exists(cache.path(key, '.bin'))] == ['a', 'c', 'd']
+    assert cache.evictions == 1
+    assert cache.tracked_bytes == cache.stats.bytes == 300
+
+
+def test_directory_is_listed_only_when_opened_or_over_budget(tmp_path, monkeypatch):
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(geometry_cache.os, 'listdir', lambda path: listings.append(path) or listdir(path))
+    cache = jointUtils.GeometryCache(str(tmp_path), 1000)
+
+    for index in range(9):
+        put(cache, f'k{index}', 100)
+    assert len(listings) == 1
+    assert cache.tracked_bytes == 900
+
+    # Rewriting an entry replaces its size instead of adding to it
+    put(cache, 'k0', 100)
+    assert len(listings) == 1
+
+    put(cache, 'k9', 200)
+    assert len(listings) == 2
+    assert cache.tracked_bytes <= 1000
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    stale = tmp_path / 'tmp-1-dead.bin'
+    stale.write_bytes(b'partial')
+    old = os.path.getmtime(stale) - 2 * geometry_cache.STALE_TEMP_AGE
+    os.utime(stale, (old, old))
+    cache = jointUtils.GeometryCache(str(tmp_path), 1000)
+
+    put(cache, 'a', 10)
+
+    assert not stale.exists()
+    assert cache.stats.entries == 1
+
+
+def test_key_depends_on_every_input():
+    signature = ((0.5, 4.0), (0.5, 4.0))
+    key = jointUtils.joint_cache_key(signature, ['M18x2.5'] * 2, segments=64)
+
+    assert key == jointUtils.joint_cache_key(signature, ['M18x2.5'] * 2, segments=64)
+    assert key != jointUtils.joint_cache_key(signature, ['M18x2.5'] * 2, segments=32)
+    assert key != jointUtils.joint_cache_key(signature, ['M16x2'] * 2, segments=64)
+    assert key != jointUtils.joint_cache_key(((0.5, 4.0), (0.5, 4.1)), ['M18x2.5'] * 2, segments=64)
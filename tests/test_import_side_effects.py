@@ -0,0 +1,102 @@
+"""
+Importing a command must not touch the active design or document.
+
+The add-in is loaded when Fusion starts, before any document is open, and
+ExecutionContext resolves the design only when a command runs. These tests
+import every command against a stub of the Fusion API that records every
+attribute read from it.
+"""
+import importlib
+import os
+import sys
+import time
+import types
+
+import pytest
+
+from conftest import ROOT
+
+# Name the add-in folder is imported under, as Fusion imports it by its folder name
+PACKAGE = 'dowel_connector_under_test'
+
+# Seconds the add-in may spend importing its commands at startup, well above the ~25 ms it takes against the stub
+IMPORT_BUDGET = 0.5
+
+# Reads that only make sense while a command runs
+DOCUMENT_ACCESS = ('activeProduct', 'activeDocument', 'documents', 'activeEditObject', 'activeViewport')
+
+
+class Recorder:
+    """
+    Stands in for any Fusion API object and logs the path of every attribute read and call.
+    """
+
+    def __init__(self, path, log):
+        self._path = path
+        self._log = log
+
+    def __getattr__(self, name):
+        path = f'{self._path}.{name}'
+        self._log.append(path)
+        return Recorder(path, self._log)
+
+    def __call__(self, *args, **kwargs):
+        path = f'{self._path}()'
+        self._log.append(path)
+        return Recorder(path, self._log)
+
+
+def command_names():
+    folder = os.path.join(ROOT, 'commands')
+    return sorted(name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name, 'entry.py')))
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    log = []
+    adsk = types.ModuleType('adsk')
+    adsk.__path__ = []
+    for name in ('core', 'fusion'):
+        module = types.ModuleType(f'adsk.{name}')
+        module.__getattr__ = lambda attribute, name=name: getattr(Recorder(f'adsk.{name}', log), attribute)
+        setattr(adsk, name, module)
+        monkeypatch.setitem(sys.modules, f'adsk.{name}', module)
+    monkeypatch.setitem(sys.modules, 'adsk', adsk)
+
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ROOT]
+    monkeypatch.setitem(sys.modules, PACKAGE, package)
+
+    yield log
+
+    for name in [name for name in sys.modules if name.startswith(PACKAGE + '.')]:
+        del sys.modules[name]
+
+
+@pytest.mark.parametrize('command', command_names())
+def test_command_import_leaves_document_alone(stub_api, command):
+    module = importlib.import_module(f'{PACKAGE}.commands.{command}.entry')
+
+    assert callable(module.start) and callable(module.stop)
+    touched = [path for path in stub_api if path.rsplit('.', 1)[-1] in DOCUMENT_ACCESS]
+    assert touched == []
+    # Only the application and its user interface are looked up while importing
+    assert not any(path.endswith('.cast()') for path in stub_api)
+
+
+def test_add_in_import_is_within_budget(stub_api):
+    # Fusion imports the commands package when the add-in starts
+    start = time.perf_counter()
+    commands = importlib.import_module(f'{PACKAGE}.commands')
+    elapsed = time.perf_counter() - start
+
+    assert commands.commands
+    assert elapsed < IMPORT_BUDGET, f'importing the add-in took {elapsed * 1000:.0f} ms'
+
+
+def test_recorder_sees_document_access(stub_api):
+    # The check above would pass vacuously if reads were not recorded
+    context_utils = importlib.import_module(f'{PACKAGE}.lib.fusionAddInUtils.context_utils')
+    context_utils.ExecutionContext().design
+
+    assert any(path.endswith('.activeProduct') for path in stub_api)
@@ -0,0 +1,83 @@
+import itertools
+import math
+import random
+
+import jointUtils
+
+# A 12.7 mm dowel
+RADIUS = 0.635
+
+
+def sampled_distance(p0, p1, q0, q1, samples=200):
+    # Closest pair of evenly spaced points on both segments
+    def point(a, b, t):
+        return tuple(a[i] + (b[i] - a[i]) * t for i in range(3))
+
+    first = [point(p0, p1, i / samples) for i in range(samples + 1)]
+    second = [point(q0, q1, i / samples) for i in range(samples + 1)]
+    return min(math.dist(a, b) for a in first for b in second)
+
+
+def random_point(rng, spread=5.0):
+    return tuple(rng.uniform(-spread, spread) for _ in range(3))
+
+
+def test_segment_distance_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(60):
+        p0, p1, q0, q1 = (random_point(rng) for _ in range(4))
+        exact = jointUtils.segment_distance(p0, p1, q0, q1)
+        sampled = sampled_distance(p0, p1, q0, q1)
+        # Sampling can only overestimate, by at most half a sample step on each segment
+        step = (math.dist(p0, p1) + math.dist(q0, q1)) / 200
+        assert exact <= sampled + 1e-9
+        assert sampled - exact <= step
+
+
+def test_segment_distance_of_parallel_and_degenerate_segments():
+    assert math.isclose(jointUtils.segment_distance((0, 0, 0), (1, 0, 0), (0, 2, 0), (1, 2, 0)), 2.0)
+    assert math.isclose(jointUtils.segment_distance((0, 0, 0), (1, 0, 0), (3, 0, 0), (4, 0, 0)), 2.0)
+    assert math.isclose(jointUtils.segment_distance((0, 0, 0), (0, 0, 0), (1, -1, 0), (1, 1, 0)), 1.0)
+    assert math.isclose(jointUtils.segment_distance((1, 1, 1), (1, 1, 1), (1, 1, 4), (1, 1, 4)), 3.0)
+
+
+def test_check_interference_matches_all_pairs():
+    rng = random.Random(1)
+    capsules = [jointUtils.Capsule(random_point(rng, 10.0), random_point(rng, 10.0), rng.uniform(0.1, 1.0), index, 0, 'cap')
+                for index in range(120)]
+
+    for margin in (0.0, 0.5):
+        report = jointUtils.check_interference(capsules, margin)
+        expected = {}
+        for i, j in itertools.combinations(range(len(capsules)), 2):
+            first, second = capsules[i], capsules[j]
+            clearance = jointUtils.segment_distance(first.start, first.end, second.start, second.end) - first.radius - second.radius
+            if clearance < margin:
+                expected[(i, j)] = clearance
+        assert {(conflict.first, conflict.second) for conflict in report.conflicts} == set(expected)
+        for conflict in report.conflicts:
+            assert math.isclose(conflict.clearance, expected[(conflict.first, conflict.second)])
+        assert [conflict.clearance for conflict in report.conflicts] == sorted(expected.values())
+        # The hierarchy skips far pairs, so fewer pairs are measured than all of them
+        assert report.pairs_tested < len(capsules) * (len(capsules) - 1) // 2
+
+
+def test_compact_corner_joints_do_not_interfere():
+    for distance in (2.0, 2.25, 2.5):
+        for directions in ([(1, 0, 0), (0, 1, 0)], [(1, 0, 0), (0, 1, 0), (0, 0, 1)]):
+            centers = [tuple(value * distance for value in direction) for direction in directions]
+            capsules = jointUtils.joint_capsules((0.0, 0.0, 0.0), centers, [RADIUS] * len(centers), 0)
+            assert jointUtils.check_interference(capsules).conflicts == []
+
+
+def test_parts_of_different_joints_interfere():
+    # Two L joints whose connectors cross each other
+    first = jointUtils.joint_capsules((0.0, 0.0, 0.0), [(3.0, 0.0, 0.0), (0.0, 3.0, 0.0)], [RADIUS] * 2, 0)
+    second = jointUtils.joint_capsules((1.5, 1.5, 0.5), [(1.5, 1.5, 3.5), (1.5, -1.5, 0.5)], [RADIUS] * 2, 1)
+    capsules = first + second
+    report = jointUtils.check_interference(capsules)
+
+    assert report.conflicts
+    for conflict in report.conflicts:
+        assert capsules[conflict.first].joint != capsules[conflict.second].joint
+        assert conflict.clearance < 0.0
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import jointUtils
+
+# Three dowels of 5 mm radius pointing at the origin from 5 cm away
+JOINT = [((5.0, 0.0, 0.0), (-1.0, 0.0, 0.0), 0.5),
+         ((0.0, 5.0, 0.0), (0.0, -1.0, 0.0), 0.5),
+         ((0.0, 0.0, 5.0), (0.0, 0.0, -1.0), 0.5)]
+
+PARALLEL = [((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), 0.5),
+            ((0.0, 3.0, 0.0), (1.0, 0.0, 0.0), 0.5)]
+
+
+def test_plans_solve_points_and_skip_parallel_dowels():
+    plans = jointUtils.plan_joints([JOINT, PARALLEL], interference=False)
+
+    assert max(abs(value) for value in plans[0].point) < 1e-9
+    assert plans[1].point is None
+    assert plans[0].sizes == [None, None, None]
+
+
+def test_wait_returns_the_plans_without_running_the_callback():
+    planner = jointUtils.BackgroundPlanner()
+    delivered = []
+    idle_calls = []
+    ticket = planner.submit([JOINT], delivered.append)
+
+    plans = planner.wait(ticket, lambda: idle_calls.append(1), interval=0.001)
+    assert len(plans) == 1 and max(abs(value) for value in plans[0].point) < 1e-9
+    assert delivered == []
+    assert planner.pending == 0
+    # Collected work cannot be waited for or delivered again
+    assert planner.wait(ticket) is None
+    assert not planner.deliver(ticket)
+
+
+def test_wait_raises_what_planning_raised():
+    planner = jointUtils.BackgroundPlanner()
+    catalog = type('Catalog', (), {'nearest': lambda self, diameter: 1 / 0})()
+    ticket = planner.submit([JOINT], catalog=catalog)
+
+    with pytest.raises(ZeroDivisionError):
+        planner.wait(ticket, interval=0.001)
+    assert planner.pending == 0
+
+
+def test_wait_can_be_cancelled():
+    release = threading.Event()
+    planner = jointUtils.BackgroundPlanner()
+    delivered = []
+    # The worker blocks in the catalog lookup until the wait has been cancelled
+    catalog = type('Catalog', (), {'nearest': lambda self, diameter: release.wait() and None})()
+    ticket = planner.submit([JOINT], delivered.append, catalog=catalog)
+
+    assert planner.wait(ticket, cancelled=lambda: True, interval=0.001) is None
+    release.set()
+    assert planner.pending == 0
+    assert delivered == []
+
+
+def test_post_is_called_when_given():
+    posted = []
+    planner = jointUtils.BackgroundPlanner(posted.append, start_thread=False)
+    delivered = []
+    ticket = planner.submit([JOINT], delivered.append)
+
+    assert posted == [ticket]
+    assert planner.deliver(ticket)
+    assert len(delivered) == 1
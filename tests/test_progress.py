@@ -0,0 +1,119 @@
+import pytest
+
+import jointUtils
+
+
+class FakeClock:
+    """
+    Clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def timed_queue(durations, smoothing=0.5):
+    # Every item takes the time listed for it on the fake clock
+    clock = FakeClock()
+
+    def step(seconds):
+        clock.advance(seconds)
+        return seconds
+
+    return clock, jointUtils.WorkQueue(durations, step, jointUtils.EtaEstimator(smoothing, clock))
+
+
+def test_run_reports_progress_after_every_item():
+    clock, queue = timed_queue([1.0, 1.0, 1.0, 1.0])
+    snapshots = []
+
+    assert queue.run(on_progress=snapshots.append)
+
+    assert [snapshot.done for snapshot in snapshots] == [1, 2, 3, 4]
+    assert all(snapshot.total == 4 for snapshot in snapshots)
+    assert snapshots[0] == jointUtils.Progress(1, 4, 1.0, 3.0, 1.0)
+    assert snapshots[-1].eta == 0.0
+    assert queue.results == [1.0, 1.0, 1.0, 1.0]
+    assert queue.is_finished
+
+
+def test_cancel_stops_before_the_next_item():
+    clock, queue = timed_queue([1.0] * 5)
+    checks = []
+
+    # The third check cancels, after two items have run
+    assert not queue.run(should_cancel=lambda: checks.append(1) or len(checks) == 3)
+
+    assert queue.cancelled
+    assert queue.position == 2
+    assert queue.results == [1.0, 1.0]
+    assert not queue.is_finished
+
+
+def test_resume_continues_from_position():
+    clock, queue = timed_queue([1.0, 2.0, 3.0, 4.0])
+    assert not queue.run(should_cancel=lambda: queue.position == 2)
+    # Time spent paused counts as elapsed but not as time per item
+    clock.advance(60.0)
+
+    assert queue.run()
+
+    assert not queue.cancelled
+    assert queue.results == [1.0, 2.0, 3.0, 4.0]
+    assert queue.progress().elapsed == pytest.approx(70.0)
+    assert queue.estimator.seconds_per_item < 4.0
+    # Running a finished queue does nothing
+    assert queue.run()
+    assert queue.results == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_eta_follows_a_slowdown_smoothly():
+    clock, queue = timed_queue([1.0, 1.0, 3.0, 3.0], smoothing=0.5)
+    etas = []
+    queue.run(on_progress=lambda snapshot: etas.append(snapshot.eta))
+
+    # Seconds per item move half way to every new sample: 1, 1, 2, 2.5
+    assert etas == pytest.approx([3.0, 2.0, 2.0, 0.0])
+    assert queue.estimator.seconds_per_item == pytest.approx(2.5)
+    assert queue.estimator.throughput == pytest.approx(0.4)
+
+
+def test_estimator_before_the_first_item():
+    estimator = jointUtils.EtaEstimator(clock=FakeClock())
+
+    assert estimator.eta(10) is None
+    assert estimator.throughput is None
+    assert estimator.elapsed == 0.0
+
+
+def test_estimator_splits_a_batch_record_over_its_items():
+    clock = FakeClock()
+    estimator = jointUtils.EtaEstimator(clock=clock)
+    estimator.start()
+    clock.advance(6.0)
+    estimator.record(3)
+
+    assert estimator.items == 3
+    assert estimator.seconds_per_item == pytest.approx(2.0)
+    assert estimator.eta(5) == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize('seconds, text', [
+    (None, '...'),
+    (0, '0 s'),
+    (41.6, '42 s'),
+    (59.4, '59 s'),
+    (59.6, '1 min 00 s'),
+    (185, '3 min 05 s'),
+    (3599.4, '59 min 59 s'),
+    (3600, '1 h 00 min'),
+    (7380, '2 h 03 min'),
+])
+def test_format_duration(seconds, text):
+    assert jointUtils.format_duration(seconds) == text
@@ -0,0 +1,102 @@
+import itertools
+
+import pytest
+
+import jointUtils
+
+END = ((1.0, 2.0, 3.0), (0.0, 0.0, 1.0), 0.5)
+
+
+def test_geometry_hash_ignores_noise_below_the_precision():
+    center, normal, radius = END
+    # A recompute that moves nothing leaves floating point noise far below HASH_PRECISION
+    noisy = tuple(value + 1e-10 for value in center)
+
+    assert jointUtils.geometry_hash(noisy, normal, radius) == jointUtils.geometry_hash(center, normal, radius)
+    assert jointUtils.geometry_hash(center, normal, radius + 1e-12) == jointUtils.geometry_hash(center, normal, radius)
+    # -0.0 and 0.0 are the same normal
+    assert jointUtils.geometry_hash(center, (-0.0, 0.0, 1.0), radius) == jointUtils.geometry_hash(center, normal, radius)
+
+
+def test_geometry_hash_changes_with_the_geometry():
+    center, normal, radius = END
+    original = jointUtils.geometry_hash(center, normal, radius)
+
+    assert jointUtils.geometry_hash((1.0, 2.0, 3.0 + 1e-4), normal, radius) != original
+    assert jointUtils.geometry_hash(center, (0.0, 1.0, 0.0), radius) != original
+    assert jointUtils.geometry_hash(center, normal, 0.6) != original
+    # A coarser precision absorbs the same move
+    assert (jointUtils.geometry_hash((1.0, 2.0, 3.0 + 1e-4), normal, radius, precision=1e-2)
+            == jointUtils.geometry_hash(center, normal, radius, precision=1e-2))
+
+
+def test_joint_id_ignores_token_order():
+    tokens = ['edge-a', 'edge-b', 'edge-c']
+    ids = {jointUtils.joint_id(list(order)) for order in itertools.permutations(tokens)}
+
+    assert len(ids) == 1
+    assert jointUtils.joint_id(tokens[:2]) not in ids
+    # Tokens are separated, so joining them differently is a different joint
+    assert jointUtils.joint_id(['ab', 'c']) != jointUtils.joint_id(['a', 'bc'])
+
+
+def record(tokens, ends):
+    return jointUtils.make_joint_record(tokens, ends, {'is_modeled': True})
+
+
+def current(records, **moved):
+    # Current hashes equal to the stored ones, with moved tokens replaced
+    hashes = {token: value for entry in records for token, value in zip(entry.tokens, entry.hashes)}
+    hashes.update(moved)
+    return hashes
+
+
+def test_diff_splits_unchanged_changed_and_removed():
+    ends = [((0.0, 0.0, float(index)), (1.0, 0.0, 0.0), 0.5) for index in range(3)]
+    untouched = record(['a1', 'a2'], ends[:2])
+    moved = record(['b1', 'b2', 'b3'], ends)
+    lost = record(['c1', 'c2'], ends[:2])
+    records = [untouched, moved, lost]
+    hashes = current(records, b2=jointUtils.geometry_hash((9.0, 9.0, 9.0), (1.0, 0.0, 0.0), 0.5))
+    del hashes['c1'], hashes['c2']
+
+    diff = jointUtils.diff_joints(records, hashes)
+
+    assert diff == jointUtils.JointDiff([untouched.joint_id], [moved.joint_id], [lost.joint_id])
+
+
+def test_diff_removes_joints_left_with_fewer_than_two_ends():
+    ends = [((0.0, 0.0, float(index)), (1.0, 0.0, 0.0), 0.5) for index in range(3)]
+    three = record(['a1', 'a2', 'a3'], ends)
+    two = record(['b1', 'b2'], ends[:2])
+    records = [three, two]
+    # Losing one of three ends leaves two to rebuild from, losing one of two leaves a single end
+    hashes = current(records, a3=None, b2=None)
+
+    diff = jointUtils.diff_joints(records, hashes)
+
+    assert diff.changed == [three.joint_id]
+    assert diff.removed == [two.joint_id]
+    assert diff.unchanged == []
+
+
+def test_record_round_trips_through_its_encoding():
+    original = record(['edge-1', 'edge-2'], [END, ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), 0.3)])
+
+    decoded = jointUtils.decode_joint_record(jointUtils.encode_joint_record(original))
+
+    assert decoded == original
+    assert decoded.joint_id == jointUtils.joint_id(['edge-2', 'edge-1'])
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    'not json',
+    '[]',
+    '{"tokens": ["a"], "hashes": ["x"]}',
+    '{"joint_id": "1", "tokens": 5, "hashes": []}',
+    '{"joint_id": "1", "tokens": ["a", "b"], "hashes": ["x"]}',
+    '{"joint_id": "1", "tokens": ["a"], "hashes": ["x"], "options": [1]}',
+])
+def test_decode_rejects_invalid_records(text):
+    assert jointUtils.decode_joint_record(text) is None
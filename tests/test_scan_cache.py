@@ -0,0 +1,70 @@
+import jointUtils
+
+END = (0, (0.0, 0.0, 1.0), (0.0, 0.0, 1.0), 0.5)
+
+
+def fingerprint(faces=3, low=(0.0, 0.0, 0.0)):
+    return jointUtils.body_fingerprint(faces, 2, 0, low, (1.0, 1.0, 1.0))
+
+
+def test_unchanged_bodies_are_reused():
+    cache = jointUtils.ScanCache()
+    cache.begin()
+    assert cache.get('body', fingerprint()) is None
+    cache.put('body', fingerprint(), [END])
+
+    cache.begin()
+    assert cache.get('body', fingerprint()) == [END]
+    assert cache.stats == jointUtils.ScanStats(bodies=1, reused=1, scanned=0, ends=1)
+
+
+def test_changed_fingerprint_rescans():
+    cache = jointUtils.ScanCache()
+    cache.put('body', fingerprint(), [END])
+
+    cache.begin()
+    assert cache.get('body', fingerprint(faces=4)) is None
+    # Moves below the hash precision keep the fingerprint
+    assert cache.get('body', fingerprint(low=(1e-8, 0.0, 0.0))) == [END]
+    assert cache.get('body', fingerprint(low=(0.1, 0.0, 0.0))) is None
+
+
+def test_prune_drops_unseen_bodies():
+    cache = jointUtils.ScanCache()
+    cache.put('kept', fingerprint(), [END])
+    cache.put('deleted', fingerprint(), [END])
+
+    cache.begin()
+    cache.get('kept', fingerprint())
+    assert cache.prune() == 1
+    assert len(cache) == 1
+
+
+def test_documents_keep_their_own_scans():
+    caches = jointUtils.DocumentScanCaches(max_documents=2)
+    first = caches.get('first')
+    first.put('body', fingerprint(), [END])
+
+    # Scanning another document prunes only that document's cache
+    second = caches.get('second')
+    second.begin()
+    second.prune()
+
+    first.begin()
+    assert caches.get('first') is first
+    assert first.get('body', fingerprint()) == [END]
+
+
+def test_least_recently_scanned_document_is_dropped():
+    caches = jointUtils.DocumentScanCaches(max_documents=2)
+    first = caches.get('first')
+    caches.get('second')
+    caches.get('first')
+    caches.get('third')
+
+    assert len(caches) == 2
+    assert caches.get('first') is first
+    assert 'second' not in caches.caches
+
+    caches.discard('first')
+    assert caches.get('first') is not first
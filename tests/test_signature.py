@@ -0,0 +1,129 @@
+import math
+import random
+
+import pytest
+
+import jointUtils
+
+
+def random_rotation(rng):
+    # Uniform random unit quaternion
+    w, x, y, z = (rng.gauss(0, 1) for _ in range(4))
+    norm = math.sqrt(w * w + x * x + y * y + z * z)
+    w, x, y, z = w / norm, x / norm, y / norm, z / norm
+    return [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ]
+
+
+def move(point, rotation, offset):
+    return tuple(sum(rotation[row][k] * point[k] for k in range(3)) + offset[row] for row in range(3))
+
+
+def apply_matrix(matrix, point):
+    return tuple(sum(matrix[4 * row + k] * point[k] for k in range(3)) + matrix[4 * row + 3] for row in range(3))
+
+
+def mirror(point):
+    return (-point[0], point[1], point[2])
+
+
+def random_joint(rng, dowels, radius=None, length=None):
+    centers = []
+    radii = []
+    for _ in range(dowels):
+        x, y, z = (rng.gauss(0, 1) for _ in range(3))
+        scale = (length or rng.uniform(2.0, 8.0)) / math.sqrt(x * x + y * y + z * z)
+        centers.append((x * scale, y * scale, z * scale))
+        radii.append(radius or rng.choice([0.3, 0.4, 0.5]))
+    return (0.0, 0.0, 0.0), centers, radii
+
+
+def distance(a, b):
+    return math.sqrt(sum((a[i] - b[i]) ** 2 for i in range(3)))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_rigid_motion_is_recovered(seed):
+    rng = random.Random(seed)
+    point, centers, radii = random_joint(rng, rng.randint(3, 5))
+    rotation = random_rotation(rng)
+    offset = (rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(-50, 50))
+    moved_point = move(point, rotation, offset)
+    moved_centers = [move(center, rotation, offset) for center in centers]
+
+    signature, order = jointUtils.joint_signature(point, centers, radii)
+    moved_signature, moved_order = jointUtils.joint_signature(moved_point, moved_centers, radii)
+    assert moved_signature == signature
+
+    # The frames carry every dowel end of one joint onto the same dowel end of the other
+    frame = jointUtils.joint_frame(point, centers, order)
+    moved_frame = jointUtils.joint_frame(moved_point, moved_centers, moved_order)
+    matrix = jointUtils.frame_to_frame_matrix(frame, moved_frame)
+    for i, j in zip(order, moved_order):
+        assert distance(apply_matrix(matrix, centers[i]), moved_centers[j]) < 1e-9
+
+    # So does the least-squares fit used to place instanced joints
+    reference = jointUtils.frame_directions(point, centers, order, frame)
+    fitted = jointUtils.fit_joint_frame(moved_point, moved_centers, moved_order, reference)
+    matrix = jointUtils.frame_to_frame_matrix(frame, fitted)
+    for i, j in zip(order, moved_order):
+        assert distance(apply_matrix(matrix, centers[i]), moved_centers[j]) < 1e-9
+
+
+def test_chiral_mirror_has_distinct_signature():
+    # Three dowels of different lengths along non-coplanar directions have no mirror symmetry
+    point = (0.0, 0.0, 0.0)
+    centers = [(3.0, 0.0, 0.0), (0.0, 4.0, 0.0), (0.0, 0.0, 5.0)]
+    radii = [0.4, 0.4, 0.4]
+
+    signature, _ = jointUtils.joint_signature(point, centers, radii)
+    mirrored, _ = jointUtils.joint_signature(mirror(point), [mirror(center) for center in centers], radii)
+
+    assert mirrored != signature
+    # Only the handedness differs, the lengths and angles are the same
+    assert mirrored[:-1] == signature[:-1]
+
+
+@pytest.mark.parametrize('centers', [
+    # A corner of three equal dowels is its own mirror image, turned
+    [(4.0, 0.0, 0.0), (0.0, 4.0, 0.0), (0.0, 0.0, 4.0)],
+    # A planar joint is its own mirror image in its plane
+    [(4.0, 0.0, 0.0), (0.0, 3.0, 0.0), (-2.0, -2.0, 0.0)],
+])
+def test_achiral_mirror_shares_signature(centers):
+    point = (0.0, 0.0, 0.0)
+    radii = [0.4] * len(centers)
+
+    signature, _ = jointUtils.joint_signature(point, centers, radii)
+    mirrored, _ = jointUtils.joint_signature(mirror(point), [mirror(center) for center in centers], radii)
+
+    assert mirrored == signature
+
+
+@pytest.mark.parametrize('dowels', [8, 9, 12])
+def test_ties_beyond_permutation_limit_do_not_depend_on_input_order(dowels):
+    # Identical dowels have more tie orderings than MAX_PERMUTATIONS, so they are not all searched
+    assert math.factorial(dowels) > jointUtils.MAX_PERMUTATIONS
+    rng = random.Random(dowels)
+    point, centers, radii = random_joint(rng, dowels, radius=0.4, length=5.0)
+    signature, order = jointUtils.joint_signature(point, centers, radii)
+    frame = jointUtils.joint_frame(point, centers, order)
+
+    for _ in range(5):
+        permutation = list(range(dowels))
+        rng.shuffle(permutation)
+        rotation = random_rotation(rng)
+        offset = (rng.uniform(-10, 10), rng.uniform(-10, 10), rng.uniform(-10, 10))
+        moved_point = move(point, rotation, offset)
+        moved_centers = [move(centers[i], rotation, offset) for i in permutation]
+
+        moved_signature, moved_order = jointUtils.joint_signature(moved_point, moved_centers, radii)
+        assert moved_signature == signature
+
+        moved_frame = jointUtils.joint_frame(moved_point, moved_centers, moved_order)
+        matrix = jointUtils.frame_to_frame_matrix(frame, moved_frame)
+        for i, j in zip(order, moved_order):
+            assert distance(apply_matrix(matrix, centers[i]), moved_centers[j]) < 1e-9
@@ -0,0 +1,118 @@
+import math
+import random
+
+import pytest
+
+import jointUtils
+
+
+def random_lines(rng, count, point=(1.0, -2.0, 3.0)):
+    # Lines through one point, with directions spread over the sphere
+    lines = []
+    for _ in range(count):
+        direction = (rng.gauss(0, 1), rng.gauss(0, 1), rng.gauss(0, 1))
+        distance = rng.uniform(2, 10)
+        lines.append((tuple(point[i] - direction[i] * distance for i in range(3)), direction))
+    return lines
+
+
+def test_normal_equations_survive_more_lines_than_the_recompute_interval():
+    rng = random.Random(0)
+    equations = jointUtils.NormalEquations()
+    lines = random_lines(rng, jointUtils.RECOMPUTE_INTERVAL + 44)
+    for center, direction in lines:
+        equations.add(center, direction)
+
+    point, condition = equations.solve()
+    assert max(abs(a - b) for a, b in zip(point, (1.0, -2.0, 3.0))) < 1e-9
+    assert condition < 10.0
+    assert equations.updates < equations.recompute_interval
+
+
+def test_normal_equations_match_a_fresh_sum_after_removals():
+    rng = random.Random(1)
+    equations = jointUtils.NormalEquations(recompute_interval=7)
+    keys = [equations.add(center, direction) for center, direction in random_lines(rng, 40)]
+    for key in keys[::3]:
+        assert equations.remove(key)
+    assert not equations.remove(keys[0])
+
+    fresh = jointUtils.NormalEquations()
+    for line in equations.lines.values():
+        fresh.add(line[:3], line[3:])
+    assert all(math.isclose(a, b, abs_tol=1e-9) for a, b in zip(equations.s + equations.c, fresh.s + fresh.c))
+
+
+def random_joints(rng, count):
+    # Joints of 1 to 5 dowels with random lines, plus parallel and nearly parallel pairs
+    centers = []
+    normals = []
+    for _ in range(count):
+        dowels = rng.randint(1, 5)
+        centers.append([tuple(rng.uniform(-5, 5) for _ in range(3)) for _ in range(dowels)])
+        normals.append([tuple(rng.gauss(0, 1) for _ in range(3)) for _ in range(dowels)])
+    centers += [[(0.0, 0.0, 0.0), (0.0, 1.0, 0.0)], [(0.0, 0.0, 0.0), (0.0, 1.0, 0.0)]]
+    normals += [[(1.0, 0.0, 0.0), (2.0, 0.0, 0.0)], [(1.0, 0.0, 0.0), (1.0, 1e-6, 0.0)]]
+    return centers, normals
+
+
+def test_batch_solves_ragged_joints_and_reports_residuals():
+    # Two lines that miss each other by 2 along z, and three lines through (1, 2, 3)
+    centers = [[(0.0, 0.0, -1.0), (0.0, 0.0, 1.0)], [(1.0, 2.0, 0.0), (0.0, 2.0, 3.0), (1.0, 0.0, 3.0)]]
+    normals = [[(1.0, 0.0, 0.0), (0.0, 3.0, 0.0)], [(0.0, 0.0, 2.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]]
+    points, residuals, conditions = jointUtils.compute_best_intersections(centers, normals)
+
+    assert max(abs(value) for value in points[0]) < 1e-12
+    assert math.isclose(residuals[0], 1.0)
+    assert max(abs(a - b) for a, b in zip(points[1], (1.0, 2.0, 3.0))) < 1e-12
+    assert residuals[1] < 1e-12
+    assert all(math.isfinite(condition) for condition in conditions)
+
+
+def test_batch_skips_masked_dowels_and_joints_with_fewer_than_two_lines():
+    centers = [[(1.0, 2.0, 0.0), (0.0, 2.0, 3.0), (50.0, 50.0, 50.0)], [(0.0, 0.0, 0.0), (5.0, 5.0, 5.0)]]
+    normals = [[(0.0, 0.0, 1.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0)], [(1.0, 0.0, 0.0), (0.0, 0.0, 0.0)]]
+    mask = [[True, True, False], [True, True]]
+    points, residuals, conditions = jointUtils.compute_best_intersections(centers, normals, mask)
+
+    assert max(abs(a - b) for a, b in zip(points[0], (1.0, 2.0, 3.0))) < 1e-12
+    # The zero direction leaves one line, which has no single closest point
+    assert points[1] is None and residuals[1] is None and conditions[1] == math.inf
+
+    unmasked, _, _ = jointUtils.compute_best_intersections(centers[:1], normals[:1])
+    assert max(abs(a - b) for a, b in zip(unmasked[0], (1.0, 2.0, 3.0))) > 1e-3
+
+
+def test_batch_rejects_parallel_dowels():
+    centers, normals = random_joints(random.Random(2), 0)
+    points, residuals, conditions = jointUtils.compute_best_intersections(centers, normals)
+
+    assert points == [None, None]
+    assert residuals == [None, None]
+    assert conditions[0] == math.inf and conditions[1] > jointUtils.MAX_CONDITION
+
+
+def test_pad_joints_masks_the_padding():
+    centers, normals, mask = jointUtils.pad_joints([[(1, 1, 1)], [(2, 2, 2), (3, 3, 3)]], [[(0, 0, 1)], [(0, 1, 0), (1, 0, 0)]])
+
+    assert mask == [[True, False], [True, True]]
+    assert centers[0] == [(1, 1, 1), (0.0, 0.0, 0.0)]
+    assert normals[0] == [(0, 0, 1), (0.0, 0.0, 0.0)]
+
+
+def test_numpy_batch_matches_the_python_batch():
+    pytest.importorskip('numpy')
+    centers, normals = random_joints(random.Random(3), 200)
+    points, residuals, conditions = jointUtils.compute_best_intersections(centers, normals)
+    array_points, array_residuals, array_conditions = jointUtils.compute_best_intersections_array(
+        *jointUtils.pad_joints(centers, normals))
+
+    for point, residual, condition, array_point, array_residual, array_condition in zip(
+            points, residuals, conditions, array_points, array_residuals, array_conditions):
+        if point is None:
+            assert all(math.isnan(value) for value in array_point) and math.isnan(array_residual)
+            assert array_condition > jointUtils.MAX_CONDITION
+            continue
+        assert max(abs(a - b) for a, b in zip(point, array_point)) < 1e-7
+        assert math.isclose(residual, array_residual, rel_tol=1e-6, abs_tol=1e-9)
+        assert math.isclose(condition, array_condition, rel_tol=1e-6)
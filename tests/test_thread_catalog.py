@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+
+import jointUtils
+
+# Answers of Fusion's ThreadDataQuery for part of the ISO metric range. The non-numeric
+# size, the size without designations and the designation without external classes
+# stand for gaps in the real data that the catalog has to skip.
+FIXTURE = os.path.join(os.path.dirname(__file__), 'data', 'iso_metric_thread_data.json')
+
+THREAD_TYPE = 'ISO Metric profile'
+
+
+class RecordedQuery:
+    """
+    Replays recorded thread data through the methods of ThreadDataQuery and counts the calls.
+    """
+
+    def __init__(self, path=FIXTURE):
+        with open(path, 'r') as fixture_file:
+            self.data = json.load(fixture_file)
+        self.calls = 0
+
+    def _lookup(self, thread_type, table, key):
+        self.calls += 1
+        if thread_type != self.data['thread_type']:
+            return []
+        return list(self.data[table].get(key, [])) if table else list(self.data['sizes'])
+
+    def allSizes(self, thread_type):
+        return self._lookup(thread_type, None, None)
+
+    def allDesignations(self, thread_type, size):
+        return self._lookup(thread_type, 'designations', size)
+
+    def allClasses(self, is_internal, thread_type, designation):
+        return self._lookup(thread_type, 'internal_classes' if is_internal else 'external_classes', designation)
+
+
+@pytest.fixture
+def catalog():
+    return jointUtils.ThreadCatalog.build(RecordedQuery(), THREAD_TYPE)
+
+
+def test_build_indexes_the_coarse_thread_of_every_complete_size(catalog):
+    assert catalog.diameters == [2.0, 2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0, 12.0, 14.0, 16.0]
+    assert catalog.entries[7] == jointUtils.ThreadSpec('10.0', 10.0, 'M10x1.5', '4g6g', '5H')
+
+
+def test_build_of_an_unknown_type_is_empty():
+    assert jointUtils.ThreadCatalog.build(RecordedQuery(), 'ANSI Unified Screw Threads').entries == []
+
+
+@pytest.mark.parametrize('size, diameter', [('M10', 10.0), ('10x1.5', 10.0), ('2.5', 2.5), ('Special', None)])
+def test_parse_size(size, diameter):
+    assert jointUtils.parse_size(size) == diameter
+
+
+def test_save_and_load_round_trip(tmp_path, catalog):
+    path = str(tmp_path / 'threads.json')
+    catalog.save(path)
+
+    loaded = jointUtils.ThreadCatalog.load(path, THREAD_TYPE)
+
+    assert loaded.entries == catalog.entries
+    assert loaded.nearest(9.2) == catalog.nearest(9.2)
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_load_or_build_queries_only_without_a_cache(tmp_path):
+    path = str(tmp_path / 'threads.json')
+    query = RecordedQuery()
+    built = jointUtils.ThreadCatalog.load_or_build(path, query, THREAD_TYPE)
+    calls = query.calls
+
+    loaded = jointUtils.ThreadCatalog.load_or_build(path, query, THREAD_TYPE)
+
+    assert calls > 0 and query.calls == calls
+    assert loaded.entries == built.entries
+
+
+def rewrite(path, **changes):
+    with open(path, 'r') as cache_file:
+        data = json.load(cache_file)
+    data.update(changes)
+    with open(path, 'w') as cache_file:
+        json.dump(data, cache_file)
+
+
+def test_load_rejects_another_version_or_thread_type(tmp_path, catalog):
+    path = str(tmp_path / 'threads.json')
+    catalog.save(path)
+
+    assert jointUtils.ThreadCatalog.load(path, 'ANSI Unified Screw Threads') is None
+    rewrite(path, version=jointUtils.CATALOG_VERSION + 1)
+    assert jointUtils.ThreadCatalog.load(path, THREAD_TYPE) is None
+
+
+def test_load_rejects_missing_or_broken_files(tmp_path):
+    path = tmp_path / 'threads.json'
+    assert jointUtils.ThreadCatalog.load(str(path), THREAD_TYPE) is None
+    path.write_text('{"version": 1, "thread_ty')
+    assert jointUtils.ThreadCatalog.load(str(path), THREAD_TYPE) is None
+
+
+@pytest.mark.parametrize('diameter, size', [
+    (10.0, '10.0'),
+    (10.9, '10.0'),
+    (11.1, '12.0'),
+    # Halfway between two sizes the smaller one wins
+    (11.0, '10.0'),
+    (2.25, '2.0'),
+    # Below the first size and within max_difference above the last one
+    (0.0, '2.0'),
+    (18.5, '16.0'),
+    (18.6, None),
+])
+def test_nearest_bounds_and_ties(catalog, diameter, size):
+    spec = catalog.nearest(diameter)
+    assert (spec.size if spec else None) == size
+
+
+def test_nearest_honors_max_difference(catalog):
+    assert catalog.nearest(7.0, max_difference=0.5) is None
+    assert catalog.nearest(1.0, max_difference=0.5) is None
+    assert catalog.nearest(7.4, max_difference=0.6).size == '8.0'
+    assert jointUtils.ThreadCatalog(THREAD_TYPE, []).nearest(10.0) is None
@@ -0,0 +1,74 @@
+import math
+from collections import Counter
+
+import pytest
+
+from jointUtils.mesh import cap_mesh, connector_mesh, joint_parts, signed_volume, thread_pitch
+
+DIRECTIONS = [(0.0, 0.0, 1.0), (1.0, 0.0, 0.0), (0.6, -0.48, 0.64)]
+
+# Dowel radius in cm and segments around the axis
+SIZES = [(0.3, 24), (0.5, 64), (1.2, 48)]
+
+
+def threaded_meshes():
+    for radius, segments in SIZES:
+        for direction in DIRECTIONS:
+            pitch = thread_pitch(radius)
+            center = (1.0, -2.0, 0.5)
+            yield cap_mesh(center, direction, radius, segments, pitch)
+            yield connector_mesh(center, direction, radius, 4.0, segments, pitch)
+
+
+def plain_meshes():
+    for radius, segments in SIZES:
+        yield cap_mesh((0.0, 0.0, 0.0), (0.0, 0.0, 1.0), radius, segments)
+        yield connector_mesh((0.0, 0.0, 0.0), (0.0, 0.0, 1.0), radius, 4.0, segments)
+
+
+ALL_MESHES = list(threaded_meshes()) + list(plain_meshes())
+
+
+def triangle_area(mesh, triangle):
+    a, b, c = (mesh.vertices[index] for index in triangle)
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    return 0.5 * math.sqrt((uy * vz - uz * vy) ** 2 + (uz * vx - ux * vz) ** 2 + (ux * vy - uy * vx) ** 2)
+
+
+@pytest.mark.parametrize('mesh', ALL_MESHES)
+def test_every_directed_edge_is_paired(mesh):
+    edges = Counter()
+    for a, b, c in mesh.triangles:
+        edges.update(((a, b), (b, c), (c, a)))
+
+    # Each edge is used once in each direction, so the mesh is closed, manifold and consistently wound
+    assert all(count == 1 for count in edges.values())
+    assert all(edges[(b, a)] == 1 for a, b in edges)
+
+
+@pytest.mark.parametrize('mesh', ALL_MESHES)
+def test_no_degenerate_triangles(mesh):
+    for triangle in mesh.triangles:
+        assert len(set(triangle)) == 3
+        assert triangle_area(mesh, triangle) > 1e-9
+
+
+@pytest.mark.parametrize('mesh', ALL_MESHES)
+def test_triangles_face_outward(mesh):
+    assert signed_volume(mesh) > 0.0
+
+
+def test_threads_cut_cap_and_fill_bore():
+    point = (0.0, 0.0, 0.0)
+    centers = [(-5.0, 0.0, 0.0), (0.0, -5.0, 0.0)]
+    plain = joint_parts(point, centers, [0.5, 0.5], 32)
+    threaded = joint_parts(point, centers, [0.5, 0.5], 32, threaded=True)
+
+    assert [(part.kind, part.dowel) for part in plain] == [(part.kind, part.dowel) for part in threaded]
+    for plain_part, threaded_part in zip(plain, threaded):
+        # The thread grooves take material from the outside of the cap and add it inside the bore
+        if plain_part.kind == 'cap':
+            assert signed_volume(threaded_part.mesh) < signed_volume(plain_part.mesh)
+        else:
+            assert signed_volume(threaded_part.mesh) > signed_volume(plain_part.mesh)